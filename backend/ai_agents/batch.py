@@ -0,0 +1,197 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .llm import chat_completion, parse_json
+
+logger = logging.getLogger(__name__)
+
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "25"))
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+BATCH_INSTRUCTIONS = """
+You will receive several independent items, each with an "id" and a "task".
+Handle every task exactly as if it had been sent on its own.
+Reply with a single JSON object that maps each item id to that task's answer.
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(text) // 4 + 1
+
+
+def pack(prompts: Dict[str, str], token_budget: int, max_items: int) -> List[List[str]]:
+    """Group item ids so each group's prompts fit in the token budget"""
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = estimate_tokens(BATCH_INSTRUCTIONS)
+    for item_id, prompt in prompts.items():
+        cost = estimate_tokens(prompt) + estimate_tokens(item_id) + 8
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            chunks.append(current)
+            current = []
+            used = estimate_tokens(BATCH_INSTRUCTIONS)
+        current.append(item_id)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class BatchStage:
+    """How one agent stage is run for a batch of events.
+
+    `prompt` and `parse` build and read the single-item prompt of the agent;
+    `single` is the regular per-event call used as the fallback.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        agent,
+        prompt: Callable[[Dict[str, Any]], str],
+        parse: Callable[[Dict[str, Any], str], Dict[str, Any]],
+        single: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    ):
+        self.name = name
+        self.agent = agent
+        self.prompt = prompt
+        self.parse = parse
+        self.single = single
+
+
+class BatchVerifier:
+    """Verifies many events with multi-item prompts, one agent stage at a time.
+
+    Every stage packs as many events as fit in the token budget into one chat
+    completion and maps the answers back by event id. Items whose answer is
+    missing or does not parse go through the agent's regular per-event call.
+    """
+
+    def __init__(
+        self,
+        detector,
+        verifier,
+        scorer,
+        composer,
+        token_budget: int = LLM_BATCH_TOKEN_BUDGET,
+        max_items: int = LLM_BATCH_MAX_ITEMS,
+        concurrency: int = LLM_BATCH_CONCURRENCY,
+    ):
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.concurrency = concurrency
+        self.stages = [
+            BatchStage(
+                "detect", detector,
+                prompt=lambda st: detector.build_prompt(st["event"]),
+                parse=lambda st, content: detector.from_response(st["event"], content),
+                single=lambda st: detector.detect(st["event"]),
+            ),
+            BatchStage(
+                "verify", verifier,
+                prompt=lambda st: verifier.build_prompt(st["event"], st["detect"]),
+                parse=lambda st, content: verifier.from_response(st["event"], content),
+                single=lambda st: verifier.verify(st["event"], st["detect"]),
+            ),
+            BatchStage(
+                "score", scorer,
+                prompt=lambda st: scorer.build_prompt(st["verify"]),
+                parse=lambda st, content: scorer.from_response(st["verify"], content),
+                single=lambda st: scorer.score(st["verify"]),
+            ),
+            BatchStage(
+                "compose", composer,
+                prompt=lambda st: composer.build_prompt(st["score"]),
+                parse=lambda st, content: composer.from_response(st["score"], content),
+                single=lambda st: composer.compose(st["score"]),
+            ),
+        ]
+        self.prompts_sent = 0
+        self.items_batched = 0
+        self.single_calls = 0
+
+    async def run(self, events: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Return the composed summary of every event, keyed by event id"""
+        states = {event["id"]: {"event": event} for event in events}
+        for stage in self.stages:
+            await self._run_stage(stage, states)
+        return {event_id: state["compose"] for event_id, state in states.items()}
+
+    async def _run_stage(self, stage: BatchStage, states: Dict[str, Dict[str, Any]]):
+        if stage.agent.mock_mode:
+            await self._run_single(stage, states, list(states))
+            return
+
+        prompts = {event_id: stage.prompt(state) for event_id, state in states.items()}
+        chunks = pack(prompts, self.token_budget, self.max_items)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_chunk(chunk: List[str]) -> List[str]:
+            if len(chunk) == 1:
+                return chunk
+            async with semaphore:
+                return await self._run_chunk(stage, states, prompts, chunk)
+
+        failed = await asyncio.gather(*[run_chunk(chunk) for chunk in chunks])
+        await self._run_single(stage, states, [event_id for ids in failed for event_id in ids])
+
+    async def _run_chunk(self, stage: BatchStage, states, prompts: Dict[str, str], chunk: List[str]) -> List[str]:
+        """Send one multi-item prompt; returns the ids that need a per-event call"""
+        items = [{"id": event_id, "task": prompts[event_id]} for event_id in chunk]
+        prompt = BATCH_INSTRUCTIONS + "\nItems:\n" + json.dumps(items, ensure_ascii=False, default=str)
+        try:
+            content = await chat_completion(stage.agent.client, stage.agent.system_message, prompt, upstream="openai_batch")
+        except Exception as e:
+            logger.warning(f"Batched {stage.name} call failed for {len(chunk)} items: {str(e)}")
+            return chunk
+        self.prompts_sent += 1
+
+        answers = parse_json(content)
+        if not isinstance(answers, dict):
+            return chunk
+
+        failed = []
+        for event_id in chunk:
+            answer = answers.get(event_id)
+            if answer is None:
+                failed.append(event_id)
+                continue
+            text = answer if isinstance(answer, str) else json.dumps(answer)
+            try:
+                states[event_id][stage.name] = stage.parse(states[event_id], text)
+                self.items_batched += 1
+            except (ValueError, TypeError, KeyError):
+                failed.append(event_id)
+        return failed
+
+    async def _run_single(self, stage: BatchStage, states, event_ids: List[str]):
+        if not stage.agent.mock_mode:
+            self.single_calls += len(event_ids)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(event_id: str):
+            async with semaphore:
+                states[event_id][stage.name] = await stage.single(states[event_id])
+
+        await asyncio.gather(*[run_one(event_id) for event_id in event_ids])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "max_items": self.max_items,
+            "prompts_sent": self.prompts_sent,
+            "items_batched": self.items_batched,
+            "single_calls": self.single_calls,
+        }
@@ -8,6 +8,8 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+from .llm import chat_completion
+
 
 class ConfidenceScorerAgent:
     """Calculates confidence scores based on source verification"""
@@ -50,7 +52,18 @@ class ConfidenceScorerAgent:
             }
         
         try:
-            prompt = f"""
+            content = await chat_completion(self.client, self.system_message, self.build_prompt(verification_result))
+            return self.from_response(verification_result, content)
+        except Exception as e:
+            return {
+                "event_id": verification_result.get('event_id'),
+                "confidence": 0.75,
+                "recommendation": "manual_review",
+                "error": str(e)
+            }
+    
+    def build_prompt(self, verification_result: Dict[str, Any]) -> str:
+        return f"""
 Calculate confidence score for this verification:
 
 Verification Results: {verification_result}
@@ -62,25 +75,11 @@ Provide:
 
 Format as JSON.
 """
-            
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            return {
-                "event_id": verification_result.get('event_id'),
-                "confidence_analysis": response.choices[0].message.content,
-                "confidence": 0.87,
-                "recommendation": "proceed"
-            }
-        except Exception as e:
-            return {
-                "event_id": verification_result.get('event_id'),
-                "confidence": 0.75,
-                "recommendation": "manual_review",
-                "error": str(e)
-            }
\ No newline at end of file
+    
+    def from_response(self, verification_result: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {
+            "event_id": verification_result.get('event_id'),
+            "confidence_analysis": content,
+            "confidence": 0.87,
+            "recommendation": "proceed"
+        }
@@ -7,6 +7,8 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+from .llm import chat_completion
+
 
 class EventDetectorAgent:
     """Detects and identifies trending or relevant real-world events"""
@@ -35,7 +37,22 @@ class EventDetectorAgent:
             }
         
         try:
-            prompt = f"""
+            content = await chat_completion(self.client, self.system_message, self.build_prompt(event))
+            return self.from_response(event, content)
+        except Exception as e:
+            # Fallback to mock
+            return {
+                "event_id": event.get('id'),
+                "detected_category": event.get('category', 'general'),
+                "key_details": f"Event: {event.get('event_title')}",
+                "context": event.get('event_description'),
+                "potential_outcomes": ["Yes", "No"],
+                "data_sources": ["reuters.com", "espn.com", "coindesk.com"],
+                "error": str(e)
+            }
+    
+    def build_prompt(self, event: Dict[str, Any]) -> str:
+        return f"""
 Analyze this event and provide detailed detection results:
 
 Title: {event.get('event_title')}
@@ -50,29 +67,11 @@ Provide:
 
 Format as JSON.
 """
-            
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            return {
-                "event_id": event.get('id'),
-                "detected_category": event.get('category'),
-                "analysis": response.choices[0].message.content,
-                "data_sources": ["reuters.com", "espn.com", "coindesk.com"]
-            }
-        except Exception as e:
-            # Fallback to mock
-            return {
-                "event_id": event.get('id'),
-                "detected_category": event.get('category', 'general'),
-                "key_details": f"Event: {event.get('event_title')}",
-                "context": event.get('event_description'),
-                "potential_outcomes": ["Yes", "No"],
-                "data_sources": ["reuters.com", "espn.com", "coindesk.com"],
-                "error": str(e)
-            }
\ No newline at end of file
+    
+    def from_response(self, event: Dict[str, Any], content: str) -> Dict[str, Any]:
+        return {
+            "event_id": event.get('id'),
+            "detected_category": event.get('category'),
+            "analysis": content,
+            "data_sources": ["reuters.com", "espn.com", "coindesk.com"]
+        }
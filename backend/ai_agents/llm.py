@@ -0,0 +1,49 @@
+import json
+from typing import Any
+
+from resilience import guards
+
+from .llm_cache import response_cache, cache_key
+
+DEFAULT_MODEL = "gpt-4o"
+
+
+async def chat_completion(client, system_message: str, prompt: str, model: str = DEFAULT_MODEL,
+                          upstream: str = "openai") -> str:
+    """Run a chat completion through the shared response cache.
+
+    Cache misses go through the `upstream` guard (circuit breaker, adaptive
+    timeout, bulkhead): "openai" for single calls, "openai_batch" for
+    multi-item prompts. Returns the message content of the first choice.
+    """
+    async def create(timeout: float):
+        return await client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            timeout=timeout
+        )
+
+    async def call():
+        response = await guards.get(upstream).call(create)
+        return response.choices[0].message.content or ""
+
+    return await response_cache.get_or_call(cache_key(model, system_message, prompt), call)
+
+
+def parse_json(content: str) -> Any:
+    """Parse a JSON reply, tolerating a surrounding Markdown code fence.
+
+    Returns None when the content is not valid JSON.
+    """
+    text = content.strip()
+    if text.startswith("```"):
+        text = text.strip("`").strip()
+        if text.startswith("json"):
+            text = text[len("json"):]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
@@ -0,0 +1,197 @@
+import os
+import time
+import json
+import sqlite3
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory, mongo, disk
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+
+
+def cache_key(model: str, system_message: str, prompt: str) -> str:
+    """Content address of a chat completion request"""
+    payload = json.dumps([model, system_message, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class MongoCacheTier:
+    """Persistent tier stored in a Mongo collection, expired by a TTL index"""
+
+    def __init__(self, collection, ttl: float = LLM_CACHE_TTL):
+        self.collection = collection
+        self.ttl = ttl
+
+    async def prepare(self):
+        await self.collection.create_index("key", unique=True)
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        doc = await self.collection.find_one(
+            {"key": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 0, "content": 1, "latency_ms": 1}
+        )
+        return doc
+
+    async def set(self, key: str, content: str, latency_ms: float):
+        await self.collection.update_one(
+            {"key": key},
+            {"$set": {
+                "content": content,
+                "latency_ms": latency_ms,
+                "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+            }},
+            upsert=True
+        )
+
+
+class DiskCacheTier:
+    """Persistent tier stored in a local SQLite file"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, content TEXT, latency_ms REAL, expires_at REAL)"
+        )
+        self._conn.commit()
+        self._lock = asyncio.Lock()
+
+    async def prepare(self):
+        async with self._lock:
+            await asyncio.to_thread(self._purge)
+
+    def _purge(self):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.commit()
+
+    def _get(self, key: str):
+        return self._conn.execute(
+            "SELECT content, latency_ms FROM llm_cache WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+
+    def _set(self, key: str, content: str, latency_ms: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, content, latency_ms, expires_at) VALUES (?, ?, ?, ?)",
+            (key, content, latency_ms, time.time() + self.ttl)
+        )
+        self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            row = await asyncio.to_thread(self._get, key)
+        if row is None:
+            return None
+        return {"content": row[0], "latency_ms": row[1]}
+
+    async def set(self, key: str, content: str, latency_ms: float):
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, content, latency_ms)
+
+
+class LLMResponseCache:
+    """Two-tier cache of chat completion responses.
+
+    The in-memory tier is a size-bounded LRU with TTL; the optional persistent
+    tier (Mongo or SQLite) survives restarts and is shared by workers. Identical
+    requests that arrive while the first one is still in flight share its result.
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_MAX_ENTRIES, ttl: float = LLM_CACHE_TTL, persistent=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.persistent = persistent
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is None and self.persistent is not None:
+            try:
+                entry = await self.persistent.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache persistent read failed: {str(e)}")
+            if entry is not None:
+                self.memory[key] = entry
+                self.persistent_hits += 1
+        if entry is None:
+            return None
+        self.hits += 1
+        self.latency_saved_ms += entry.get("latency_ms", 0.0)
+        return entry["content"]
+
+    async def set(self, key: str, content: str, latency_ms: float):
+        self.memory[key] = {"content": content, "latency_ms": latency_ms}
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, content, latency_ms)
+            except Exception as e:
+                logger.warning(f"LLM cache persistent write failed: {str(e)}")
+
+    async def get_or_call(self, key: str, call) -> str:
+        """Return the cached content for `key`, or await `call()` and cache it"""
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        if key in self._in_flight:
+            self.hits += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            started = time.monotonic()
+            content = await call()
+            await self.set(key, content, round((time.monotonic() - started) * 1000, 2))
+            future.set_result(content)
+            return content
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.persistent).__name__ if self.persistent else "memory",
+            "entries": len(self.memory),
+            "max_entries": self.memory.maxsize,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved_ms, 2),
+        }
+
+
+response_cache = LLMResponseCache()
+
+
+def configure_persistent_tier(db=None, backend: str = LLM_CACHE_BACKEND):
+    """Attach the persistent tier selected by LLM_CACHE_BACKEND"""
+    if backend == "mongo" and db is not None:
+        response_cache.persistent = MongoCacheTier(db.llm_cache)
+    elif backend == "disk":
+        response_cache.persistent = DiskCacheTier()
+    return response_cache.persistent
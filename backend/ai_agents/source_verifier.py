@@ -1,4 +1,5 @@
 import os
+import asyncio
 from typing import Dict, Any, List
 import random
 
@@ -8,6 +9,18 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+from .llm import chat_completion, parse_json
+
+SOURCE_VERIFIER_MAX_SOURCES = int(os.getenv("SOURCE_VERIFIER_MAX_SOURCES", "5"))
+SOURCE_VERIFIER_CONCURRENCY = int(os.getenv("SOURCE_VERIFIER_CONCURRENCY", "3"))
+
+# Mock data sources
+MOCK_SOURCES = [
+    {"source": "Reuters", "url": "https://reuters.com/article/example", "content": "Verified information"},
+    {"source": "ESPN", "url": "https://espn.com/article/example", "content": "Confirmed details"},
+    {"source": "CoinDesk", "url": "https://coindesk.com/article/example", "content": "Market data confirms"}
+]
+
 
 class SourceVerifierAgent:
     """Verifies event information across multiple reputable sources"""
@@ -24,12 +37,7 @@ class SourceVerifierAgent:
     async def verify(self, event: Dict[str, Any], detection_result: Dict[str, Any]) -> Dict[str, Any]:
         """Verify event across multiple sources"""
         
-        # Mock data sources
-        mock_sources = [
-            {"source": "Reuters", "url": "https://reuters.com/article/example", "content": "Verified information"},
-            {"source": "ESPN", "url": "https://espn.com/article/example", "content": "Confirmed details"},
-            {"source": "CoinDesk", "url": "https://coindesk.com/article/example", "content": "Market data confirms"}
-        ]
+        mock_sources = MOCK_SOURCES
         
         if self.mock_mode:
             return {
@@ -41,38 +49,25 @@ class SourceVerifierAgent:
                 "conflicts": []
             }
         
+        sources = self._sources(detection_result)
+        semaphore = asyncio.Semaphore(max(1, SOURCE_VERIFIER_CONCURRENCY))
+        
+        async def check(source: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self._check_source(event, detection_result, source)
+        
         try:
-            prompt = f"""
-Verify this event across multiple sources:
-
-Event: {event.get('event_title')}
-Detection Results: {detection_result}
-
-Suggested Sources: {detection_result.get('data_sources', [])}
-
-Provide:
-1. Number of sources checked
-2. Sources confirming the event
-3. Any conflicts or discrepancies
-4. Overall consensus
-
-Format as JSON.
-"""
-            
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            # Each source is checked independently, so the checks fan out concurrently
+            checks = await asyncio.gather(*[check(source) for source in sources])
+            sources_confirming = sum(1 for check in checks if check["confirms"])
             
             return {
                 "event_id": event.get('id'),
-                "verification_analysis": response.choices[0].message.content,
-                "sources_checked": 3,
+                "verification_analysis": [check["analysis"] for check in checks],
+                "sources_checked": len(checks),
+                "sources_confirming": sources_confirming,
                 "verified_data": mock_sources,
-                "consensus": True
+                "consensus": sources_confirming * 2 > len(checks)
             }
         except Exception as e:
             return {
@@ -83,4 +78,63 @@ Format as JSON.
                 "verified_data": mock_sources,
                 "conflicts": [],
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def _sources(self, detection_result: Dict[str, Any]) -> List[str]:
+        """Distinct suggested sources, at most SOURCE_VERIFIER_MAX_SOURCES (one LLM call each)"""
+        sources = detection_result.get('data_sources') or [s['source'] for s in MOCK_SOURCES]
+        if not isinstance(sources, list):
+            sources = [sources]
+        return list(dict.fromkeys(str(source) for source in sources))[:max(1, SOURCE_VERIFIER_MAX_SOURCES)]
+    
+    async def _check_source(self, event: Dict[str, Any], detection_result: Dict[str, Any], source: str) -> Dict[str, Any]:
+        """Ask whether a single source confirms the event"""
+        prompt = f"""
+Verify this event against a single source:
+
+Event: {event.get('event_title')}
+Detection Results: {detection_result}
+
+Source: {source}
+
+Reply with JSON: {{"confirms": true or false, "notes": "short explanation"}}
+"""
+        
+        content = await chat_completion(self.client, self.system_message, prompt)
+        
+        parsed = parse_json(content)
+        if isinstance(parsed, dict):
+            confirms = bool(parsed.get("confirms"))
+        else:
+            confirms = '"confirms": true' in content.lower()
+        
+        return {"source": source, "confirms": confirms, "analysis": content}
+    
+    def build_prompt(self, event: Dict[str, Any], detection_result: Dict[str, Any]) -> str:
+        """Single prompt covering every suggested source, used for batched verification"""
+        return f"""
+Verify this event across multiple sources:
+
+Event: {event.get('event_title')}
+Detection Results: {detection_result}
+
+Suggested Sources: {self._sources(detection_result)}
+
+Reply with JSON: {{"sources_checked": int, "sources_confirming": int, "consensus": true or false, "conflicts": [str]}}
+"""
+    
+    def from_response(self, event: Dict[str, Any], content: str) -> Dict[str, Any]:
+        parsed = parse_json(content)
+        if not isinstance(parsed, dict):
+            raise ValueError("Verification response is not a JSON object")
+        
+        return {
+            "event_id": event.get('id'),
+            "verification_analysis": content,
+            "sources_checked": int(parsed.get("sources_checked", len(MOCK_SOURCES))),
+            "sources_confirming": int(parsed.get("sources_confirming", 0)),
+            "verified_data": MOCK_SOURCES,
+            "consensus": bool(parsed.get("consensus", False)),
+            "conflicts": parsed.get("conflicts", [])
+        }
+
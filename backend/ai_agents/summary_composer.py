@@ -8,6 +8,8 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+from .llm import chat_completion
+
 
 class SummaryComposerAgent:
     """Composes final verification summary with all results"""
@@ -42,7 +44,22 @@ class SummaryComposerAgent:
             }
         
         try:
-            prompt = f"""
+            content = await chat_completion(self.client, self.system_message, self.build_prompt(confidence_result))
+            return self.from_response(confidence_result, content)
+        except Exception as e:
+            return {
+                "event_id": confidence_result.get('event_id'),
+                "result": "error",
+                "confidence": 0.0,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "reasoning": "Error during verification",
+                "proof_links": [],
+                "needs_manual_review": True,
+                "error": str(e)
+            }
+    
+    def build_prompt(self, confidence_result: Dict[str, Any]) -> str:
+        return f"""
 Compose final verification summary:
 
 Confidence Results: {confidence_result}
@@ -55,38 +72,20 @@ Provide:
 
 Format as JSON.
 """
-            
-            response = await self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": self.system_message},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            confidence = confidence_result.get('confidence', 0.85)
-            
-            return {
-                "event_id": confidence_result.get('event_id'),
-                "result": "verified",
-                "confidence": confidence,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "summary_text": response.choices[0].message.content,
-                "reasoning": "AI-verified with high confidence",
-                "proof_links": [
-                    "https://reuters.com/article/example",
-                    "https://espn.com/article/example"
-                ],
-                "needs_manual_review": False
-            }
-        except Exception as e:
-            return {
-                "event_id": confidence_result.get('event_id'),
-                "result": "error",
-                "confidence": 0.0,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "reasoning": "Error during verification",
-                "proof_links": [],
-                "needs_manual_review": True,
-                "error": str(e)
-            }
\ No newline at end of file
+    
+    def from_response(self, confidence_result: Dict[str, Any], content: str) -> Dict[str, Any]:
+        confidence = confidence_result.get('confidence', 0.85)
+        
+        return {
+            "event_id": confidence_result.get('event_id'),
+            "result": "verified",
+            "confidence": confidence,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "summary_text": content,
+            "reasoning": "AI-verified with high confidence",
+            "proof_links": [
+                "https://reuters.com/article/example",
+                "https://espn.com/article/example"
+            ],
+            "needs_manual_review": False
+        }
@@ -0,0 +1,169 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+STATS_ID = "global"
+STATS_RECONCILE_INTERVAL = float(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))
+HIGH_CONFIDENCE = 0.9
+RECONCILE_ATTEMPTS = 3
+
+COUNTERS = (
+    "total_events",
+    "total_markets",
+    "active_markets",
+    "total_predictions",
+    "total_volume",
+    "total_verifications",
+    "confidence_sum",
+    "high_confidence_count",
+)
+
+
+async def increment(db, **deltas: float):
+    """Apply `$inc` deltas to the stats document.
+
+    Every increment also bumps `version`, which tells `reconcile` that its
+    aggregation may have missed it. Best-effort: a failure is logged and
+    left for the next reconciliation, it never fails the write that
+    triggered it.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    try:
+        await db.stats.update_one({"_id": STATS_ID}, {"$inc": {**deltas, "version": 1}}, upsert=True)
+    except Exception as e:
+        logger.error(f"Failed to update stats counters {sorted(deltas)}: {str(e)}")
+
+
+def verification_deltas(confidence: float, previous: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Counter changes for an event becoming verified with `confidence`.
+
+    `previous` is the event as it was before. The confidence it was last
+    counted with is stored as `counted_confidence` next to the verdict, so
+    a re-verification replaces it instead of counting the event twice;
+    the status cannot tell, as it is "verifying" by the time the job runs.
+    """
+    confidence = confidence or 0.0
+    deltas = {
+        "total_verifications": 1,
+        "confidence_sum": confidence,
+        "high_confidence_count": int(confidence > HIGH_CONFIDENCE),
+    }
+    old = previous.get("counted_confidence") if previous else None
+    if old is None and previous and previous.get("status") == "verified":
+        old = previous.get("confidence") or 0.0  # verified before counted_confidence was stored
+    if old is not None:
+        deltas["total_verifications"] -= 1
+        deltas["confidence_sum"] -= old
+        deltas["high_confidence_count"] -= int(old > HIGH_CONFIDENCE)
+    return deltas
+
+
+async def _group(collection, group: Dict[str, Any]) -> Dict[str, Any]:
+    rows = await collection.aggregate([{"$group": {"_id": None, **group}}]).to_list(1)
+    return rows[0] if rows else {}
+
+
+async def reconcile(db) -> Dict[str, Any]:
+    """Recompute every counter with aggregation pipelines and store the result.
+
+    The result is only stored if no `increment` landed while the pipelines
+    ran (the document's `version` is unchanged), since overwriting would
+    lose it; the aggregation is then retried, up to RECONCILE_ATTEMPTS times.
+    Returns the aggregated counters either way.
+    """
+    for _ in range(RECONCILE_ATTEMPTS):
+        current = await db.stats.find_one({"_id": STATS_ID}, {"version": 1})
+        stats = await _aggregate(db)
+        if await _store(db, stats, current):
+            return stats
+    logger.warning(f"Stats reconciliation skipped: counters kept changing over {RECONCILE_ATTEMPTS} attempts")
+    return stats
+
+
+async def _store(db, stats: Dict[str, Any], current: Optional[Dict[str, Any]]) -> bool:
+    """Write `stats` if the document is still at the version read before aggregating"""
+    if current is None:
+        try:
+            await db.stats.insert_one({"_id": STATS_ID, **stats, "version": 0})
+            return True
+        except DuplicateKeyError:
+            return False
+    version = current.get("version")
+    result = await db.stats.update_one(
+        {"_id": STATS_ID, "version": version if version is not None else {"$exists": False}},
+        {"$set": stats, "$inc": {"version": 1}}
+    )
+    return result.matched_count == 1
+
+
+async def _aggregate(db) -> Dict[str, Any]:
+    # Same rule as verification_deltas: an event counts with the confidence
+    # it was last verified with, even while it is being re-verified
+    counted = {"$ifNull": ["$counted_confidence", {"$cond": [
+        {"$eq": ["$status", "verified"]}, {"$ifNull": ["$confidence", 0]}, None
+    ]}]}
+    is_counted = {"$ne": [counted, None]}
+    events, markets, predictions = await asyncio.gather(
+        _group(db.events, {
+            "total_events": {"$sum": 1},
+            "total_verifications": {"$sum": {"$cond": [is_counted, 1, 0]}},
+            "confidence_sum": {"$sum": {"$cond": [is_counted, counted, 0]}},
+            "high_confidence_count": {"$sum": {"$cond": [
+                {"$and": [is_counted, {"$gt": [counted, HIGH_CONFIDENCE]}]}, 1, 0
+            ]}},
+        }),
+        _group(db.markets, {
+            "total_markets": {"$sum": 1},
+            "active_markets": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+            "total_volume": {"$sum": {"$ifNull": ["$total_volume", 0]}},
+        }),
+        _group(db.predictions, {"total_predictions": {"$sum": 1}}),
+    )
+    stats = {key: 0 for key in COUNTERS}
+    for row in (events, markets, predictions):
+        stats.update({key: value for key, value in row.items() if key in stats})
+    stats["reconciled_at"] = datetime.now(timezone.utc)
+    return stats
+
+
+async def get_stats(db) -> Dict[str, Any]:
+    """The stats document; built by reconciliation the first time"""
+    stats = await db.stats.find_one({"_id": STATS_ID})
+    if stats is None:
+        stats = await reconcile(db)
+    return {key: stats.get(key, 0) for key in COUNTERS}
+
+
+class StatsReconciler:
+    """Periodically reconciles the counters (0 disables the loop)"""
+
+    def __init__(self, db, interval: float = STATS_RECONCILE_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await reconcile(self.db)
+            except Exception as e:
+                logger.error(f"Stats reconciliation failed: {str(e)}")
+            await asyncio.sleep(self.interval)
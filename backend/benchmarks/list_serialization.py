@@ -0,0 +1,122 @@
+"""Micro-benchmark of the list-response and broadcast serialization paths.
+
+Serves the same page of events two ways through an in-process ASGI client:
+"validated" returns the documents under `response_model=List[Event]` (the
+default path), "fast" returns them with `FastJSONResponse` the way
+`list_page` does under FAST_SERIALIZATION. Also times encoding one
+broadcast message with the stdlib encoder and with orjson. No MongoDB needed.
+
+Usage:
+    python benchmarks/list_serialization.py --items 100 --requests 2000
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "serialization_benchmark")
+
+import httpx
+from fastapi import FastAPI
+
+import serialization
+from serialization import FastJSONResponse, trusted_documents, json_default
+from server import Event
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def make_events(count: int) -> List[dict]:
+    now = datetime.now(timezone.utc)
+    return [{
+        "id": str(uuid.uuid4()),
+        "event_title": f"Will event {i} resolve yes?",
+        "event_description": "A moderately long description of the event being predicted. " * 3,
+        "category": ["crypto", "sports", "politics"][i % 3],
+        "result": "verified" if i % 2 else None,
+        "confidence": 0.5 + (i % 50) / 100,
+        "status": "verified" if i % 2 else "pending",
+        "proof_links": [f"https://example.com/proof/{i}/{j}" for j in range(3)],
+        "reasoning": "Three independent sources agree." if i % 2 else None,
+        "created_at": now - timedelta(minutes=i),
+        "resolved_at": now if i % 2 else None,
+        "created_by": "0x" + "ab" * 20,
+    } for i in range(count)]
+
+
+def build_app(docs: List[dict]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/validated", response_model=List[Event])
+    async def validated():
+        return docs
+
+    @app.get("/fast")
+    async def fast():
+        return FastJSONResponse(trusted_documents(docs, Event))
+
+    return app
+
+
+async def requests_per_second(client: httpx.AsyncClient, path: str, count: int) -> float:
+    await client.get(path)  # warm up
+    started = time.perf_counter()
+    for _ in range(count):
+        response = await client.get(path)
+        response.raise_for_status()
+    return count / (time.perf_counter() - started)
+
+
+def encodes_per_second(encode, message: dict, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        encode(message)
+    return count / (time.perf_counter() - started)
+
+
+async def run(args) -> int:
+    docs = make_events(args.items)
+    transport = httpx.ASGITransport(app=build_app(docs))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        validated_body = (await client.get("/validated")).json()
+        fast_body = (await client.get("/fast")).json()
+        if validated_body != fast_body:
+            print("Response bodies differ between the two paths")
+            return 1
+        slow = await requests_per_second(client, "/validated", args.requests)
+        fast = await requests_per_second(client, "/fast", args.requests)
+
+    print(f"{args.items}-item list, {args.requests} requests")
+    print(f"  response_model validation : {slow:8.0f} req/s")
+    print(f"  FastJSONResponse ({'orjson' if serialization.orjson else 'stdlib json'}): {fast:8.0f} req/s  ({fast / slow:.1f}x)")
+
+    message = {"type": "new_event", "data": docs[0]}
+    stdlib = encodes_per_second(
+        lambda m: json.dumps(m, separators=(",", ":"), ensure_ascii=False, default=json_default), message, args.encodes
+    )
+    fast_encode = encodes_per_second(lambda m: serialization.dumps(m).decode(), message, args.encodes)
+    print(f"Broadcast encode, {args.encodes} messages")
+    print(f"  stdlib json : {stdlib:10.0f} msg/s")
+    print(f"  dumps       : {fast_encode:10.0f} msg/s  ({fast_encode / stdlib:.1f}x)")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100, help="Documents per list response")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per path")
+    parser.add_argument("--encodes", type=int, default=50000, help="Broadcast messages to encode")
+    return asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
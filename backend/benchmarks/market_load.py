@@ -0,0 +1,81 @@
+"""Concurrent bet load test for the market engine.
+
+Fires many bets at one hot market through `market_engine.place_bet` and
+checks that no stake was lost and the stored odds match the pools.
+Needs a running MongoDB; uses a throwaway database that is dropped after.
+
+Usage:
+    python benchmarks/market_load.py --bets 2000 --concurrency 200
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import market_engine
+
+
+async def run(args) -> int:
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[f"market_load_{uuid.uuid4().hex[:8]}"]
+    market_id = str(uuid.uuid4())
+    options = market_engine.seed_options([{"id": "yes", "odds": 1.8}, {"id": "no", "odds": 2.2}])
+    await db.markets.insert_one({"id": market_id, "status": "active", "options": options, "total_volume": 0.0})
+
+    bets = [(random.choice(["yes", "no"]), float(random.randint(1, 100))) for _ in range(args.bets)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def bet(option_id: str, amount: float):
+        async with semaphore:
+            started = time.perf_counter()
+            await market_engine.place_bet(db, market_id, option_id, amount)
+            latencies.append(time.perf_counter() - started)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*[bet(option_id, amount) for option_id, amount in bets])
+        elapsed = time.perf_counter() - started
+
+        market = await db.markets.find_one({"id": market_id}, {"_id": 0})
+        expected = {option_id: sum(a for o, a in bets if o == option_id) for option_id in ("yes", "no")}
+        volumes = {o["id"]: o["volume"] for o in market["options"]}
+        odds = {o["id"]: o["odds"] for o in market["options"]}
+        consistent = (
+            abs(market["total_volume"] - sum(a for _, a in bets)) < 1e-6
+            and all(abs(volumes[k] - expected[k]) < 1e-6 for k in expected)
+            and odds == market_engine.parimutuel_odds(market["options"])
+        )
+
+        latencies.sort()
+        print(f"bets:        {len(bets)} at concurrency {args.concurrency}")
+        print(f"throughput:  {len(bets) / elapsed:.0f} bets/s ({elapsed:.2f}s)")
+        print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms")
+        print(f"latency p95: {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms")
+        print(f"volumes:     {volumes} (expected {expected})")
+        print(f"odds:        {odds}")
+        print(f"consistent:  {consistent}")
+        return 0 if consistent else 1
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--bets", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    return asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
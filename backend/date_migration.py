@@ -0,0 +1,133 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DATE_MIGRATION_BATCH_SIZE = int(os.getenv("DATE_MIGRATION_BATCH_SIZE", "1000"))
+
+# Timestamp fields that older releases stored as ISO-8601 strings
+DATE_FIELDS: Dict[str, List[str]] = {
+    "events": ["created_at", "resolved_at"],
+    "markets": ["created_at", "resolved_at"],
+    "predictions": ["created_at"],
+    "strategies": ["created_at"],
+    "users": ["last_login"],
+}
+
+
+# BSON orders every Date before every String and a Date bound never matches
+# a String, so keyset pagination (created_at, id) and the from/to filters
+# skip documents whose created_at is still a string. Those queries are only
+# complete once `migrate-dates` has converted these fields.
+QUERIED_DATE_FIELDS: Dict[str, str] = {"events": "created_at", "markets": "created_at", "predictions": "created_at"}
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """ISO-8601 string to an aware UTC datetime (naive strings are taken as UTC), None if invalid"""
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def string_dates(fields: Iterable[str]) -> Dict[str, list]:
+    return {"$or": [{field: {"$type": "string"}} for field in fields]}
+
+
+async def count_string_dates(db, collections: Optional[Dict[str, List[str]]] = None) -> Dict[str, Dict[str, int]]:
+    """Documents per collection and field still holding a string timestamp"""
+    return {
+        name: {field: await db[name].count_documents({field: {"$type": "string"}}) for field in fields}
+        for name, fields in (collections or DATE_FIELDS).items()
+    }
+
+
+async def warn_if_unmigrated(db) -> List[str]:
+    """Log the collections whose date-typed queries still miss string timestamps"""
+    pending = []
+    try:
+        for name, field in QUERIED_DATE_FIELDS.items():
+            if await db[name].find_one({field: {"$type": "string"}}, {"_id": 1}):
+                pending.append(name)
+    except PyMongoError as e:
+        logger.warning(f"Could not check for string timestamps: {str(e)}")
+        return pending
+    if pending:
+        logger.warning(
+            f"String timestamps remain in {', '.join(pending)}: pagination and from/to filters skip those "
+            f"documents until `python manage.py migrate-dates` completes"
+        )
+    return pending
+
+
+async def migrate_collection(
+    db,
+    name: str,
+    fields: List[str],
+    batch_size: int = DATE_MIGRATION_BATCH_SIZE,
+    pause: float = 0.0,
+) -> Dict[str, int]:
+    """Convert string timestamps in one collection to BSON dates, one batch at a time.
+
+    Batches walk `_id` upwards, so each one is a short index range read and a
+    single unordered bulk_write. Every update matches the string it parsed,
+    which keeps a concurrent write of the same field from being overwritten,
+    and running the migration again only touches what is left. Converted
+    documents get their `version` bumped, as their JSON changes. `pause`
+    seconds between batches leave headroom for live traffic.
+    """
+    converted = unparseable = batches = 0
+    last_id = None
+    while True:
+        query = string_dates(fields)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        rows = await db[name].find(query, {field: 1 for field in fields}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not rows:
+            break
+
+        ops = []
+        for row in rows:
+            for field in fields:
+                value = row.get(field)
+                if not isinstance(value, str):
+                    continue
+                parsed = parse_timestamp(value)
+                if parsed is None:
+                    unparseable += 1
+                    continue
+                ops.append(UpdateOne({"_id": row["_id"], field: value}, {"$set": {field: parsed}, "$inc": {"version": 1}}))
+        if ops:
+            result = await db[name].bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        batches += 1
+        last_id = rows[-1]["_id"]
+        if pause:
+            await asyncio.sleep(pause)
+
+    if unparseable:
+        logger.warning(f"{unparseable} timestamps in {name} could not be parsed and were left as strings")
+    return {"converted": converted, "unparseable": unparseable, "batches": batches}
+
+
+async def migrate_dates(
+    db,
+    collections: Optional[Dict[str, List[str]]] = None,
+    batch_size: int = DATE_MIGRATION_BATCH_SIZE,
+    pause: float = 0.0,
+    progress: Optional[Callable[[str, Dict[str, int]], None]] = None,
+) -> Dict[str, Dict[str, int]]:
+    """Run `migrate_collection` over every collection with string timestamps"""
+    results = {}
+    for name, fields in (collections or DATE_FIELDS).items():
+        results[name] = await migrate_collection(db, name, fields, batch_size, pause)
+        if progress is not None:
+            progress(name, results[name])
+    return results
@@ -0,0 +1,241 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from bson import json_util
+from cachetools import TTLCache
+
+logger = logging.getLogger(__name__)
+
+ENTITY_CACHE_BACKEND = os.getenv("ENTITY_CACHE_BACKEND", "memory")  # memory, redis
+ENTITY_CACHE_MAX_ENTRIES = int(os.getenv("ENTITY_CACHE_MAX_ENTRIES", "10000"))
+ENTITY_CACHE_TTL = float(os.getenv("ENTITY_CACHE_TTL", "60"))
+ENTITY_CACHE_REDIS_TTL = int(os.getenv("ENTITY_CACHE_REDIS_TTL", "300"))
+ENTITY_CACHE_CHANNEL = os.getenv("ENTITY_CACHE_CHANNEL", "verisight:entity-invalidate")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS.with_options(tz_aware=True)
+
+Loader = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+# Store a loaded document only if the key's generation is still the one read
+# before the load; `delete` bumps it, so a load that raced a write is dropped
+# even when the invalidation message has not reached the loading worker yet.
+SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+INVALIDATE = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[1])
+return 1
+"""
+
+
+class RedisEntityTier:
+    """Shared tier in Redis; invalidations are also published so every
+    worker drops its in-process copy"""
+
+    def __init__(self, url: str = REDIS_URL, ttl: int = ENTITY_CACHE_REDIS_TTL, channel: str = ENTITY_CACHE_CHANNEL):
+        self.url = url
+        self.ttl = ttl
+        self.channel = channel
+        self.redis = None
+        self.pubsub = None
+        self.listener = None
+
+    async def start(self, on_invalidate: Callable[[str], None]):
+        import redis.asyncio as redis
+
+        # Subscribing happens in the listener, so an unreachable Redis does not fail startup
+        self.redis = redis.from_url(self.url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.listener = asyncio.create_task(self._listen(on_invalidate))
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+            self.listener = None
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+            self.pubsub = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+    async def _listen(self, on_invalidate: Callable[[str], None]):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await self.pubsub.subscribe(self.channel)
+                async for item in self.pubsub.listen():
+                    if item.get("type") == "message":
+                        data = item["data"]
+                        on_invalidate(data.decode() if isinstance(data, bytes) else data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Entity cache invalidation listener failed, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.redis.get(f"entity:{key}")
+        return json_util.loads(raw, json_options=JSON_OPTIONS) if raw is not None else None
+
+    async def generation(self, key: str) -> str:
+        raw = await self.redis.get(f"entity-gen:{key}")
+        return raw.decode() if isinstance(raw, bytes) else (raw or "0")
+
+    async def set(self, key: str, doc: Dict[str, Any], generation: str) -> bool:
+        """Store `doc` unless `key` was invalidated since `generation` was read"""
+        stored = await self.redis.eval(
+            SET_IF_GENERATION, 2, f"entity:{key}", f"entity-gen:{key}",
+            generation, json_util.dumps(doc, json_options=JSON_OPTIONS), self.ttl
+        )
+        return bool(stored)
+
+    async def delete(self, key: str):
+        # The generation outlives any load that could have read the old one
+        await self.redis.eval(INVALIDATE, 2, f"entity:{key}", f"entity-gen:{key}", self.ttl * 2)
+        await self.redis.publish(self.channel, key)
+
+
+class EntityCache:
+    """Read-through cache of detail documents keyed by "<kind>:<id>".
+
+    The in-process tier is a size-bounded LRU with TTL; the optional Redis
+    tier is shared by workers. Writers call `invalidate` after changing an
+    entity. A load that was already in flight when the entity was
+    invalidated is returned to its caller but not cached, so a stale read
+    can never overwrite the invalidation: locally through `_stale`, and in
+    the shared tier through the per-key generation read before the load.
+    """
+
+    def __init__(self, maxsize: int = ENTITY_CACHE_MAX_ENTRIES, ttl: float = ENTITY_CACHE_TTL, shared=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stale: set = set()
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    async def start(self):
+        if self.shared is not None:
+            await self.shared.start(self._drop)
+
+    async def close(self):
+        if self.shared is not None:
+            await self.shared.close()
+
+    def _count(self, kind: str, counter: str):
+        counts = self.counters.setdefault(kind, {"hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0})
+        counts[counter] += 1
+
+    def _drop(self, key: str):
+        self.memory.pop(key, None)
+        if key in self._in_flight:
+            self._stale.add(key)
+
+    async def get_or_load(self, kind: str, entity_id: str, loader: Loader) -> Optional[Dict[str, Any]]:
+        """Return the cached document, or await `loader()` once for all concurrent callers"""
+        key = f"{kind}:{entity_id}"
+        doc = self.memory.get(key)
+        if doc is not None:
+            self._count(kind, "hits")
+            return dict(doc)
+
+        if key in self._in_flight:
+            self._count(kind, "hits")
+            doc = await asyncio.shield(self._in_flight[key])
+            return dict(doc) if doc is not None else None
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            doc = await self._load_shared(key)
+            if doc is not None:
+                self._count(kind, "shared_hits")
+            else:
+                self._count(kind, "misses")
+                generation = await self._shared_generation(key)
+                doc = await loader()
+                if doc is not None and generation is not None and key not in self._stale:
+                    await self._store_shared(key, doc, generation)
+            if doc is not None and key not in self._stale:
+                self.memory[key] = doc
+            future.set_result(doc)
+            return dict(doc) if doc is not None else None
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._in_flight[key]
+            self._stale.discard(key)
+
+    async def _load_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.shared is None:
+            return None
+        try:
+            return await self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Entity cache shared read failed: {str(e)}")
+            return None
+
+    async def _shared_generation(self, key: str) -> Optional[str]:
+        """None (do not store in the shared tier) when there is none or it cannot be read"""
+        if self.shared is None:
+            return None
+        try:
+            return await self.shared.generation(key)
+        except Exception as e:
+            logger.warning(f"Entity cache shared read failed: {str(e)}")
+            return None
+
+    async def _store_shared(self, key: str, doc: Dict[str, Any], generation: str):
+        try:
+            await self.shared.set(key, doc, generation)
+        except Exception as e:
+            logger.warning(f"Entity cache shared write failed: {str(e)}")
+
+    async def invalidate(self, kind: str, *entity_ids: str):
+        await self.invalidate_many(kind, entity_ids)
+
+    async def invalidate_many(self, kind: str, entity_ids: Iterable[str]):
+        for entity_id in entity_ids:
+            key = f"{kind}:{entity_id}"
+            self._drop(key)
+            self._count(kind, "invalidations")
+            if self.shared is not None:
+                try:
+                    await self.shared.delete(key)
+                except Exception as e:
+                    logger.warning(f"Entity cache shared invalidation failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        kinds = {}
+        for kind, counts in self.counters.items():
+            lookups = counts["hits"] + counts["shared_hits"] + counts["misses"]
+            kinds[kind] = {
+                **counts,
+                "hit_rate": round((counts["hits"] + counts["shared_hits"]) / lookups, 4) if lookups else 0.0,
+            }
+        return {
+            "backend": "redis" if self.shared is not None else "memory",
+            "entries": len(self.memory),
+            "max_entries": self.memory.maxsize,
+            "ttl": self.memory.ttl,
+            "kinds": kinds,
+        }
+
+
+def create_entity_cache(backend: str = ENTITY_CACHE_BACKEND) -> EntityCache:
+    return EntityCache(shared=RedisEntityTier() if backend == "redis" else None)
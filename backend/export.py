@@ -0,0 +1,96 @@
+import io
+import os
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pymongo import ASCENDING
+
+from pagination import keyset_filter, parse_fields
+from serialization import dumps, json_default
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Oldest first; the "newest" indexes are walked backwards, so rows stream
+# straight off an index and an export resumes from its last id.
+EXPORT_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
+# Per collection: equality filters accepted as query parameters and the
+# CSV columns (also the fields `fields=` may select). Nested values such as
+# `onchain` or `options` are written as JSON in their CSV cell.
+EXPORTS: Dict[str, Dict[str, List[str]]] = {
+    "events": {
+        "filters": ["status", "category"],
+        "columns": ["id", "event_title", "event_description", "category", "status", "result", "confidence",
+                    "reasoning", "proof_links", "created_by", "created_at", "resolved_at", "onchain"],
+    },
+    "markets": {
+        "filters": ["status", "category", "event_id"],
+        "columns": ["id", "event_id", "title", "description", "category", "status", "resolution",
+                    "total_volume", "options", "created_at", "resolved_at"],
+    },
+    "predictions": {
+        "filters": ["status", "market_id", "user_address", "option_id"],
+        "columns": ["id", "market_id", "user_address", "option_id", "amount", "odds", "potential_payout",
+                    "status", "payout", "created_at", "settled_at"],
+    },
+}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def export_projection(collection: str, fields: Optional[str]) -> Dict[str, int]:
+    """Projection for the export; raises ValueError for unknown fields"""
+    columns = EXPORTS[collection]["columns"]
+    return parse_fields(fields, columns, EXPORT_SORT) or {"_id": 0, **{column: 1 for column in columns}}
+
+
+async def resume_after(db, collection: str, after_id: str) -> Dict[str, Any]:
+    """Keyset filter for the rows after the document `after_id`; raises ValueError if it is unknown"""
+    doc = await db[collection].find_one({"id": after_id}, {"_id": 0, "created_at": 1, "id": 1})
+    if not doc:
+        raise ValueError(f"Unknown after_id '{after_id}'")
+    return keyset_filter(EXPORT_SORT, [doc.get("created_at"), doc["id"]])
+
+
+def open_cursor(db, collection: str, query: Dict[str, Any], projection: Dict[str, int], limit: Optional[int] = None):
+    cursor = db[collection].find(query, projection).sort(EXPORT_SORT).batch_size(EXPORT_BATCH_SIZE)
+    return cursor.limit(limit) if limit else cursor
+
+
+async def ndjson_rows(cursor) -> AsyncIterator[bytes]:
+    """One JSON document per line, flushed once per Mongo batch"""
+    lines: List[bytes] = []
+    async for doc in cursor:
+        lines.append(dumps(doc) + b"\n")
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield b"".join(lines)
+            lines = []
+    if lines:
+        yield b"".join(lines)
+
+
+def csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=json_default)
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return json_default(value)
+
+
+async def csv_rows(cursor, columns: List[str]) -> AsyncIterator[bytes]:
+    """Header plus one row per document, flushed once per Mongo batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for doc in cursor:
+        writer.writerow([csv_cell(doc.get(column)) for column in columns])
+        rows += 1
+        if rows >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode()
@@ -0,0 +1,109 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "10"))
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", "120"))
+
+# A probe returns the dependency's status fields ("status" plus extras such as
+# "block_height"); raising or timing out marks the dependency unhealthy.
+Probe = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class HealthMonitor:
+    """Probes every dependency concurrently on a schedule and serves the last snapshot.
+
+    Each dependency keeps a rolling window of probe latencies for p50/p95.
+    When the loop is not running (e.g. in tests or before startup) `report`
+    probes on demand, at most once per interval.
+    """
+
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval: float = HEALTH_PROBE_INTERVAL,
+        timeout: float = HEALTH_PROBE_TIMEOUT,
+        history_size: int = HEALTH_HISTORY_SIZE,
+    ):
+        self.probes = probes
+        self.interval = interval
+        self.timeout = timeout
+        self.latencies: Dict[str, Deque[float]] = {name: deque(maxlen=history_size) for name in probes}
+        self.services: Dict[str, Dict[str, Any]] = {}
+        self.checked_at: Optional[datetime] = None
+        self._checked_monotonic = 0.0
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health probing failed: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def _probe(self, name: str, probe: Probe) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(probe(), self.timeout)
+        except asyncio.TimeoutError:
+            result = {"status": "unhealthy", "error": f"timed out after {self.timeout}s"}
+        except Exception as e:
+            result = {"status": "unhealthy", "error": str(e)}
+        latency = round((time.perf_counter() - start) * 1000, 2)
+        self.latencies[name].append(latency)
+        window = list(self.latencies[name])
+        return {
+            **result,
+            "latency_ms": latency,
+            "p50_ms": percentile(window, 50),
+            "p95_ms": percentile(window, 95),
+        }
+
+    async def probe_all(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._probe(name, self.probes[name]) for name in names))
+        self.services = dict(zip(names, results))
+        self.checked_at = datetime.now(timezone.utc)
+        self._checked_monotonic = time.monotonic()
+        return self.services
+
+    def _needs_probe(self) -> bool:
+        if self.checked_at is None:
+            return True
+        return self._task is None and time.monotonic() - self._checked_monotonic >= self.interval
+
+    async def report(self) -> Dict[str, Any]:
+        """Last snapshot; probes first if there is none yet, or the monitor is idle and it is old"""
+        if self._needs_probe():
+            async with self._lock:
+                if self._needs_probe():
+                    await self.probe_all()
+
+        overall = "healthy" if all(s["status"] == "healthy" for s in self.services.values()) else "degraded"
+        return {
+            "status": overall,
+            "services": self.services,
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "age_s": round(time.monotonic() - self._checked_monotonic, 2) if self.checked_at else None,
+        }
@@ -0,0 +1,175 @@
+import os
+import gzip
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+HTTP_COMPRESS_MIN_SIZE = int(os.getenv("HTTP_COMPRESS_MIN_SIZE", "1024"))
+HTTP_GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", "6"))
+HTTP_BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", "4"))
+
+# Cache-Control per path prefix, first match wins. Listing and detail routes
+# are "no-cache": clients may keep the body but must revalidate, which costs
+# a 304 without a body once the ETag matches.
+CACHE_POLICIES: List[Tuple[str, str]] = [
+    ("/api/health/live", "no-store"),
+    ("/api/health", "public, max-age=5"),
+    ("/api/analytics/", "public, max-age=10"),
+    ("/api/odds/", "public, max-age=5"),
+    ("/api/predictions", "private, no-cache"),
+    ("/api/admin/", "no-store"),
+    ("/api/export/", "no-store"),
+    ("/api/metrics", "no-store"),
+    ("/api/", "no-cache"),
+]
+
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def cache_control(path: str, policies: Sequence[Tuple[str, str]] = CACHE_POLICIES) -> Optional[str]:
+    for prefix, policy in policies:
+        if path.startswith(prefix):
+            return policy
+    return None
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag of a response body (the identity representation)"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def version_etag(kind: str, version: int) -> str:
+    """Strong ETag of a stored document's `version`; ETags are per URL, so no id is needed"""
+    return f'"{kind}-v{version}"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """Strong ETags must differ per content-coding, so tag the encoded variants"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `If-None-Match` against the identity ETag, any coding"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for encoding in ("br", "gzip"):
+            if tag.endswith(f"-{encoding}"):
+                tag = tag[:-len(encoding) - 1]
+        if tag == opaque:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: str, available: Sequence[str] = ENCODINGS) -> Optional[str]:
+    """Preferred content-coding the client accepts (by q-value, then server order)"""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=HTTP_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=HTTP_GZIP_LEVEL)
+
+
+class HTTPCacheMiddleware:
+    """ETag, conditional GET, Cache-Control and compression for JSON responses.
+
+    Successful JSON GET responses are buffered, tagged with a content-hash
+    ETag unless the route set its own (detail routes use the document
+    version, see `version_etag`) and answered with an empty 304 when
+    `If-None-Match` matches. Bodies of at least `minimum_size` bytes are
+    compressed with brotli or gzip. Other responses, such
+    as streams, pass through untouched apart from Cache-Control.
+    """
+
+    def __init__(self, app, policies: Sequence[Tuple[str, str]] = CACHE_POLICIES, minimum_size: int = HTTP_COMPRESS_MIN_SIZE):
+        self.app = app
+        self.policies = policies
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        policy = cache_control(scope["path"], self.policies)
+        start = None
+        chunks: List[bytes] = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if policy and "cache-control" not in headers:
+                    headers["Cache-Control"] = policy
+                passthrough = (
+                    message["status"] != 200
+                    or not headers.get("content-type", "").startswith("application/json")
+                    or "content-encoding" in headers
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._finish(start, b"".join(chunks), request_headers, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _finish(self, start, body: bytes, request_headers: Headers, send):
+        headers = MutableHeaders(scope=start)
+        etag = headers.get("etag") or content_etag(body)
+        headers.append("Vary", "Accept-Encoding")
+
+        if etag_matches(request_headers.get("if-none-match", ""), etag):
+            kept = {name: headers[name] for name in ("cache-control", "vary") if name in headers}
+            not_modified = MutableHeaders(headers={**kept, "etag": etag})
+            await send({"type": "http.response.start", "status": 304, "headers": not_modified.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        encoding = None
+        if len(body) >= self.minimum_size:
+            encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+        headers["ETag"] = encoded_etag(etag, encoding)
+        await send(start)
+        await send({"type": "http.response.body", "body": body})
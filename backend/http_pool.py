@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+import logging
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# h2 comes with httpx[http2] in requirements.txt; without it a bare checkout falls back to HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Per-upstream pool sizing; override with <NAME>_MAX_CONNECTIONS,
+# <NAME>_MAX_KEEPALIVE and <NAME>_CONCURRENCY (e.g. LINERA_CONCURRENCY=8)
+UPSTREAM_DEFAULTS = {
+    "ipfs": {"max_connections": 20, "max_keepalive": 10, "concurrency": 16},
+    "ipfs_gateway": {"max_connections": 20, "max_keepalive": 10, "concurrency": 16},
+    "linera": {"max_connections": 10, "max_keepalive": 5, "concurrency": 8},
+}
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+
+def upstream_config(name: str) -> Dict[str, int]:
+    defaults = UPSTREAM_DEFAULTS.get(name, {"max_connections": 10, "max_keepalive": 5, "concurrency": 10})
+    prefix = name.upper()
+    return {
+        key: int(os.getenv(f"{prefix}_{key.upper()}", value))
+        for key, value in defaults.items()
+    }
+
+
+class UpstreamPool:
+    """Keep-alive client, concurrency limit and counters for one upstream"""
+
+    def __init__(self, name: str, max_connections: int, max_keepalive: int, concurrency: int):
+        self.name = name
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def open(self):
+        self.client = httpx.AsyncClient(limits=self.limits, http2=HTTP2_AVAILABLE)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def open_connections(self) -> int:
+        pool = getattr(getattr(self.client, "_transport", None), "_pool", None)
+        return len(getattr(pool, "connections", []) or [])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shared": self.client is not None,
+            "http2": HTTP2_AVAILABLE,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "concurrency": self.concurrency,
+            "open_connections": self.open_connections(),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "avg_wait_ms": round(self.total_wait_ms / self.requests, 2) if self.requests else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+class HTTPClientPool:
+    """Application-scoped HTTP clients, one keep-alive pool per upstream.
+
+    `start` and `close` are called from the FastAPI lifespan. Outside of it
+    (scripts, tests) `client` falls back to a short-lived client per call.
+    """
+
+    def __init__(self):
+        self.upstreams: Dict[str, UpstreamPool] = {}
+        self.started = False
+
+    def upstream(self, name: str) -> UpstreamPool:
+        if name not in self.upstreams:
+            self.upstreams[name] = UpstreamPool(name, **upstream_config(name))
+            if self.started:
+                self.upstreams[name].open()
+        return self.upstreams[name]
+
+    async def start(self):
+        for name in UPSTREAM_DEFAULTS:
+            self.upstream(name)
+        for upstream in self.upstreams.values():
+            upstream.open()
+        self.started = True
+        logger.info(f"HTTP client pools started (http2={'on' if HTTP2_AVAILABLE else 'off'})")
+        if not HTTP2_AVAILABLE:
+            logger.warning("h2 is not installed (httpx[http2]); upstream requests use HTTP/1.1 without multiplexing")
+
+    async def close(self):
+        self.started = False
+        await asyncio.gather(*[upstream.close() for upstream in self.upstreams.values()])
+
+    @asynccontextmanager
+    async def client(self, name: str, timeout: float) -> AsyncIterator[httpx.AsyncClient]:
+        """Borrow a client for `name`, waiting for a free concurrency slot.
+
+        Callers pass `timeout` on each request as well, since the shared client
+        is used by calls with different timeouts.
+        """
+        upstream = self.upstream(name)
+        started = time.monotonic()
+        upstream.waiting += 1
+        try:
+            await upstream.semaphore.acquire()
+        finally:
+            upstream.waiting -= 1
+        wait_ms = (time.monotonic() - started) * 1000
+        upstream.requests += 1
+        upstream.total_wait_ms += wait_ms
+        upstream.max_wait_ms = max(upstream.max_wait_ms, wait_ms)
+        upstream.in_flight += 1
+        try:
+            if upstream.client is not None:
+                yield upstream.client
+            else:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    yield client
+        finally:
+            upstream.in_flight -= 1
+            upstream.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+
+
+http_pool = HTTPClientPool()
@@ -0,0 +1,169 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+from jobs.queue import VERIFY_JOB_RETENTION
+
+logger = logging.getLogger(__name__)
+
+NEWEST_FIRST = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+# Indexes each collection needs, one per lookup or filter + sort pattern.
+# Compound indexes end with the list endpoints' keyset sort so a page is
+# read straight off the index without an in-memory sort.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "events": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(NEWEST_FIRST, name="newest"),
+        IndexModel([("status", ASCENDING), *NEWEST_FIRST], name="status_newest"),
+        IndexModel([("category", ASCENDING), *NEWEST_FIRST], name="category_newest"),
+        IndexModel([("status", ASCENDING), ("category", ASCENDING), *NEWEST_FIRST], name="status_category_newest"),
+        IndexModel([("status", ASCENDING), ("resolved_at", ASCENDING), ("id", ASCENDING)], name="status_resolved"),
+    ],
+    "markets": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(NEWEST_FIRST, name="newest"),
+        IndexModel([("status", ASCENDING), *NEWEST_FIRST], name="status_newest"),
+        IndexModel([("event_id", ASCENDING)], name="event_id"),
+        IndexModel([("status", ASCENDING), ("resolved_at", ASCENDING), ("id", ASCENDING)], name="status_resolved"),
+    ],
+    "predictions": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_address", ASCENDING), *NEWEST_FIRST], name="user_newest"),
+        IndexModel([("market_id", ASCENDING), ("status", ASCENDING), ("id", ASCENDING)], name="market_status_id"),
+        IndexModel(NEWEST_FIRST, name="newest"),
+        IndexModel([("market_id", ASCENDING), *NEWEST_FIRST], name="market_newest"),
+        IndexModel([("settled_at", ASCENDING), ("id", ASCENDING)], name="settled"),
+    ],
+    "strategies": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("is_public", ASCENDING), ("followers", DESCENDING), ("id", DESCENDING)], name="public_by_followers"),
+    ],
+    "users": [
+        IndexModel([("wallet_address", ASCENDING)], unique=True, name="wallet_address_unique"),
+    ],
+    "rollups": [
+        IndexModel([("dimension", ASCENDING), ("resolution", ASCENDING), ("bucket", ASCENDING)],
+                   unique=True, name="dimension_resolution_bucket"),
+        IndexModel([("resolution", ASCENDING), ("bucket", ASCENDING)], name="resolution_bucket"),
+    ],
+    "settlements": [
+        IndexModel([("market_id", ASCENDING)], unique=True, name="market_id_unique"),
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+    "odds_history": [
+        IndexModel([("market_id", ASCENDING), ("bucket", ASCENDING)], name="market_bucket"),
+    ],
+    # Default names: the queue used to create these itself at startup
+    "verification_jobs": [
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        IndexModel([("id", ASCENDING)], unique=True),
+        # At most one open job per event (`enqueue` relies on it); $in in a partial filter needs MongoDB 6.0+
+        IndexModel([("event_id", ASCENDING)], unique=True, name="event_id_open_unique",
+                   partialFilterExpression={"event_id": {"$exists": True}, "status": {"$in": ["queued", "running"]}}),
+        # Only done and failed jobs have finished_at, so only they expire
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=VERIFY_JOB_RETENTION, name="finished_ttl"),
+    ],
+}
+
+# Query shapes issued by the API routes, checked by `explain_queries`
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"route": "GET /events", "collection": "events", "filter": {}, "sort": NEWEST_FIRST},
+    {"route": "GET /events?status", "collection": "events", "filter": {"status": "verified"}, "sort": NEWEST_FIRST},
+    {"route": "GET /events?category", "collection": "events", "filter": {"category": "crypto"}, "sort": NEWEST_FIRST},
+    {"route": "GET /events?status&category", "collection": "events",
+     "filter": {"status": "verified", "category": "crypto"}, "sort": NEWEST_FIRST},
+    {"route": "GET /events?from&to", "collection": "events",
+     "filter": {"created_at": {"$gte": datetime(2025, 1, 1), "$lt": datetime(2025, 2, 1)}}, "sort": NEWEST_FIRST},
+    {"route": "GET /events/{id}", "collection": "events", "filter": {"id": "example"}},
+    {"route": "GET /markets", "collection": "markets", "filter": {}, "sort": NEWEST_FIRST},
+    {"route": "GET /markets?status", "collection": "markets", "filter": {"status": "active"}, "sort": NEWEST_FIRST},
+    {"route": "GET /markets/{id}", "collection": "markets", "filter": {"id": "example"}},
+    {"route": "GET /predictions", "collection": "predictions", "filter": {"user_address": "0xexample"}, "sort": NEWEST_FIRST},
+    {"route": "GET /strategies", "collection": "strategies", "filter": {"is_public": True},
+     "sort": [("followers", DESCENDING), ("id", DESCENDING)]},
+    {"route": "GET /strategies/{id}", "collection": "strategies", "filter": {"id": "example"}},
+    {"route": "settlement chunk", "collection": "predictions", "filter": {"market_id": "example", "status": "active"},
+     "sort": [("id", ASCENDING)]},
+    {"route": "GET /export/events", "collection": "events", "filter": {}, "sort": [("created_at", ASCENDING), ("id", ASCENDING)]},
+    {"route": "GET /export/predictions?market_id", "collection": "predictions", "filter": {"market_id": "example"},
+     "sort": [("created_at", ASCENDING), ("id", ASCENDING)]},
+    {"route": "snapshot events", "collection": "events",
+     "filter": {"status": "verified", "resolved_at": {"$gt": datetime(2025, 1, 1)}},
+     "sort": [("resolved_at", ASCENDING), ("id", ASCENDING)]},
+    {"route": "snapshot predictions", "collection": "predictions",
+     "filter": {"status": {"$in": ["won", "lost", "refunded"]}, "settled_at": {"$gt": datetime(2025, 1, 1)}},
+     "sort": [("settled_at", ASCENDING), ("id", ASCENDING)]},
+    {"route": "POST /auth/verify", "collection": "users", "filter": {"wallet_address": "0xexample"}},
+    {"route": "GET /analytics/timeseries", "collection": "rollups",
+     "filter": {"dimension": "all", "resolution": {"$in": ["minute", "hour"]}, "bucket": {"$gte": datetime(2025, 1, 1)}}},
+    {"route": "GET /odds/{market_id}", "collection": "odds_history",
+     "filter": {"market_id": "example", "bucket": {"$gte": datetime(2025, 1, 1)}}, "sort": [("bucket", ASCENDING)]},
+]
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create the declared indexes; existing ones are left untouched.
+
+    A failure on one collection (e.g. duplicates blocking a unique index) is
+    logged and does not stop the others or the application. When Mongo is
+    unreachable the remaining collections are skipped instead of each
+    waiting out server selection.
+    """
+    created = {name: [] for name in INDEXES}
+    for name, indexes in INDEXES.items():
+        try:
+            created[name] = await db[name].create_indexes(indexes)
+        except ConnectionFailure as e:
+            logger.error(f"Could not create indexes, Mongo is unreachable: {str(e)}")
+            break
+        except PyMongoError as e:
+            logger.error(f"Could not create indexes on {name}: {str(e)}")
+    return created
+
+
+def plan_stages(plan: Dict[str, Any]) -> List[str]:
+    """Stage names of a winning plan, outermost first"""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            for child in plan["inputStages"]:
+                stages.extend(plan_stages(child))
+            break
+        else:
+            break
+    return stages
+
+
+def summarize_plan(shape: Dict[str, Any], explained: Dict[str, Any]) -> Dict[str, Any]:
+    planner = explained.get("queryPlanner", {})
+    stages = plan_stages(planner.get("winningPlan", {}))
+    execution = explained.get("executionStats", {})
+    return {
+        "route": shape["route"],
+        "collection": shape["collection"],
+        "stages": stages,
+        "collection_scan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+    }
+
+
+async def explain_queries(db, shapes: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Explain each route's query shape and flag collection scans and in-memory sorts"""
+    results = []
+    for shape in shapes or QUERY_SHAPES:
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        explained = await cursor.limit(1).explain()
+        results.append(summarize_plan(shape, explained))
+    return results
@@ -0,0 +1,148 @@
+import os
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "500"))
+INGEST_MAX_ITEMS = int(os.getenv("INGEST_MAX_ITEMS", "10000"))
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class IngestError(ValueError):
+    """The request body as a whole is unusable (not per-item)"""
+
+
+class InvalidItem:
+    """Placeholder for an NDJSON line that cannot be ingested (bad JSON, over the limit)"""
+
+    def __init__(self, message: str):
+        self.message = message
+
+
+def is_ndjson(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in NDJSON_TYPES
+
+
+def json_items(body: bytes) -> List[Any]:
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        raise IngestError(f"Body is not valid JSON: {str(e)}")
+    if not isinstance(items, list):
+        raise IngestError("Body must be a JSON array (or NDJSON with Content-Type: application/x-ndjson)")
+    return items
+
+
+async def ndjson_items(chunks: AsyncIterator[bytes], limit: int = INGEST_MAX_ITEMS) -> AsyncIterator[Any]:
+    """One item per non-empty line, parsed as the body streams in.
+
+    Chunks before the limit may already be written, so going over it is
+    reported as an error on the first extra item instead of failing the
+    whole request; the rest of the body is not read.
+    """
+    buffer = b""
+    count = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if not line.strip():
+                continue
+            if count >= limit:
+                yield InvalidItem(f"Item limit of {limit} reached; the rest of the body was not read")
+                return
+            count += 1
+            yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer) if count < limit else InvalidItem(f"Item limit of {limit} reached")
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return InvalidItem(f"Invalid JSON: {str(e)}")
+
+
+async def batches(items, size: Optional[int] = None) -> AsyncIterator[List[Tuple[int, Any]]]:
+    """Group (index, item) pairs into chunks of `size`; accepts a list or an async iterator"""
+    size = size or INGEST_CHUNK_SIZE
+    if isinstance(items, list):
+        for start in range(0, len(items), size):
+            yield list(enumerate(items[start:start + size], start))
+        return
+    batch: List[Tuple[int, Any]] = []
+    index = 0
+    async for item in items:
+        batch.append((index, item))
+        index += 1
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate(batch: List[Tuple[int, Any]], build: Callable[[Any], Dict[str, Any]]):
+    """Build the documents of a chunk; an item `build` rejects becomes an error, not a 500"""
+    docs: List[Tuple[int, Dict[str, Any]]] = []
+    errors: List[Dict[str, Any]] = []
+    for index, item in batch:
+        if isinstance(item, InvalidItem):
+            errors.append({"index": index, "errors": [{"msg": item.message}]})
+            continue
+        try:
+            docs.append((index, build(item)))
+        except ValidationError as e:
+            errors.append({"index": index, "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+        except (ValueError, TypeError, KeyError, ArithmeticError) as e:
+            errors.append({"index": index, "errors": [{"msg": str(e) or type(e).__name__}]})
+    return docs, errors
+
+
+async def insert_chunk(collection, docs: List[Tuple[int, Dict[str, Any]]]):
+    """Unordered `insert_many`: one failing document does not stop the others.
+
+    Returns the inserted documents (without `_id`) and an error per rejected one.
+    """
+    if not docs:
+        return [], []
+    failed: Dict[int, str] = {}
+    try:
+        await collection.insert_many([doc for _, doc in docs], ordered=False)
+    except BulkWriteError as e:
+        if e.details.get("writeConcernErrors"):
+            raise
+        failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+
+    inserted, errors = [], []
+    for position, (index, doc) in enumerate(docs):
+        doc.pop("_id", None)
+        if position in failed:
+            errors.append({"index": index, "errors": [{"msg": failed[position]}]})
+        else:
+            inserted.append(doc)
+    return inserted, errors
+
+
+class IngestReport:
+    def __init__(self):
+        self.received = 0
+        self.ids: List[str] = []
+        self.errors: List[Dict[str, Any]] = []
+
+    def add(self, received: int, inserted: List[Dict[str, Any]], errors: List[Dict[str, Any]]):
+        self.received += received
+        self.ids.extend(doc["id"] for doc in inserted)
+        self.errors.extend(errors)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "inserted": len(self.ids),
+            "failed": len(self.errors),
+            "ids": self.ids,
+            "errors": sorted(self.errors, key=lambda error: error["index"]),
+        }
@@ -1,11 +1,16 @@
 import os
 import json
+import asyncio
 import httpx
 from typing import Dict, Any
 
+from http_pool import http_pool
+from resilience import guards, server_error, ResilienceError
+
 IPFS_API_URL = os.getenv("IPFS_API_URL", "https://ipfs.infura.io:5001")
 IPFS_GATEWAY_URL = os.getenv("IPFS_GATEWAY_URL", "https://ipfs.io/ipfs")
-TIMEOUT = 30.0
+TIMEOUT = 30.0  # upper bound; calls use the guard's adaptive timeout
+HEALTH_TIMEOUT = 5.0
 
 
 class IPFSClientError(Exception):
@@ -22,26 +27,31 @@ async def upload_json(data: Dict[str, Any]) -> str:
     try:
         json_str = json.dumps(data, indent=2)
         
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            files = {"file": ("data.json", json_str, "application/json")}
-            response = await client.post(
-                f"{IPFS_API_URL}/api/v0/add",
-                files=files
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                cid = result.get("Hash")
-                if not cid:
-                    raise IPFSClientError("No CID in response")
-                return cid
-            else:
-                raise IPFSClientError(f"HTTP {response.status_code}: {response.text}")
+        async def post(timeout: float):
+            async with http_pool.client("ipfs", timeout) as client:
+                files = {"file": ("data.json", json_str, "application/json")}
+                return await client.post(
+                    f"{IPFS_API_URL}/api/v0/add",
+                    files=files,
+                    timeout=timeout
+                )
+        
+        response = await guards.get("ipfs").call(post, failed=server_error)
+        if response.status_code == 200:
+            result = response.json()
+            cid = result.get("Hash")
+            if not cid:
+                raise IPFSClientError("No CID in response")
+            return cid
+        else:
+            raise IPFSClientError(f"HTTP {response.status_code}: {response.text}")
                 
-    except httpx.TimeoutException:
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         raise IPFSClientError("IPFS upload timeout")
     except httpx.RequestError as e:
         raise IPFSClientError(f"IPFS request failed: {str(e)}")
+    except ResilienceError as e:
+        raise IPFSClientError(f"IPFS unavailable: {str(e)}")
 
 
 async def get_json(cid: str) -> Dict[str, Any]:
@@ -52,25 +62,29 @@ async def get_json(cid: str) -> Dict[str, Any]:
         dict: JSON data
     """
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-            response = await client.get(f"{IPFS_GATEWAY_URL}/{cid}")
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise IPFSClientError(f"HTTP {response.status_code}: {response.text}")
+        async def get(timeout: float):
+            async with http_pool.client("ipfs_gateway", timeout) as client:
+                return await client.get(f"{IPFS_GATEWAY_URL}/{cid}", timeout=timeout)
+        
+        response = await guards.get("ipfs_gateway").call(get, failed=server_error)
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise IPFSClientError(f"HTTP {response.status_code}: {response.text}")
                 
-    except httpx.TimeoutException:
+    except (httpx.TimeoutException, asyncio.TimeoutError):
         raise IPFSClientError("IPFS retrieval timeout")
     except httpx.RequestError as e:
         raise IPFSClientError(f"IPFS request failed: {str(e)}")
+    except ResilienceError as e:
+        raise IPFSClientError(f"IPFS gateway unavailable: {str(e)}")
 
 
 async def check_health() -> bool:
     """Check if IPFS service is available."""
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(f"{IPFS_API_URL}/api/v0/version")
+        async with http_pool.client("ipfs", HEALTH_TIMEOUT) as client:
+            response = await client.post(f"{IPFS_API_URL}/api/v0/version", timeout=HEALTH_TIMEOUT)
             return response.status_code == 200
     except Exception:
         return False
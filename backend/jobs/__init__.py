@@ -0,0 +1,3 @@
+from .queue import VerificationJobQueue
+
+__all__ = ["VerificationJobQueue"]
@@ -0,0 +1,324 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+VERIFY_WORKERS = int(os.getenv("VERIFY_WORKERS", "4"))
+VERIFY_MAX_ATTEMPTS = int(os.getenv("VERIFY_MAX_ATTEMPTS", "3"))
+VERIFY_BACKOFF_BASE = float(os.getenv("VERIFY_BACKOFF_BASE", "2.0"))
+VERIFY_BACKOFF_MAX = float(os.getenv("VERIFY_BACKOFF_MAX", "300"))
+VERIFY_LEASE_SECONDS = float(os.getenv("VERIFY_LEASE_SECONDS", "300"))
+VERIFY_JOB_RETENTION = int(os.getenv("VERIFY_JOB_RETENTION", str(7 * 24 * 3600)))
+POLL_INTERVAL = 1.0
+THROUGHPUT_WINDOW = 60.0
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+FailureHandler = Callable[[Dict[str, Any], str], Awaitable[None]]
+
+
+class VerificationJobQueue:
+    """Persistent verification queue backed by a Mongo collection.
+
+    Jobs move through queued -> running -> done | failed. A running job holds a
+    lease that its worker renews while the handler runs; a job whose lease has
+    expired (worker crashed, process restarted) is put back in the queue by
+    `reclaim_orphans`, which the first worker runs as it starts and
+    periodically afterwards. The collection's indexes are declared in
+    `indexes.py`, so starting the queue does not wait on Mongo.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: JobHandler,
+        on_failure: Optional[FailureHandler] = None,
+        concurrency: int = VERIFY_WORKERS,
+        max_attempts: int = VERIFY_MAX_ATTEMPTS,
+        backoff_base: float = VERIFY_BACKOFF_BASE,
+        backoff_max: float = VERIFY_BACKOFF_MAX,
+        lease_seconds: float = VERIFY_LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        self.collection = collection
+        self.handler = handler
+        self.on_failure = on_failure
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._workers: list = []
+        self._wakeup = asyncio.Event()
+        self._running = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._retried = 0
+        self._finished_at: deque = deque()
+        self._durations: deque = deque(maxlen=500)
+
+    async def enqueue(self, event_id: str) -> Dict[str, Any]:
+        """Queue a verification for `event_id`.
+
+        If the event already has a queued or running job, that job is returned
+        instead of creating a duplicate. A partial unique index backs this up:
+        when a concurrent call inserts first, the upsert fails with a duplicate
+        key and the retry finds that call's job.
+        """
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": "event",
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "run_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        for attempt in range(3):
+            try:
+                existing = await self.collection.find_one_and_update(
+                    {"event_id": event_id, "status": {"$in": ["queued", "running"]}},
+                    {"$setOnInsert": job},
+                    upsert=True,
+                    projection={"_id": 0},
+                    return_document=ReturnDocument.AFTER,
+                )
+                break
+            except DuplicateKeyError:
+                if attempt == 2:
+                    raise
+        self._wakeup.set()
+        return existing
+
+    async def enqueue_batch(self, event_ids: List[str]) -> Dict[str, Any]:
+        """Queue one job that verifies all of `event_ids` together."""
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": "batch",
+            "event_ids": list(event_ids),
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": self.max_attempts,
+            "run_at": now,
+            "created_at": now,
+            "last_error": None,
+        }
+        await self.collection.insert_one(dict(job))
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"id": job_id}, {"_id": 0})
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._workers = [
+            asyncio.create_task(self._worker_loop(n)) for n in range(self.concurrency)
+        ]
+        logger.info(f"Verification queue started with {self.concurrency} workers ({self.worker_id})")
+
+    async def stop(self):
+        self._running = False
+        self._wakeup.set()
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def reclaim_orphans(self) -> int:
+        """Requeue running jobs whose lease has expired.
+
+        A job that already used all its attempts is failed instead, so one
+        that reliably kills or hangs its worker is not retried forever.
+        """
+        now = datetime.now(timezone.utc)
+        expired = {"status": "running", "lease_expires_at": {"$lt": now}}
+        exhausted = {"$expr": {"$gte": ["$attempts", {"$ifNull": ["$max_attempts", self.max_attempts]}]}}
+        failed = 0
+        for job in await self.collection.find({**expired, **exhausted}, {"_id": 0}).to_list(None):
+            error = f"Lease expired on attempt {job.get('attempts')}; the worker died or hung"
+            claimed = await self.collection.find_one_and_update(
+                {"id": job["id"], **expired},
+                {"$set": {"status": "failed", "finished_at": now, "last_error": error}},
+                projection={"_id": 0},
+            )
+            if claimed is None:
+                continue  # another worker reclaimed it first
+            logger.error(f"Verification job {job['id']} failed: {error}")
+            failed += 1
+            self._failed += 1
+            if self.on_failure:
+                await self.on_failure(claimed, error)
+
+        result = await self.collection.update_many(
+            {**expired, "$expr": {"$lt": ["$attempts", {"$ifNull": ["$max_attempts", self.max_attempts]}]}},
+            {"$set": {"status": "queued", "run_at": now, "worker_id": None}},
+        )
+        return result.modified_count + failed
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"status": "queued", "run_at": {"$lte": now}},
+            {
+                "$set": {
+                    "status": "running",
+                    "worker_id": self.worker_id,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", ASCENDING)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _worker_loop(self, n: int):
+        last_reclaim = None
+        while self._running:
+            try:
+                if n == 0 and (last_reclaim is None or time.monotonic() - last_reclaim > self.lease_seconds / 2):
+                    last_reclaim = time.monotonic()
+                    reclaimed = await self.reclaim_orphans()
+                    if reclaimed:
+                        logger.info(f"Reclaimed {reclaimed} orphaned verification jobs")
+
+                job = await self._claim()
+                if job is None:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Verification worker {n} error: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.collection.update_one(
+                {"id": job_id, "worker_id": self.worker_id, "status": "running"},
+                {"$set": {"lease_expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}},
+            )
+
+    def backoff_delay(self, attempts: int) -> float:
+        return min(self.backoff_base ** attempts, self.backoff_max)
+
+    async def _run(self, job: Dict[str, Any]):
+        self._in_flight += 1
+        started = time.monotonic()
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            await self.handler(job)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            await self._handle_failure(job, error)
+        else:
+            result = await self.collection.update_one(
+                {"id": job["id"], "worker_id": self.worker_id, "status": "running"},
+                {"$set": {
+                    "status": "done",
+                    "finished_at": datetime.now(timezone.utc),
+                    "duration_ms": round((time.monotonic() - started) * 1000, 2),
+                }},
+            )
+            if result.matched_count == 0:
+                logger.warning(f"Verification job {job['id']} finished after its lease was reclaimed")
+            self._completed += 1
+            self._durations.append(time.monotonic() - started)
+            self._finished_at.append(time.monotonic())
+        finally:
+            heartbeat.cancel()
+            self._in_flight -= 1
+
+    async def _handle_failure(self, job: Dict[str, Any], error: str):
+        attempts = job.get("attempts", 1)
+        if attempts < job.get("max_attempts", self.max_attempts):
+            delay = self.backoff_delay(attempts)
+            logger.warning(f"Verification job {job['id']} attempt {attempts} failed, retrying in {delay}s: {error}")
+            await self.collection.update_one(
+                {"id": job["id"], "worker_id": self.worker_id, "status": "running"},
+                {"$set": {
+                    "status": "queued",
+                    "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    "last_error": error,
+                    "worker_id": None,
+                }},
+            )
+            self._retried += 1
+            return
+
+        result = await self.collection.update_one(
+            {"id": job["id"], "worker_id": self.worker_id, "status": "running"},
+            {"$set": {
+                "status": "failed",
+                "finished_at": datetime.now(timezone.utc),
+                "last_error": error,
+            }},
+        )
+        if result.matched_count == 0:
+            # Lease lost: the job was reclaimed and another run now owns its outcome
+            logger.warning(f"Verification job {job['id']} failed after its lease was reclaimed: {error}")
+            return
+        logger.error(f"Verification job {job['id']} failed after {attempts} attempts: {error}")
+        self._failed += 1
+        if self.on_failure:
+            await self.on_failure(job, error)
+
+    def _throughput_per_minute(self) -> float:
+        cutoff = time.monotonic() - THROUGHPUT_WINDOW
+        while self._finished_at and self._finished_at[0] < cutoff:
+            self._finished_at.popleft()
+        return len(self._finished_at) * 60.0 / THROUGHPUT_WINDOW
+
+    async def stats(self) -> Dict[str, Any]:
+        """Queue depth by status plus this process's worker throughput."""
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        async for row in self.collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+
+        now = datetime.now(timezone.utc)
+        ready = await self.collection.count_documents({"status": "queued", "run_at": {"$lte": now}})
+        durations = list(self._durations)
+
+        return {
+            "queue_depth": counts["queued"],
+            "ready": ready,
+            "delayed": counts["queued"] - ready,
+            "by_status": counts,
+            "workers": {
+                "id": self.worker_id,
+                "concurrency": self.concurrency,
+                "running": self._running,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "retried": self._retried,
+                "throughput_per_minute": self._throughput_per_minute(),
+                "avg_duration_ms": round(sum(durations) / len(durations) * 1000, 2) if durations else 0.0,
+            },
+        }
@@ -1,3 +1,4 @@
-from .client import publish_event, get_block_height
+from .client import publish_event, publish_events, get_block_height
+from .publisher import OracleFeedPublisher
 
-__all__ = ["publish_event", "get_block_height"]
+__all__ = ["publish_event", "publish_events", "get_block_height", "OracleFeedPublisher"]
@@ -2,18 +2,77 @@ import os
 import time
 import asyncio
 import httpx
-from typing import Dict, List
+from typing import Any, Dict, List
+
+from http_pool import http_pool
+from resilience import guards, server_error, ResilienceError
 
 LINERA_SERVICE_URL = os.getenv("LINERA_TESTNET_SERVICE_URL", "https://rpc.testnet.linera.net")
 ORACLE_APP_ID = os.getenv("LINERA_ORACLEFEED_APP_ID", "")
 MAX_RETRIES = 3
-TIMEOUT = 30.0
+TIMEOUT = 30.0  # upper bound; calls use the guard's adaptive timeout
+HEALTH_TIMEOUT = 10.0
 
 
 class LineraClientError(Exception):
     pass
 
 
+def _graphql_url() -> str:
+    if not ORACLE_APP_ID:
+        raise LineraClientError("LINERA_ORACLEFEED_APP_ID not configured")
+    
+    # Get default chain ID from wallet (mock for now)
+    chain_id = os.getenv("LINERA_CHAIN_ID", "default_chain")
+    
+    return f"{LINERA_SERVICE_URL}/chains/{chain_id}/applications/{ORACLE_APP_ID}"
+
+
+async def _post_graphql(graphql_url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a GraphQL request, retrying server errors with exponential backoff.
+    
+    Retries stop as soon as the Linera circuit breaker opens.
+    """
+    async def post(timeout: float):
+        async with http_pool.client("linera", timeout) as client:
+            return await client.post(
+                graphql_url,
+                json=payload,
+                headers={"Content-Type": "application/json"},
+                timeout=timeout
+            )
+    
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = await guards.get("linera").call(post, failed=server_error)
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code >= 500:
+                # Retry on server errors
+                if attempt < MAX_RETRIES - 1:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise LineraClientError(f"Server error: {response.status_code}")
+            else:
+                raise LineraClientError(f"HTTP {response.status_code}: {response.text}")
+                    
+        except ResilienceError as e:
+            raise LineraClientError(f"Linera unavailable: {str(e)}")
+        except (httpx.TimeoutException, asyncio.TimeoutError):
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            raise LineraClientError("Request timeout")
+        except httpx.RequestError as e:
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            raise LineraClientError(f"Request failed: {str(e)}")
+    
+    raise LineraClientError("Max retries exceeded")
+
+
 async def publish_event(
     event_id: str,
     payload_hash: str,
@@ -27,14 +86,9 @@ async def publish_event(
     Returns:
         dict: {"tx_hash": str, "chain_id": str}
     """
-    if not ORACLE_APP_ID:
-        raise LineraClientError("LINERA_ORACLEFEED_APP_ID not configured")
-    
-    # Get default chain ID from wallet (mock for now)
+    graphql_url = _graphql_url()
     chain_id = os.getenv("LINERA_CHAIN_ID", "default_chain")
     
-    graphql_url = f"{LINERA_SERVICE_URL}/chains/{chain_id}/applications/{ORACLE_APP_ID}"
-    
     mutation = """
     mutation PublishEvent($eventId: String!, $payloadHash: String!, $confidence: Float!, $sources: [String!]!, $cid: String!) {
         publishEvent(
@@ -55,61 +109,88 @@ async def publish_event(
         "cid": cid
     }
     
-    payload = {
-        "query": mutation,
-        "variables": variables
+    data = await _post_graphql(graphql_url, {"query": mutation, "variables": variables})
+    if "errors" in data:
+        raise LineraClientError(f"GraphQL error: {data['errors']}")
+    
+    # Mock tx_hash from response
+    tx_hash = f"tx_{event_id}_{int(time.time())}"
+    
+    return {
+        "tx_hash": tx_hash,
+        "chain_id": chain_id
     }
+
+
+async def publish_events(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Publish several events to OracleFeed in one GraphQL request.
     
-    # Retry with exponential backoff
-    for attempt in range(MAX_RETRIES):
-        try:
-            async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-                response = await client.post(
-                    graphql_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if "errors" in data:
-                        raise LineraClientError(f"GraphQL error: {data['errors']}")
-                    
-                    # Mock tx_hash from response
-                    tx_hash = f"tx_{event_id}_{int(time.time())}"
-                    
-                    return {
-                        "tx_hash": tx_hash,
-                        "chain_id": chain_id
-                    }
-                elif response.status_code >= 500:
-                    # Retry on server errors
-                    if attempt < MAX_RETRIES - 1:
-                        await asyncio.sleep(2 ** attempt)
-                        continue
-                    raise LineraClientError(f"Server error: {response.status_code}")
-                else:
-                    raise LineraClientError(f"HTTP {response.status_code}: {response.text}")
-                    
-        except httpx.TimeoutException:
-            if attempt < MAX_RETRIES - 1:
-                await asyncio.sleep(2 ** attempt)
-                continue
-            raise LineraClientError("Request timeout")
-        except httpx.RequestError as e:
-            if attempt < MAX_RETRIES - 1:
-                await asyncio.sleep(2 ** attempt)
-                continue
-            raise LineraClientError(f"Request failed: {str(e)}")
+    Each event is a dict with the keyword arguments of `publish_event`. The
+    request carries one aliased `publishEvent` field per event, so a failure
+    of one event does not fail the others.
     
-    raise LineraClientError("Max retries exceeded")
+    Returns:
+        list: per input event, {"ok": True, "tx_hash": str, "chain_id": str}
+              or {"ok": False, "error": str}
+    """
+    if not events:
+        return []
+    
+    graphql_url = _graphql_url()
+    chain_id = os.getenv("LINERA_CHAIN_ID", "default_chain")
+    
+    params, fields, variables = [], [], {}
+    for i, event in enumerate(events):
+        params.append(
+            f"$eventId{i}: String!, $payloadHash{i}: String!, $confidence{i}: Float!, "
+            f"$sources{i}: [String!]!, $cid{i}: String!"
+        )
+        fields.append(
+            f"e{i}: publishEvent(eventId: $eventId{i}, payloadHash: $payloadHash{i}, "
+            f"confidence: $confidence{i}, sources: $sources{i}, cid: $cid{i})"
+        )
+        variables.update({
+            f"eventId{i}": event["event_id"],
+            f"payloadHash{i}": event["payload_hash"],
+            f"confidence{i}": event["confidence"],
+            f"sources{i}": event["sources"],
+            f"cid{i}": event["cid"]
+        })
+    
+    mutation = f"mutation PublishEvents({', '.join(params)}) {{\n    " + "\n    ".join(fields) + "\n}"
+    
+    data = await _post_graphql(graphql_url, {"query": mutation, "variables": variables})
+    
+    errors_by_alias: Dict[str, str] = {}
+    for error in data.get("errors") or []:
+        path = error.get("path") or []
+        if not path:
+            # Request-level error (e.g. validation): nothing was applied
+            raise LineraClientError(f"GraphQL error: {data['errors']}")
+        errors_by_alias[path[0]] = error.get("message", str(error))
+    
+    results = (data.get("data") or {})
+    timestamp = int(time.time())
+    published = []
+    for i, event in enumerate(events):
+        alias = f"e{i}"
+        if alias in errors_by_alias or results.get(alias) is None:
+            published.append({"ok": False, "error": errors_by_alias.get(alias, "No result for event")})
+        else:
+            published.append({
+                "ok": True,
+                "tx_hash": f"tx_{event['event_id']}_{timestamp}",
+                "chain_id": chain_id
+            })
+    return published
 
 
 async def get_block_height() -> int:
     """Get current block height from Linera testnet."""
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{LINERA_SERVICE_URL}/health")
+        async with http_pool.client("linera", HEALTH_TIMEOUT) as client:
+            response = await client.get(f"{LINERA_SERVICE_URL}/health", timeout=HEALTH_TIMEOUT)
             if response.status_code == 200:
                 data = response.json()
                 return data.get("block_height", 0)
@@ -0,0 +1,118 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from .client import publish_events, LineraClientError
+
+logger = logging.getLogger(__name__)
+
+LINERA_PUBLISH_BATCH_SIZE = int(os.getenv("LINERA_PUBLISH_BATCH_SIZE", "1"))
+LINERA_PUBLISH_FLUSH_INTERVAL = float(os.getenv("LINERA_PUBLISH_FLUSH_INTERVAL", "0.25"))
+
+PublishMany = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+class OracleFeedPublisher:
+    """Coalesces OracleFeed publications into batched requests.
+
+    `publish` queues one event and waits for its own result. The queue is
+    flushed as a single request once it holds `batch_size` events or
+    `flush_interval` seconds after the first event arrived, whichever comes
+    first. A batch size of 1 disables batching.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = LINERA_PUBLISH_BATCH_SIZE,
+        flush_interval: float = LINERA_PUBLISH_FLUSH_INTERVAL,
+        publish_many: PublishMany = publish_events,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.publish_many = publish_many
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer = None
+        self._flushes: set = set()
+        self.batches_sent = 0
+        self.events_published = 0
+        self.events_failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.batch_size > 1
+
+    async def publish(
+        self,
+        event_id: str,
+        payload_hash: str,
+        confidence: float,
+        sources: List[str],
+        cid: str
+    ) -> Dict[str, str]:
+        """Same contract as `publish_event`: returns {"tx_hash", "chain_id"} or raises"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(({
+            "event_id": event_id,
+            "payload_hash": payload_hash,
+            "confidence": confidence,
+            "sources": sources,
+            "cid": cid
+        }, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+        result = await future
+        return {"tx_hash": result["tx_hash"], "chain_id": result["chain_id"]}
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        events = [event for event, _ in batch]
+        try:
+            results = await self.publish_many(events)
+        except Exception as e:
+            logger.error(f"Batched OracleFeed publish of {len(events)} events failed: {str(e)}")
+            results = [{"ok": False, "error": str(e)}] * len(events)
+        self.batches_sent += 1
+
+        for (event, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if result.get("ok"):
+                self.events_published += 1
+                future.set_result(result)
+            else:
+                self.events_failed += 1
+                future.set_exception(LineraClientError(result.get("error", "Publish failed")))
+
+    async def close(self):
+        """Flush whatever is queued and wait for in-flight batches"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "pending": len(self._pending),
+            "batches_in_flight": len(self._flushes),
+            "batches_sent": self.batches_sent,
+            "events_published": self.events_published,
+            "events_failed": self.events_failed,
+            "avg_batch_size": round((self.events_published + self.events_failed) / self.batches_sent, 2)
+            if self.batches_sent else 0.0,
+        }
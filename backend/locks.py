@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+
+async def acquire_lease(db, name: str, owner: str, seconds: float) -> bool:
+    """Take or renew the lease `name` in `db.locks`; False while another owner holds it.
+
+    An expired lease is taken over, so a worker that died does not block
+    the job for longer than `seconds`.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        await db.locks.find_one_and_update(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def release_lease(db, name: str, owner: str):
+    await db.locks.delete_one({"_id": name, "owner": owner})
@@ -0,0 +1,136 @@
+"""Verisight backend maintenance commands.
+
+Usage:
+    python manage.py verify-batch --status pending --limit 200
+    python manage.py verify-batch --ids evt1 evt2 evt3
+    python manage.py indexes --explain
+    python manage.py migrate-dates --batch-size 1000 --pause 0.1
+    python manage.py snapshot --datasets events predictions --format parquet
+"""
+import sys
+import json
+import asyncio
+import argparse
+
+
+async def verify_batch_command(args) -> int:
+    from server import db, verify_batch, batch_verifier
+
+    if args.ids:
+        event_ids = args.ids
+    else:
+        query = {"status": args.status}
+        if args.category:
+            query["category"] = args.category
+        cursor = db.events.find(query, {"_id": 0, "id": 1}).sort("created_at", 1).limit(args.limit)
+        event_ids = [event["id"] async for event in cursor]
+
+    if not event_ids:
+        print("No events to verify")
+        return 0
+
+    totals = {"verified": 0, "errors": 0, "missing": 0}
+    for start in range(0, len(event_ids), args.chunk_size):
+        chunk = event_ids[start:start + args.chunk_size]
+        await db.events.update_many({"id": {"$in": chunk}}, {"$set": {"status": "verifying"}, "$inc": {"version": 1}})
+        result = await verify_batch(chunk)
+        for key in totals:
+            totals[key] += result[key]
+        print(f"Verified {start + len(chunk)}/{len(event_ids)} events")
+
+    print(json.dumps({**totals, "llm_batching": batch_verifier.stats()}, indent=2))
+    return 1 if totals["errors"] else 0
+
+
+async def indexes_command(args) -> int:
+    from server import db
+    from indexes import ensure_indexes, explain_queries
+
+    created = await ensure_indexes(db)
+    for collection, names in created.items():
+        print(f"{collection}: {', '.join(names) or 'failed'}")
+    if not args.explain:
+        return 0
+
+    plans = await explain_queries(db)
+    for plan in plans:
+        flag = "COLLSCAN" if plan["collection_scan"] else ("SORT" if plan["in_memory_sort"] else "ok")
+        print(f"{flag:8} {plan['route']:32} {' <- '.join(plan['stages'])}")
+    return 1 if any(plan["collection_scan"] for plan in plans) else 0
+
+
+async def migrate_dates_command(args) -> int:
+    from server import db
+    from date_migration import DATE_FIELDS, count_string_dates, migrate_dates
+
+    collections = {name: DATE_FIELDS[name] for name in args.collections} if args.collections else DATE_FIELDS
+    if args.dry_run:
+        print(json.dumps(await count_string_dates(db, collections), indent=2))
+        return 0
+
+    def progress(name, result):
+        print(f"{name}: {result['converted']} converted, {result['unparseable']} unparseable in {result['batches']} batches")
+
+    results = await migrate_dates(db, collections, args.batch_size, args.pause, progress)
+    left = {name: counts for name, counts in (await count_string_dates(db, collections)).items() if any(counts.values())}
+    if left:
+        print(f"String timestamps left (pagination and from/to filters skip them): {json.dumps(left)}")
+    return 1 if any(result["unparseable"] for result in results.values()) else 0
+
+
+async def snapshot_command(args) -> int:
+    from server import db
+    from snapshots import snapshot_all, SnapshotError
+
+    try:
+        results = await snapshot_all(db, args.datasets, root=args.dir, fmt=args.format, batch_size=args.batch_size)
+    except SnapshotError as e:
+        print(f"Snapshot failed: {e}")
+        return 1
+    print(json.dumps(results, indent=2, default=str))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from date_migration import DATE_FIELDS, DATE_MIGRATION_BATCH_SIZE
+    from snapshots import DATASETS, EXTENSIONS, SNAPSHOT_BATCH_SIZE, SNAPSHOT_DIR, SNAPSHOT_FORMAT
+
+    parser = argparse.ArgumentParser(prog="manage.py", description="Verisight backend maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    verify = commands.add_parser("verify-batch", help="Verify many events with batched agent prompts")
+    verify.add_argument("--ids", nargs="+", help="Event ids to verify (default: select by --status)")
+    verify.add_argument("--status", default="pending", help="Status of the events to select")
+    verify.add_argument("--category", help="Only select events in this category")
+    verify.add_argument("--limit", type=int, default=500, help="Maximum number of events to select")
+    verify.add_argument("--chunk-size", type=int, default=100, help="Events verified per batch")
+    verify.set_defaults(handler=verify_batch_command)
+
+    indexes = commands.add_parser("indexes", help="Create the declared Mongo indexes")
+    indexes.add_argument("--explain", action="store_true", help="Explain each route's query and flag collection scans")
+    indexes.set_defaults(handler=indexes_command)
+
+    migrate = commands.add_parser("migrate-dates", help="Convert ISO-string timestamps to BSON dates in place")
+    migrate.add_argument("--collections", nargs="+", choices=sorted(DATE_FIELDS), help="Collections to migrate (default: all)")
+    migrate.add_argument("--batch-size", type=int, default=DATE_MIGRATION_BATCH_SIZE, help="Documents converted per bulk write")
+    migrate.add_argument("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    migrate.add_argument("--dry-run", action="store_true", help="Only count the string timestamps left")
+    migrate.set_defaults(handler=migrate_dates_command)
+
+    snapshot = commands.add_parser("snapshot", help="Append newly finalized records to partitioned Arrow/Parquet files")
+    snapshot.add_argument("--datasets", nargs="+", choices=sorted(DATASETS), help="Datasets to snapshot (default: all)")
+    snapshot.add_argument("--dir", default=SNAPSHOT_DIR, help="Root directory of the snapshot files")
+    snapshot.add_argument("--format", choices=sorted(EXTENSIONS), default=SNAPSHOT_FORMAT, help="File format")
+    snapshot.add_argument("--batch-size", type=int, default=SNAPSHOT_BATCH_SIZE, help="Records read per batch")
+    snapshot.set_defaults(handler=snapshot_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
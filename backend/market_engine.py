@@ -0,0 +1,150 @@
+import os
+import numbers
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+MARKET_FEE = float(os.getenv("MARKET_FEE", "0.0"))
+MARKET_SEED_LIQUIDITY = float(os.getenv("MARKET_SEED_LIQUIDITY", "100"))
+MIN_ODDS = 1.01
+
+
+class MarketError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def validate_options(options: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reject option lists the pools cannot price: raises ValueError, returns the list unchanged.
+
+    Needs at least one option, unique string ids and numeric opening odds
+    above 1 (the seed split and the odds snapshots rely on all three).
+    """
+    if not options:
+        raise ValueError("A market needs at least one option")
+    seen = set()
+    for option in options:
+        option_id = option.get("id")
+        if not isinstance(option_id, str) or not option_id:
+            raise ValueError("Every option needs a string id")
+        if option_id in seen:
+            raise ValueError(f"Duplicate option id '{option_id}'")
+        seen.add(option_id)
+        odds = option.get("odds")
+        if isinstance(odds, bool) or not isinstance(odds, numbers.Real) or not odds > 1:
+            raise ValueError(f"Option '{option_id}' needs numeric odds above 1")
+    return options
+
+
+def seed_options(options: List[Dict[str, Any]], liquidity: float = MARKET_SEED_LIQUIDITY) -> List[Dict[str, Any]]:
+    """Give each option a virtual starting pool proportional to its opening probability.
+
+    The seed keeps parimutuel odds finite before the first bet and makes the
+    opening odds move gradually instead of jumping on the first stake.
+    """
+    implied = [1 / option["odds"] if option.get("odds") else 0 for option in options]
+    total = sum(implied)
+    return [
+        {**option, "volume": option.get("volume", 0), "seed": round(liquidity * (p / total if total else 1 / len(options)), 4)}
+        for option, p in zip(options, implied)
+    ]
+
+
+def parimutuel_odds(options: List[Dict[str, Any]], fee: float = MARKET_FEE) -> Dict[str, float]:
+    """Decimal odds per option: pool after fee divided by the option's pool"""
+    pools = {option["id"]: option.get("volume", 0) + option.get("seed", 0) for option in options}
+    total = sum(pools.values())
+    return {
+        option["id"]: max(MIN_ODDS, round(total * (1 - fee) / pools[option["id"]], 4))
+        if pools[option["id"]] > 0 else option.get("odds")
+        for option in options
+    }
+
+
+def payout_ratio(options: List[Dict[str, Any]], option_id: str, fee: float = MARKET_FEE) -> Optional[float]:
+    """What one unit staked on the winning option pays at settlement.
+
+    Winners share the real pool after fee in proportion to their stakes.
+    The seed is virtual liquidity that only shapes the odds, so it is left
+    out; paying from it could pay more than was staked. None when nobody
+    staked on the winning option (settlement then refunds every stake).
+    """
+    total = sum(option.get("volume", 0) for option in options)
+    winning = sum(option.get("volume", 0) for option in options if option["id"] == option_id)
+    if winning <= 0:
+        return None
+    return total * (1 - fee) / winning
+
+
+def _pool(option: str) -> Dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"{option}.volume", 0]}, {"$ifNull": [f"{option}.seed", 0]}]}
+
+
+def bet_pipeline(option_id: str, amount: float, fee: float = MARKET_FEE) -> List[Dict[str, Any]]:
+    """Update pipeline adding `amount` to one option and repricing every option.
+
+    Mirrors `parimutuel_odds`, but runs inside Mongo so the volume change and
+    the new odds land in one atomic document update.
+    """
+    add_stake = {"$map": {"input": "$options", "as": "o", "in": {"$cond": [
+        {"$eq": ["$$o.id", option_id]},
+        {"$mergeObjects": ["$$o", {"volume": {"$add": [{"$ifNull": ["$$o.volume", 0]}, amount]}}]},
+        "$$o"
+    ]}}}
+    reprice = {"$let": {
+        "vars": {"total": {"$sum": {"$map": {"input": "$options", "as": "o", "in": _pool("$$o")}}}},
+        "in": {"$map": {"input": "$options", "as": "o", "in": {"$mergeObjects": ["$$o", {"odds": {"$cond": [
+            {"$gt": [_pool("$$o"), 0]},
+            {"$max": [MIN_ODDS, {"$round": [{"$divide": [{"$multiply": ["$$total", 1 - fee]}, _pool("$$o")]}, 4]}]},
+            "$$o.odds"
+        ]}}]}}}
+    }}
+    return [
+        {"$set": {
+            "total_volume": {"$add": [{"$ifNull": ["$total_volume", 0]}, amount]},
+            "options": add_stake,
+            "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+        }},
+        {"$set": {"options": reprice}},
+    ]
+
+
+async def place_bet(db, market_id: str, option_id: str, amount: float) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Stake `amount` on an option of an active market in one find_one_and_update.
+
+    Returns the repriced market and the chosen option. Its odds are indicative
+    only: later stakes keep moving them, and settlement pays winners their
+    share of the final pool instead (see `payout_ratio`). Raises MarketError when
+    the market is missing or inactive, or the option does not exist.
+    """
+    market = await db.markets.find_one_and_update(
+        {"id": market_id, "status": "active", "options.id": option_id},
+        bet_pipeline(option_id, amount),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if market is None:
+        raise await _rejection(db, market_id)
+    option = next(o for o in market["options"] if o["id"] == option_id)
+    return market, option
+
+
+async def refund_bet(db, market_id: str, option_id: str, amount: float) -> Optional[Dict[str, Any]]:
+    """Take a stake back out of the pools (e.g. when the prediction insert failed)"""
+    return await db.markets.find_one_and_update(
+        {"id": market_id, "options.id": option_id},
+        bet_pipeline(option_id, -amount),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _rejection(db, market_id: str) -> MarketError:
+    market = await db.markets.find_one({"id": market_id}, {"_id": 0, "status": 1})
+    if not market:
+        return MarketError(404, "Market not found")
+    if market.get("status") != "active":
+        return MarketError(400, "Market is not active")
+    return MarketError(404, "Option not found")
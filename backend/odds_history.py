@@ -0,0 +1,140 @@
+import os
+import math
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from rollups import as_utc, truncate
+
+logger = logging.getLogger(__name__)
+
+ODDS_BUCKET_MAX_POINTS = int(os.getenv("ODDS_BUCKET_MAX_POINTS", "1000"))
+ODDS_MAX_POINTS = int(os.getenv("ODDS_MAX_POINTS", "200"))
+
+# Snapshots are appended to one document per market and hour (bucket pattern);
+# a full bucket starts a new document for the same hour.
+BUCKET = "hour"
+RESOLUTIONS = {
+    "raw": None,
+    "minute": timedelta(minutes=1),
+    "five_minutes": timedelta(minutes=5),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def snapshot(market: Dict[str, Any], when: datetime) -> Dict[str, Any]:
+    options = market.get("options", [])
+    return {
+        "t": as_utc(when),
+        "odds": {option["id"]: option.get("odds") for option in options},
+        "volume": {option["id"]: option.get("volume", 0) for option in options},
+        "total_volume": market.get("total_volume", 0),
+    }
+
+
+async def record_snapshot(db, market: Dict[str, Any], when: Optional[datetime] = None):
+    """Append the market's current odds and volumes to its history.
+
+    Best-effort: a failure is logged and never fails the prediction.
+    """
+    point = snapshot(market, when or datetime.now(timezone.utc))
+    try:
+        await db.odds_history.update_one(
+            {"market_id": market["id"], "bucket": truncate(point["t"], BUCKET), "n": {"$lt": ODDS_BUCKET_MAX_POINTS}},
+            {"$push": {"points": point}, "$inc": {"n": 1}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.error(f"Failed to record odds snapshot for market {market.get('id')}: {str(e)}")
+
+
+async def record_opening_snapshots(db, markets: List[Dict[str, Any]]):
+    """Start the history of newly created markets with one insert.
+
+    Each new market gets its own first bucket, so no upsert is needed.
+    Best-effort like `record_snapshot`.
+    """
+    buckets = []
+    for market in markets:
+        point = snapshot(market, market.get("created_at") or datetime.now(timezone.utc))
+        buckets.append({"market_id": market["id"], "bucket": truncate(point["t"], BUCKET), "points": [point], "n": 1})
+    if not buckets:
+        return
+    try:
+        await db.odds_history.insert_many(buckets, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to record opening odds for {len(buckets)} markets: {str(e)}")
+
+
+def pick_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest resolution whose bucket count over the range fits in `max_points`"""
+    span = as_utc(end) - as_utc(start)
+    for name, step in RESOLUTIONS.items():
+        if step is not None and span / step <= max_points:
+            return name
+    return "day"
+
+
+def floor_time(when: datetime, step: timedelta) -> datetime:
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return epoch + ((as_utc(when) - epoch) // step) * step
+
+
+def downsample(points: List[Dict[str, Any]], resolution: str) -> List[Dict[str, Any]]:
+    """Keep the last snapshot of every `resolution` bucket, stamped with the bucket start"""
+    step = RESOLUTIONS[resolution]
+    if step is None:
+        return points
+    buckets: Dict[datetime, Dict[str, Any]] = {}
+    for point in points:
+        buckets[floor_time(point["t"], step)] = point
+    return [{**point, "t": t} for t, point in sorted(buckets.items())]
+
+
+def implied_probabilities(odds: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Decimal odds to implied probabilities, normalized to sum to 1"""
+    raw = {key: 1 / value if value else None for key, value in odds.items()}
+    total = sum(value for value in raw.values() if value)
+    return {key: round(value / total, 4) if value and total else None for key, value in raw.items()}
+
+
+def implied_volatility(points: List[Dict[str, Any]], option_id: str) -> float:
+    """Standard deviation of one option's implied probability over the points"""
+    values = [p["probabilities"].get(option_id) for p in points]
+    values = [value for value in values if value is not None]
+    if len(values) < 2:
+        return 0.0
+    mean = sum(values) / len(values)
+    return round(math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1)), 4)
+
+
+async def history(
+    db,
+    market_id: str,
+    start: datetime,
+    end: datetime,
+    resolution: Optional[str] = None,
+    max_points: int = ODDS_MAX_POINTS,
+) -> List[Dict[str, Any]]:
+    """Snapshots in [start, end), downsampled to `resolution` (default: fit `max_points`).
+
+    The newest `max_points` are kept if the resolution is still too fine.
+    """
+    start, end = as_utc(start), as_utc(end)
+    cursor = db.odds_history.find(
+        {"market_id": market_id, "bucket": {"$gte": truncate(start, BUCKET), "$lt": end}},
+        {"_id": 0, "points": 1}
+    ).sort("bucket", 1)
+    points = []
+    async for doc in cursor:
+        for point in doc.get("points", []):
+            point["t"] = as_utc(point["t"])
+            if start <= point["t"] < end:
+                points.append(point)
+    points.sort(key=lambda point: point["t"])
+
+    points = downsample(points, resolution or pick_resolution(start, end, max_points))[-max_points:]
+    for point in points:
+        point["probabilities"] = implied_probabilities(point.get("odds", {}))
+    return points
@@ -0,0 +1,99 @@
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (field, direction) pairs; the last field must be unique (e.g. "id")
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _tag(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _untag(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(doc: Dict[str, Any], sort: SortSpec) -> str:
+    """Opaque cursor holding the sort key of `doc`"""
+    values = [_tag(doc.get(field)) for field, _ in sort]
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise CursorError("Invalid cursor")
+    try:
+        return [_untag(value) for value in values]
+    except (ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+
+
+def keyset_filter(sort: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """Documents strictly after `values` in `sort` order.
+
+    For sort (a desc, id desc) and cursor (x, y) this is
+    a < x OR (a == x AND id < y).
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev: values[j] for j, (prev, _) in enumerate(sort[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], sort: SortSpec) -> Optional[Dict[str, int]]:
+    """Mongo projection for a comma-separated `fields` parameter.
+
+    Sort keys are always projected so the next cursor can be built.
+    Returns None when no fields were requested.
+    """
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    projection = {"_id": 0}
+    for field in [*requested, *(field for field, _ in sort)]:
+        projection[field] = 1
+    return projection
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort: SortSpec,
+    limit: int,
+    after: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of `collection` in keyset order.
+
+    Returns the documents and the cursor of the next page (None on the last
+    page). Raises CursorError for a malformed `after`.
+    """
+    if after:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(after, sort))]}
+    cursor = collection.find(query, projection or {"_id": 0}).sort(list(sort)).limit(limit + 1)
+    docs = await cursor.to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1], sort)
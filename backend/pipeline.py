@@ -0,0 +1,141 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+FallbackFunc = Callable[[Exception], Any]
+
+
+class PipelineError(Exception):
+    pass
+
+
+class Stage:
+    """One node of a stage graph.
+
+    `func` receives the shared results dict, keyed by stage name, and its return
+    value is stored there under `name` for the stages that depend on it. When
+    `fallback` is given, a failure or timeout of this stage is passed to it and
+    its return value is used as the result instead of failing the pipeline.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: StageFunc,
+        deps: Sequence[str] = (),
+        timeout: Optional[float] = None,
+        fallback: Optional[FallbackFunc] = None,
+    ):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class StageGraph:
+    """Runs stages as soon as their dependencies finish, concurrently where possible.
+
+    `inputs` names results that are supplied to `run` up front rather than
+    produced by a stage; stages may depend on them like on any other stage.
+    """
+
+    def __init__(self, stages: List[Stage], inputs: Sequence[str] = ()):
+        self.stages = {stage.name: stage for stage in stages}
+        self.inputs = set(inputs)
+        if len(self.stages) != len(stages):
+            raise PipelineError("Duplicate stage names")
+        for stage in stages:
+            for dep in stage.deps:
+                if dep not in self.stages and dep not in self.inputs:
+                    raise PipelineError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        visiting, done = set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise PipelineError(f"Cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                if dep in self.stages:
+                    visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def _call(self, stage: Stage, results: Dict[str, Any]):
+        if stage.timeout is None:
+            return await stage.func(results)
+        try:
+            return await asyncio.wait_for(stage.func(results), timeout=stage.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Stage '{stage.name}' timed out after {stage.timeout}s")
+
+    async def _run_stage(self, stage: Stage, results: Dict[str, Any]):
+        if stage.fallback is None:
+            return await self._call(stage, results)
+        try:
+            return await self._call(stage, results)
+        except Exception as e:
+            return stage.fallback(e)
+
+    async def run(self, results: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run every stage and return the results dict.
+
+        Per-stage timings are stored under `results["timings"]` as
+        {stage: {"start_ms", "end_ms", "duration_ms"}} relative to the pipeline
+        start. The first failing stage cancels the others and its error is raised.
+        """
+        results = dict(results or {})
+        missing = self.inputs - set(results)
+        if missing:
+            raise PipelineError(f"Missing pipeline inputs: {sorted(missing)}")
+        timings: Dict[str, Dict[str, float]] = {}
+        results["timings"] = timings
+        origin = time.monotonic()
+        pending = dict(self.stages)
+        running: Dict[asyncio.Task, Stage] = {}
+
+        def elapsed_ms():
+            return round((time.monotonic() - origin) * 1000, 2)
+
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in self.inputs or "end_ms" in timings.get(dep, {}) for dep in stage.deps):
+                        del pending[name]
+                        timings[name] = {"start_ms": elapsed_ms()}
+                        running[asyncio.create_task(self._run_stage(stage, results))] = stage
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stage = running.pop(task)
+                    results[stage.name] = task.result()
+                    timing = timings[stage.name]
+                    timing["end_ms"] = elapsed_ms()
+                    timing["duration_ms"] = round(timing["end_ms"] - timing["start_ms"], 2)
+        finally:
+            for task in running:
+                task.cancel()
+
+        return results
+
+    def critical_path(self, timings: Dict[str, Dict[str, float]]) -> List[str]:
+        """Chain of stages that determined the end-to-end latency."""
+        finished = {name: t for name, t in timings.items() if "end_ms" in t}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: finished[name]["end_ms"])]
+        while True:
+            deps = [dep for dep in self.stages[path[-1]].deps if dep in finished]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda name: finished[name]["end_ms"]))
+        return list(reversed(path))
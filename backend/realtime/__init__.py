@@ -0,0 +1,11 @@
+from .hub import ConnectionManager
+from .backends import BroadcastBackend, MemoryBroker, MemoryBackend, RedisBackend, create_backend
+
+__all__ = [
+    "ConnectionManager",
+    "BroadcastBackend",
+    "MemoryBroker",
+    "MemoryBackend",
+    "RedisBackend",
+    "create_backend",
+]
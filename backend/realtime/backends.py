@@ -0,0 +1,184 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND", "local")  # local, redis
+BROADCAST_CHANNEL = os.getenv("BROADCAST_CHANNEL", "verisight:broadcast")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Called with (encoded message, topics) for every broadcast published by another worker
+Deliver = Callable[[bytes, List[str]], Awaitable[None]]
+
+
+class BroadcastBackend:
+    """Relays broadcasts between API workers.
+
+    The worker that broadcasts delivers to its own sockets directly and
+    publishes an envelope tagged with its `worker_id`; every other worker
+    receives the envelope and hands it to `deliver`. The base class is the
+    in-process backend: publishing is a no-op since there are no other
+    workers to reach.
+    """
+
+    name = "local"
+    relays = False
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex
+        self.deliver: Optional[Deliver] = None
+        self.published = 0
+        self.relayed = 0
+        self.publish_failures = 0
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def close(self):
+        self.deliver = None
+
+    async def publish(self, payload: bytes, topics: List[str]):
+        pass
+
+    def envelope(self, payload: bytes, topics: List[str]) -> bytes:
+        """A JSON header line (origin, topics) followed by the already encoded message.
+
+        Compact JSON never contains a raw newline, so the first one ends the
+        header and the message bytes are relayed without being re-encoded.
+        """
+        header = json.dumps({"origin": self.worker_id, "topics": topics}, separators=(",", ":"), ensure_ascii=False)
+        return header.encode() + b"\n" + payload
+
+    async def receive(self, data: Any):
+        """Deliver an envelope published by another worker"""
+        if isinstance(data, str):
+            data = data.encode()
+        try:
+            header, payload = data.split(b"\n", 1)
+            header = json.loads(header)
+        except (AttributeError, TypeError, ValueError):
+            logger.warning("Ignoring malformed broadcast envelope")
+            return
+        if not isinstance(header, dict) or header.get("origin") == self.worker_id or self.deliver is None:
+            return
+        self.relayed += 1
+        await self.deliver(payload, header.get("topics") or [])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "relayed": self.relayed,
+            "publish_failures": self.publish_failures,
+        }
+
+
+class MemoryBroker:
+    """In-process stand-in for a pub/sub server, shared by several backends"""
+
+    def __init__(self):
+        self.subscribers: List["MemoryBackend"] = []
+
+    async def publish(self, data: bytes):
+        await asyncio.gather(*[subscriber.receive(data) for subscriber in list(self.subscribers)])
+
+
+class MemoryBackend(BroadcastBackend):
+    """Backend for tests: each instance plays one worker attached to `broker`"""
+
+    name = "memory"
+    relays = True
+
+    def __init__(self, broker: MemoryBroker):
+        super().__init__()
+        self.broker = broker
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self.broker.subscribers.append(self)
+
+    async def close(self):
+        if self in self.broker.subscribers:
+            self.broker.subscribers.remove(self)
+        await super().close()
+
+    async def publish(self, payload: bytes, topics: List[str]):
+        self.published += 1
+        await self.broker.publish(self.envelope(payload, topics))
+
+
+class RedisBackend(BroadcastBackend):
+    """Redis pub/sub backend; every worker subscribes to one channel"""
+
+    name = "redis"
+    relays = True
+
+    def __init__(self, url: str = REDIS_URL, channel: str = BROADCAST_CHANNEL):
+        super().__init__()
+        self.url = url
+        self.channel = channel
+        self.redis = None
+        self.pubsub = None
+        self.listener = None
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio as redis
+
+        await super().start(deliver)
+        # The client connects lazily and the listener subscribes, so an
+        # unreachable Redis is retried in the background instead of failing startup
+        self.redis = redis.from_url(self.url)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.listener = asyncio.create_task(self._listen())
+        logger.info(f"Relaying WebSocket broadcasts through Redis channel {self.channel}")
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+            self.listener = None
+        if self.pubsub is not None:
+            await self.pubsub.unsubscribe(self.channel)
+            await self.pubsub.aclose()
+            self.pubsub = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+        await super().close()
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self.pubsub.subscribed:
+                    await self.pubsub.subscribe(self.channel)
+                async for item in self.pubsub.listen():
+                    if item.get("type") == "message":
+                        await self.receive(item["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Redis broadcast listener failed, resubscribing: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def publish(self, payload: bytes, topics: List[str]):
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, self.envelope(payload, topics))
+            self.published += 1
+        except Exception as e:
+            self.publish_failures += 1
+            logger.error(f"Failed to relay broadcast through Redis: {str(e)}")
+
+
+def create_backend(name: str = BROADCAST_BACKEND) -> BroadcastBackend:
+    if name == "redis":
+        return RedisBackend()
+    if name != "local":
+        logger.warning(f"Unknown BROADCAST_BACKEND '{name}', using the in-process backend")
+    return BroadcastBackend()
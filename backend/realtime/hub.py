@@ -0,0 +1,280 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket
+
+from serialization import FAST_SERIALIZATION, dumps, json_default
+
+from .backends import BroadcastBackend
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest, disconnect
+WS_MAX_TOPICS = int(os.getenv("WS_MAX_TOPICS", "100"))
+
+# Clients without subscriptions are indexed under this topic and get everything
+ALL_TOPICS = "*"
+TOPIC_PREFIXES = ("event", "market", "category", "type")
+
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """UTF-8 JSON of a message; a broadcast is encoded once and relayed as these bytes"""
+    if FAST_SERIALIZATION:
+        return dumps(message)
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=json_default).encode()
+
+
+def valid_topic(topic: Any) -> bool:
+    if topic == ALL_TOPICS:
+        return True
+    if not isinstance(topic, str) or len(topic) > 200:
+        return False
+    prefix, _, value = topic.partition(":")
+    return prefix in TOPIC_PREFIXES and bool(value)
+
+
+class Connection:
+    """One client socket with its bounded send queue and writer task"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = None
+        self.dropped = 0
+        self.topics: Set[str] = set()
+
+    def index_topics(self) -> Set[str]:
+        return self.topics or {ALL_TOPICS}
+
+
+class ConnectionManager:
+    """WebSocket fan-out hub.
+
+    A broadcast encodes the message once and only enqueues it per connection;
+    each connection has its own writer task, so a slow client never holds up
+    other clients or the request that broadcast. When a client's queue is
+    full the slow-consumer policy applies: "drop_oldest" discards its oldest
+    queued message, "disconnect" closes the socket.
+
+    Clients narrow what they receive by sending
+    {"action": "subscribe" | "unsubscribe", "topics": [...]} with topics such
+    as "event:<id>", "market:<id>", "category:<name>" or "type:<message type>".
+    A topic index maps each topic to its sockets, so a broadcast only visits
+    subscribers of the message's topics. Clients with no subscriptions (or
+    subscribed to "*") receive every message.
+
+    Broadcasts are delivered to this worker's sockets and published through
+    `backend`, which relays the encoded bytes to the sockets of every other
+    worker without encoding the message again.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = WS_SEND_QUEUE_SIZE,
+        send_timeout: float = WS_SEND_TIMEOUT,
+        slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+        max_topics: int = WS_MAX_TOPICS,
+        backend: Optional[BroadcastBackend] = None,
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        self.max_topics = max_topics
+        self.backend = backend or BroadcastBackend()
+        self.connections: Dict[WebSocket, Connection] = {}
+        self.topics: Dict[str, Set[WebSocket]] = {}
+        self.messages_broadcast = 0
+        self.deliveries = 0
+        self.messages_dropped = 0
+        self.slow_disconnects = 0
+        self.send_failures = 0
+
+    async def start(self):
+        await self.backend.start(self.deliver)
+
+    async def close(self):
+        await self.backend.close()
+        for websocket in list(self.connections):
+            self.disconnect(websocket)
+
+    @property
+    def active_connections(self):
+        return list(self.connections)
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self._writer(connection))
+        self.connections[websocket] = connection
+        self._index(connection)
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self._remove(websocket)
+        if connection is not None and connection.writer is not None:
+            connection.writer.cancel()
+
+    def _remove(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection is not None:
+            self._unindex(connection)
+        return connection
+
+    def _index(self, connection: Connection):
+        for topic in connection.index_topics():
+            self.topics.setdefault(topic, set()).add(connection.websocket)
+
+    def _unindex(self, connection: Connection):
+        for topic in connection.index_topics():
+            sockets = self.topics.get(topic)
+            if sockets is None:
+                continue
+            sockets.discard(connection.websocket)
+            if not sockets:
+                del self.topics[topic]
+
+    def subscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        connection = self.connections[websocket]
+        self._unindex(connection)
+        connection.topics.update(topics)
+        self._index(connection)
+        return sorted(connection.topics)
+
+    def unsubscribe(self, websocket: WebSocket, topics: Iterable[str]) -> List[str]:
+        connection = self.connections[websocket]
+        self._unindex(connection)
+        connection.topics.difference_update(topics)
+        self._index(connection)
+        return sorted(connection.topics)
+
+    async def handle_client_message(self, websocket: WebSocket, text: str):
+        """Apply a subscribe/unsubscribe request and queue the reply"""
+        connection = self.connections.get(websocket)
+        if connection is None:
+            return
+        try:
+            request = json.loads(text)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict) or request.get("action") not in ("subscribe", "unsubscribe"):
+            self._reply(connection, {
+                "type": "error", "message": "Expected {\"action\": \"subscribe\" | \"unsubscribe\", \"topics\": [...]}"
+            })
+            return
+
+        topics = request.get("topics")
+        if isinstance(topics, str):
+            topics = [topics]
+        if not isinstance(topics, list) or not all(valid_topic(topic) for topic in topics):
+            self._reply(connection, {
+                "type": "error", "message": f"Topics must be \"*\" or <{'|'.join(TOPIC_PREFIXES)}>:<value>"
+            })
+            return
+
+        if request["action"] == "subscribe":
+            if len(connection.topics | set(topics)) > self.max_topics:
+                self._reply(connection, {"type": "error", "message": f"At most {self.max_topics} topics per connection"})
+                return
+            current = self.subscribe(websocket, topics)
+        else:
+            current = self.unsubscribe(websocket, topics)
+        self._reply(connection, {"type": "subscriptions", "topics": current})
+
+    def _reply(self, connection: Connection, message: Dict[str, Any]):
+        self._enqueue(connection, encode_message(message).decode())
+
+    async def broadcast(self, message: dict, topics: Iterable[str] = ()):
+        """Send `message` to the subscribers of `topics`, its "type:" topic and "*" on every worker.
+
+        Encoded once, and only if a local socket or another worker can receive it.
+        """
+        topics = list(topics)
+        if message.get("type"):
+            topics.append(f"type:{message['type']}")
+        self.messages_broadcast += 1
+        recipients = self._recipients(topics)
+        if not recipients and not self.backend.relays:
+            return
+        payload = encode_message(message)
+        self._send(recipients, payload)
+        await self.backend.publish(payload, topics)
+
+    async def deliver(self, payload: bytes, topics: Iterable[str] = ()):
+        """Queue a message another worker encoded for this worker's subscribers of `topics`"""
+        self._send(self._recipients(topics), payload)
+
+    def _recipients(self, topics: Iterable[str]) -> Set[WebSocket]:
+        recipients = set()
+        for key in {ALL_TOPICS, *topics}:
+            recipients.update(self.topics.get(key, ()))
+        return recipients
+
+    def _send(self, recipients: Set[WebSocket], payload: bytes):
+        if not recipients:
+            return
+        text = payload.decode()  # once per worker: WebSocket text frames take str
+        for websocket in recipients:
+            connection = self.connections.get(websocket)
+            if connection is not None:
+                self.deliveries += 1
+                self._enqueue(connection, text)
+
+    def _enqueue(self, connection: Connection, text: str):
+        try:
+            connection.queue.put_nowait(text)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.slow_consumer_policy == "disconnect":
+            self.slow_disconnects += 1
+            self.disconnect(connection.websocket)
+            asyncio.create_task(self._close(connection.websocket, code=1013))
+            return
+
+        connection.queue.get_nowait()
+        connection.queue.put_nowait(text)
+        connection.dropped += 1
+        self.messages_dropped += 1
+
+    async def _writer(self, connection: Connection):
+        websocket = connection.websocket
+        try:
+            while True:
+                text = await connection.queue.get()
+                await asyncio.wait_for(websocket.send_text(text), timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.send_failures += 1
+            logger.info(f"Dropping WebSocket client after failed send: {type(e).__name__}")
+            self._remove(websocket)
+            await self._close(websocket)
+
+    async def _close(self, websocket: WebSocket, code: int = 1011):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [connection.queue.qsize() for connection in self.connections.values()]
+        return {
+            "connections": len(depths),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.queue_size,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "topics": len(self.topics),
+            "unfiltered_connections": len(self.topics.get(ALL_TOPICS, ())),
+            "messages_broadcast": self.messages_broadcast,
+            "deliveries": self.deliveries,
+            "messages_dropped": self.messages_dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "send_failures": self.send_failures,
+            "broadcast_backend": self.backend.stats(),
+        }
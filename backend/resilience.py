@@ -0,0 +1,265 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Per-upstream guard settings; override with <NAME>_BREAKER_THRESHOLD,
+# <NAME>_BREAKER_RESET, <NAME>_TIMEOUT_FLOOR, <NAME>_TIMEOUT_CEILING,
+# <NAME>_BULKHEAD_SIZE and <NAME>_BULKHEAD_QUEUE (e.g. OPENAI_TIMEOUT_CEILING=90)
+GUARD_DEFAULTS = {
+    "ipfs": {"breaker_threshold": 5, "breaker_reset": 30, "timeout_floor": 2, "timeout_ceiling": 30,
+             "bulkhead_size": 16, "bulkhead_queue": 64},
+    "ipfs_gateway": {"breaker_threshold": 5, "breaker_reset": 30, "timeout_floor": 2, "timeout_ceiling": 30,
+                     "bulkhead_size": 16, "bulkhead_queue": 64},
+    "linera": {"breaker_threshold": 5, "breaker_reset": 30, "timeout_floor": 2, "timeout_ceiling": 30,
+               "bulkhead_size": 8, "bulkhead_queue": 32},
+    "openai": {"breaker_threshold": 5, "breaker_reset": 30, "timeout_floor": 5, "timeout_ceiling": 60,
+               "bulkhead_size": 16, "bulkhead_queue": 64},
+    # Multi-item prompts take far longer than single calls, so they get their
+    # own latency window and breaker instead of timing out against "openai"'s
+    "openai_batch": {"breaker_threshold": 5, "breaker_reset": 30, "timeout_floor": 30, "timeout_ceiling": 180,
+                     "bulkhead_size": 4, "bulkhead_queue": 32},
+}
+TIMEOUT_PERCENTILE = float(os.getenv("RESILIENCE_TIMEOUT_PERCENTILE", "99"))
+TIMEOUT_MULTIPLIER = float(os.getenv("RESILIENCE_TIMEOUT_MULTIPLIER", "3"))
+LATENCY_WINDOW = int(os.getenv("RESILIENCE_LATENCY_WINDOW", "200"))
+MIN_SAMPLES = int(os.getenv("RESILIENCE_MIN_SAMPLES", "20"))
+
+
+def guard_config(name: str) -> Dict[str, float]:
+    defaults = GUARD_DEFAULTS.get(name, GUARD_DEFAULTS["linera"])
+    prefix = name.upper()
+    return {
+        key: float(os.getenv(f"{prefix}_{key.upper()}", value))
+        for key, value in defaults.items()
+    }
+
+
+class ResilienceError(Exception):
+    """The call was rejected without reaching the upstream"""
+
+
+class CircuitOpenError(ResilienceError):
+    pass
+
+
+class BulkheadFullError(ResilienceError):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds; then lets one trial call through (half-open),
+    which closes the circuit on success or reopens it on failure."""
+
+    def __init__(self, threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def success(self):
+        self.failures = 0
+        self.trial_in_flight = False
+        self.state = "closed"
+
+    def failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = self.clock()
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = max(0.0, self.reset_timeout - (self.clock() - self.opened_at)) if self.state == "open" else 0.0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_s": round(retry_in, 2),
+        }
+
+
+class AdaptiveTimeout:
+    """Timeout of `multiplier` x the p-th percentile of recent successful
+    latencies, clamped to [floor, ceiling]; the ceiling until enough samples"""
+
+    def __init__(self, floor: float, ceiling: float, window: int = LATENCY_WINDOW,
+                 p: float = TIMEOUT_PERCENTILE, multiplier: float = TIMEOUT_MULTIPLIER, min_samples: int = MIN_SAMPLES):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.p = p
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def current(self) -> float:
+        if len(self.latencies) < self.min_samples:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, percentile(list(self.latencies), self.p) * self.multiplier))
+
+    def stats(self) -> Dict[str, Any]:
+        window = list(self.latencies)
+        return {
+            "timeout_s": round(self.current(), 3),
+            "p50_ms": round(percentile(window, 50) * 1000, 2),
+            "p95_ms": round(percentile(window, 95) * 1000, 2),
+            "samples": len(window),
+        }
+
+
+class Bulkhead:
+    """Caps concurrent calls and rejects instead of queueing beyond `max_waiting`"""
+
+    def __init__(self, size: int, max_waiting: int):
+        self.size = size
+        self.max_waiting = max_waiting
+        self.semaphore = asyncio.Semaphore(size)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise BulkheadFullError(f"{self.waiting} calls already waiting")
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": self.size, "in_flight": self.in_flight, "waiting": self.waiting, "rejected": self.rejected}
+
+
+class UpstreamGuard:
+    """Circuit breaker, adaptive timeout and bulkhead for one upstream"""
+
+    def __init__(self, name: str, breaker_threshold: float, breaker_reset: float, timeout_floor: float,
+                 timeout_ceiling: float, bulkhead_size: float, bulkhead_queue: float):
+        self.name = name
+        self.breaker = CircuitBreaker(int(breaker_threshold), breaker_reset)
+        self.timeout = AdaptiveTimeout(timeout_floor, timeout_ceiling)
+        self.bulkhead = Bulkhead(int(bulkhead_size), int(bulkhead_queue))
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+
+    async def call(self, fn: Callable[[float], Awaitable[T]], failed: Optional[Callable[[T], bool]] = None) -> T:
+        """Run `fn(timeout)` under the guard and return its result.
+
+        `fn` receives the current adaptive timeout to pass on to its client;
+        the call is also cancelled once it elapses. Exceptions, timeouts and
+        results for which `failed(result)` is true count against the breaker.
+        Raises CircuitOpenError or BulkheadFullError without calling `fn`.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            await self.bulkhead.acquire()
+        except BulkheadFullError:
+            self.breaker.trial_in_flight = False
+            raise
+
+        timeout = self.timeout.current()
+        started = time.monotonic()
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(fn(timeout), timeout)
+        except asyncio.CancelledError:
+            self.breaker.trial_in_flight = False
+            raise
+        except Exception as e:
+            self.failures += 1
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+            self._failed()
+            raise
+        finally:
+            self.bulkhead.release()
+
+        if failed is not None and failed(result):
+            self.failures += 1
+            self._failed()
+        else:
+            self.timeout.record(time.monotonic() - started)
+            self.breaker.success()
+        return result
+
+    def _failed(self):
+        was_open = self.breaker.state == "open"
+        self.breaker.failure()
+        if self.breaker.state == "open" and not was_open:
+            logger.warning(f"Circuit for {self.name} opened after {self.breaker.failures} failures")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "timeout": self.timeout.stats(),
+            "bulkhead": self.bulkhead.stats(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+        }
+
+
+class UpstreamGuards:
+    """One guard per upstream name, created on first use"""
+
+    def __init__(self):
+        self.guards: Dict[str, UpstreamGuard] = {}
+
+    def get(self, name: str) -> UpstreamGuard:
+        if name not in self.guards:
+            self.guards[name] = UpstreamGuard(name, **guard_config(name))
+        return self.guards[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: guard.stats() for name, guard in self.guards.items()}
+
+    def circuits(self) -> Dict[str, Dict[str, Any]]:
+        return {name: guard.breaker.stats() for name, guard in self.guards.items()}
+
+
+def server_error(response) -> bool:
+    """`failed` predicate for HTTP responses: 5xx means the upstream is unwell"""
+    return response.status_code >= 500
+
+
+guards = UpstreamGuards()
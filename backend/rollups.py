@@ -0,0 +1,240 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import locks
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COMPACT_INTERVAL = float(os.getenv("ROLLUP_COMPACT_INTERVAL", "600"))
+ROLLUP_MINUTE_RETENTION_HOURS = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+ROLLUP_HOUR_RETENTION_DAYS = int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))
+ROLLUP_COMPACT_BATCH_SIZE = int(os.getenv("ROLLUP_COMPACT_BATCH_SIZE", "5000"))
+ROLLUP_COMPACT_LEASE = float(os.getenv("ROLLUP_COMPACT_LEASE", "300"))
+COMPACT_LOCK = "rollup_compaction"
+MAX_POINTS = 2000
+
+RESOLUTIONS = ["minute", "hour", "day"]
+STEP = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+DEFAULT_SPAN = {"minute": timedelta(hours=1), "hour": timedelta(days=1), "day": timedelta(days=30)}
+
+# Counters kept per bucket; "confidence" is derived as confidence_sum / verifications
+COUNTERS = ("volume", "predictions", "verifications", "confidence_sum")
+METRICS = ("volume", "predictions", "verifications", "confidence")
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def truncate(when: datetime, resolution: str) -> datetime:
+    when = as_utc(when)
+    if resolution == "minute":
+        return when.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return when.replace(minute=0, second=0, microsecond=0)
+    return when.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def dimensions(category: Optional[str] = None, market_id: Optional[str] = None) -> List[str]:
+    """Rollup series a write lands in: the global one plus its category and market"""
+    dims = ["all"]
+    if category:
+        dims.append(f"category:{category}")
+    if market_id:
+        dims.append(f"market:{market_id}")
+    return dims
+
+
+async def record(db, when: datetime, dims: Iterable[str], **deltas: float):
+    """Add `deltas` to the minute bucket of `when` in every dimension.
+
+    Best-effort like the stats counters: failures are logged, never raised.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    bucket = truncate(when, "minute")
+    ops = [
+        UpdateOne({"dimension": dim, "resolution": "minute", "bucket": bucket}, {"$inc": deltas}, upsert=True)
+        for dim in dims
+    ]
+    try:
+        await db.rollups.bulk_write(ops, ordered=False)
+    except Exception as e:
+        logger.error(f"Failed to record rollups {sorted(deltas)}: {str(e)}")
+
+
+async def compact(
+    db,
+    source: str,
+    target: str,
+    cutoff: datetime,
+    batch_size: Optional[int] = None,
+    renew: Optional[Callable[[], Awaitable[bool]]] = None,
+) -> int:
+    """Fold `source` buckets older than `cutoff` into `target` buckets.
+
+    Works through at most `batch_size` buckets at a time, oldest first.
+    Each batch is idempotent, so a crash at any step is safe to re-run:
+    the sources are first marked `folded: <fold id>`, each target bucket
+    records the fold ids it has added (`folds`) and skips one it already
+    has, and only then are the sources deleted and the ids pulled again.
+    A re-run reuses the fold id found on the sources. Callers hold the
+    compaction lease, and `renew` extends it between batches (compaction
+    stops if the lease was lost). Returns the number of source buckets folded.
+    """
+    cutoff = truncate(cutoff, target)
+    batch_size = batch_size or ROLLUP_COMPACT_BATCH_SIZE
+    folded = 0
+    while True:
+        docs = await db.rollups.find(
+            {"resolution": source, "bucket": {"$lt": cutoff}}
+        ).sort("bucket", ASCENDING).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        fold = uuid.uuid4().hex
+        fresh = [doc["_id"] for doc in docs if not doc.get("folded")]
+        if fresh:
+            await db.rollups.update_many({"_id": {"$in": fresh}}, {"$set": {"folded": fold}})
+
+        groups: Dict[Any, Dict[str, float]] = {}
+        for doc in docs:
+            key = (doc["dimension"], truncate(doc["bucket"], target), doc.get("folded") or fold)
+            sums = groups.setdefault(key, {counter: 0 for counter in COUNTERS})
+            for counter in COUNTERS:
+                sums[counter] += doc.get(counter, 0)
+        await _apply_folds(db, [
+            UpdateOne({"dimension": dim, "resolution": target, "bucket": bucket, "folds": {"$ne": fold_id}},
+                      {"$inc": {counter: value for counter, value in sums.items() if value}, "$addToSet": {"folds": fold_id}},
+                      upsert=True)
+            for (dim, bucket, fold_id), sums in groups.items() if any(sums.values())
+        ])
+        await db.rollups.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+        await db.rollups.bulk_write([
+            UpdateOne({"dimension": dim, "resolution": target, "bucket": bucket}, {"$pull": {"folds": fold_id}})
+            for dim, bucket, fold_id in groups
+        ], ordered=False)
+        folded += len(docs)
+
+        if len(docs) < batch_size or (renew is not None and not await renew()):
+            break
+    return folded
+
+
+async def _apply_folds(db, ops: List[UpdateOne]):
+    """Upsert folded sums; a target that already has the fold id makes its
+    upsert collide with the unique bucket index, which means already applied"""
+    try:
+        await db.rollups.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        if e.details.get("writeConcernErrors") or any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+            raise
+
+
+async def compact_all(db, now: Optional[datetime] = None, renew: Optional[Callable[[], Awaitable[bool]]] = None) -> Dict[str, int]:
+    now = now or datetime.now(timezone.utc)
+    return {
+        "minute_to_hour": await compact(db, "minute", "hour", now - timedelta(hours=ROLLUP_MINUTE_RETENTION_HOURS), renew=renew),
+        "hour_to_day": await compact(db, "hour", "day", now - timedelta(days=ROLLUP_HOUR_RETENTION_DAYS), renew=renew),
+    }
+
+
+async def acquire_lease(db, owner: str, seconds: float = ROLLUP_COMPACT_LEASE) -> bool:
+    """Take or renew the compaction lease; False while another worker holds it"""
+    return await locks.acquire_lease(db, COMPACT_LOCK, owner, seconds)
+
+
+async def release_lease(db, owner: str):
+    await locks.release_lease(db, COMPACT_LOCK, owner)
+
+
+def metric_value(metric: str, sums: Dict[str, float]) -> Optional[float]:
+    if metric == "confidence":
+        verifications = sums.get("verifications", 0)
+        return round(sums.get("confidence_sum", 0) / verifications, 4) if verifications else None
+    return sums.get(metric, 0)
+
+
+async def timeseries(
+    db,
+    metric: str,
+    resolution: str,
+    start: datetime,
+    end: datetime,
+    dimension: str = "all",
+) -> List[Dict[str, Any]]:
+    """Points of `metric` per `resolution` bucket in [start, end), zero-filled.
+
+    Buckets that were compacted to a coarser resolution than requested are
+    not split back up, so they are missing from finer-grained series.
+    """
+    start, end = truncate(start, resolution), as_utc(end)
+    finer = RESOLUTIONS[:RESOLUTIONS.index(resolution) + 1]
+    sums: Dict[datetime, Dict[str, float]] = {}
+    cursor = db.rollups.find(
+        {"dimension": dimension, "resolution": {"$in": finer}, "bucket": {"$gte": start, "$lt": end}},
+        {"_id": 0, "bucket": 1, **{counter: 1 for counter in COUNTERS}}
+    )
+    async for doc in cursor:
+        bucket = sums.setdefault(truncate(doc["bucket"], resolution), {counter: 0 for counter in COUNTERS})
+        for counter in COUNTERS:
+            bucket[counter] += doc.get(counter, 0)
+
+    points = []
+    bucket = start
+    while bucket < end:
+        points.append({"t": bucket, "value": metric_value(metric, sums.get(bucket, {}))})
+        bucket += STEP[resolution]
+    return points
+
+
+class RollupCompactor:
+    """Periodically compacts old rollup buckets (0 disables the loop).
+
+    Every API worker runs one; the lease in `db.locks` lets only one of
+    them compact at a time.
+    """
+
+    def __init__(self, db, interval: float = ROLLUP_COMPACT_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self.owner = uuid.uuid4().hex
+        self._task = None
+
+    async def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> Optional[Dict[str, int]]:
+        """Compact if this worker gets the lease; None if another worker holds it"""
+        if not await acquire_lease(self.db, self.owner):
+            return None
+        try:
+            folded = await compact_all(self.db, renew=lambda: acquire_lease(self.db, self.owner))
+        finally:
+            await release_lease(self.db, self.owner)
+        if any(folded.values()):
+            logger.info(f"Compacted rollup buckets: {folded}")
+        return folded
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Rollup compaction failed: {str(e)}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,74 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Type
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pinned in requirements.txt; the stdlib encoder keeps a bare checkout working
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: list routes skip response_model re-validation of DB documents and
+# every JSON body is encoded with orjson
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "false").lower() in ("1", "true", "yes")
+
+if FAST_SERIALIZATION and orjson is None:
+    logger.warning("FAST_SERIALIZATION is on but orjson is not installed; encoding with the stdlib json module")
+
+
+def json_default(value: Any) -> str:
+    """Dates as ISO-8601 with "Z" for UTC (as pydantic renders them), anything else via str"""
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return str(value)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=json_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps` (orjson when available)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_projection(model: Type[BaseModel]) -> Dict[str, int]:
+    """Mongo projection returning exactly the model's fields"""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+def model_defaults(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Plain (non-factory) defaults, filled into documents that lack the field"""
+    return {
+        name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+
+def trusted_documents(docs: List[Dict[str, Any]], model: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Shape documents read with `model_projection` like `model` would, without validating them.
+
+    Only for documents this application wrote; values are passed through as stored.
+    """
+    defaults = model_defaults(model)
+    for doc in docs:
+        for name, value in defaults.items():
+            doc.setdefault(name, value)
+    return docs
+
+
+if FAST_SERIALIZATION and orjson is None:
+    logger.warning("FAST_SERIALIZATION is on but orjson is not installed; using the stdlib JSON encoder")
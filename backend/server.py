@@ -1,4 +1,6 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,7 +8,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
@@ -14,28 +16,103 @@ from jose import jwt, JWTError
 import json
 import hashlib
 import asyncio
+from contextlib import asynccontextmanager
 
 # Import AI agents
 from ai_agents.event_detector import EventDetectorAgent
 from ai_agents.source_verifier import SourceVerifierAgent
 from ai_agents.confidence_scorer import ConfidenceScorerAgent
 from ai_agents.summary_composer import SummaryComposerAgent
+from ai_agents.llm_cache import response_cache, configure_persistent_tier
+from ai_agents.batch import BatchVerifier
 from oracle.linera_oracle import LineraOracleMock
 
 # Import Linera and IPFS clients
 from linera_client import publish_event as linera_publish_event, get_block_height as linera_get_block_height
+from linera_client import OracleFeedPublisher
 import ipfs_client
+from http_pool import http_pool
+
+# Import WebSocket hub
+from realtime import ConnectionManager, create_backend
+
+# Import verification job queue and stage graph
+from jobs import VerificationJobQueue
+from pipeline import Stage, StageGraph
+from pagination import paginate, parse_fields
+from indexes import ensure_indexes, explain_queries
+import analytics
+import rollups
+import odds_history
+import market_engine
+import settlement
+import export
+import date_migration
+import ingest
+import snapshots
+from entity_cache import create_entity_cache
+from http_cache import HTTPCacheMiddleware, etag_matches, version_etag
+from health import HealthMonitor
+from resilience import guards
+from serialization import FAST_SERIALIZATION, FastJSONResponse, model_projection, trusted_documents
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
+async def prepare_llm_cache_tier(tier):
+    """Best-effort: the persistent LLM cache works without its indexes, only slower"""
+    if tier is None:
+        return
+    try:
+        await tier.prepare()
+    except Exception as e:
+        logger.error(f"Could not prepare the persistent LLM cache tier: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_pool.start()
+    # In the background: index builds or an unreachable Mongo must not hold up startup
+    provisioning = asyncio.create_task(ensure_indexes(db))
+    date_check = asyncio.create_task(date_migration.warn_if_unmigrated(db))
+    llm_cache_tier = configure_persistent_tier(db)
+    tier_setup = asyncio.create_task(prepare_llm_cache_tier(llm_cache_tier))
+    await manager.start()
+    await entity_cache.start()
+    await verification_queue.start()
+    await stats_reconciler.start()
+    await rollup_compactor.start()
+    await health_monitor.start()
+    resume = asyncio.create_task(settlement.resume_settlements(db, notify_settlement))
+    try:
+        yield
+    finally:
+        provisioning.cancel()
+        tier_setup.cancel()
+        date_check.cancel()
+        resume.cancel()
+        await health_monitor.stop()
+        await snapshot_runner.stop()
+        await rollup_compactor.stop()
+        await stats_reconciler.stop()
+        await verification_queue.stop()
+        await manager.close()
+        await entity_cache.close()
+        await linera_publisher.close()
+        await http_pool.close()
+        client.close()
+
 # Create the main app
-app = FastAPI(title="Verisight API", description="AI-Powered Oracle & Prediction Platform")
+app = FastAPI(
+    title="Verisight API",
+    description="AI-Powered Oracle & Prediction Platform",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if FAST_SERIALIZATION else JSONResponse
+)
 
 # Create router with /api prefix
 api_router = APIRouter(prefix="/api")
@@ -50,30 +127,17 @@ event_detector = EventDetectorAgent()
 source_verifier = SourceVerifierAgent()
 confidence_scorer = ConfidenceScorerAgent()
 summary_composer = SummaryComposerAgent()
+batch_verifier = BatchVerifier(event_detector, source_verifier, confidence_scorer, summary_composer)
 
 # Initialize Oracle
 oracle = LineraOracleMock()
+linera_publisher = OracleFeedPublisher()
 
-# WebSocket Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+# Read-through cache of event/market/strategy detail documents
+entity_cache = create_entity_cache()
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
-
-manager = ConnectionManager()
+# WebSocket fan-out hub
+manager = ConnectionManager(backend=create_backend())
 
 # ============= Models =============
 
@@ -106,6 +170,9 @@ class EventCreate(BaseModel):
     event_description: str
     category: str
 
+class BatchVerifyRequest(BaseModel):
+    event_ids: List[str] = Field(min_length=1, max_length=500)
+
 class Market(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -114,7 +181,7 @@ class Market(BaseModel):
     description: str
     options: List[Dict[str, Any]]  # [{"id": "yes", "label": "Yes", "odds": 1.5, "volume": 1000}]
     total_volume: float = 0.0
-    status: str = "active"  # active, closed, resolved
+    status: str = "active"  # active, closed, settling, resolved
     resolution: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     resolved_at: Optional[datetime] = None
@@ -125,6 +192,17 @@ class MarketCreate(BaseModel):
     description: str
     options: List[Dict[str, Any]]
 
+    @field_validator("options")
+    @classmethod
+    def check_options(cls, options):
+        return market_engine.validate_options(options)
+
+class ResolveMarketRequest(BaseModel):
+    option_id: str
+
+class SnapshotRequest(BaseModel):
+    datasets: Optional[List[str]] = None
+
 class Prediction(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -132,15 +210,15 @@ class Prediction(BaseModel):
     user_address: str
     option_id: str
     amount: float
-    odds: float
-    potential_payout: float
-    status: str = "active"  # active, won, lost
+    odds: float  # indicative: the odds right after this stake
+    potential_payout: float  # indicative: amount * odds; settlement pays a share of the final pool
+    status: str = "active"  # active, won, lost, refunded
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class PredictionCreate(BaseModel):
     market_id: str
     option_id: str
-    amount: float
+    amount: float = Field(gt=0)
 
 class Strategy(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -182,6 +260,13 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
 
+ADMIN_WALLETS = {w.strip().lower() for w in os.environ.get('ADMIN_WALLETS', '').split(',') if w.strip()}
+
+async def get_admin_user(user: str = Depends(get_current_user)) -> str:
+    if user.lower() not in ADMIN_WALLETS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
 # ============= Routes =============
 
 @api_router.get("/")
@@ -209,7 +294,7 @@ async def verify_signature(auth: WalletAuth):
         {"wallet_address": auth.wallet_address},
         {"$set": {
             "wallet_address": auth.wallet_address,
-            "last_login": datetime.now(timezone.utc).isoformat()
+            "last_login": datetime.now(timezone.utc)
         }},
         upsert=True
     )
@@ -217,6 +302,62 @@ async def verify_signature(auth: WalletAuth):
     access_token = create_access_token(auth.wallet_address)
     return TokenResponse(access_token=access_token)
 
+async def load_entity(collection, entity_id: str) -> Optional[dict]:
+    return await collection.find_one({"id": entity_id}, {"_id": 0})
+
+def not_modified(kind: str, doc: dict, request: Request, response: Response) -> Optional[Response]:
+    """Tag a detail response with its document version; a 304 when the client's copy is current.
+
+    Writers `$inc` the version. Documents not written since then have none,
+    and the middleware falls back to hashing the body.
+    """
+    if "version" not in doc:
+        return None
+    etag = version_etag(kind, doc["version"])
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+    response.headers["ETag"] = etag
+    return None
+
+# Keyset pagination shared by the list endpoints
+PAGE_SIZE = int(os.environ.get('PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '500'))
+NEWEST_FIRST = [("created_at", -1), ("id", -1)]
+
+async def list_page(collection, query: dict, sort, model, response: Response, limit: int, after: Optional[str], fields: Optional[str]):
+    """One page of a list endpoint; the next page's cursor is sent in X-Next-Cursor.
+
+    With `fields` only those fields (plus the sort keys) are read from Mongo
+    and the partial documents are returned as-is. With FAST_SERIALIZATION the
+    model's fields are projected in Mongo and the documents are encoded
+    directly instead of being re-validated against `model`.
+    """
+    try:
+        projection = parse_fields(fields, model.model_fields, sort)
+        partial = projection is not None
+        if not partial and FAST_SERIALIZATION:
+            projection = model_projection(model)
+        docs, next_cursor = await paginate(collection, query, sort, limit, after, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if FAST_SERIALIZATION:
+        return FastJSONResponse(docs if partial else trusted_documents(docs, model), headers=headers)
+    if partial:
+        return JSONResponse(jsonable_encoder(docs), headers=headers)
+    response.headers.update(headers)
+    return docs
+
+def created_range(start: Optional[datetime], end: Optional[datetime]) -> dict:
+    """`created_at` filter for [start, end); naive bounds are taken as UTC"""
+    bounds = {}
+    if start:
+        bounds['$gte'] = rollups.as_utc(start)
+    if end:
+        bounds['$lt'] = rollups.as_utc(end)
+    return {'created_at': bounds} if bounds else {}
+
 # Event Routes
 @api_router.post("/events", response_model=Event)
 async def create_event(event: EventCreate, user: str = Depends(get_current_user)):
@@ -224,49 +365,106 @@ async def create_event(event: EventCreate, user: str = Depends(get_current_user)
     event_obj = Event(**event_dict, created_by=user)
     
     doc = event_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
     await db.events.insert_one(doc)
+    await analytics.increment(db, total_events=1)
     
     # Broadcast new event
-    await manager.broadcast({"type": "new_event", "data": doc})
+    await manager.broadcast(
+        {"type": "new_event", "data": doc},
+        topics=[f"event:{doc['id']}", f"category:{doc['category']}"]
+    )
     
     return event_obj
 
+async def bulk_items(request: Request):
+    """Items of a bulk request: a JSON array, or NDJSON read as it streams in"""
+    if ingest.is_ndjson(request.headers.get("content-type", "")):
+        return ingest.ndjson_items(request.stream())
+    try:
+        items = ingest.json_items(await request.body())
+    except ingest.IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(items) > ingest.INGEST_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {ingest.INGEST_MAX_ITEMS} items per request")
+    return items
+
+@api_router.post("/events/bulk")
+async def create_events_bulk(request: Request, user: str = Depends(get_current_user)):
+    """Create many events from a JSON array or an NDJSON stream.
+
+    Items are validated and written per chunk with an unordered
+    `insert_many`; a bad item is reported by its index and does not stop
+    the others. Each chunk sends one `new_events` WebSocket message.
+    """
+    def build(item) -> dict:
+        return Event(**EventCreate.model_validate(item).model_dump(), created_by=user).model_dump()
+
+    report = ingest.IngestReport()
+    async for batch in ingest.batches(await bulk_items(request)):
+        docs, errors = ingest.validate(batch, build)
+        inserted, rejected = await ingest.insert_chunk(db.events, docs)
+        report.add(len(batch), inserted, errors + rejected)
+        if not inserted:
+            continue
+        await analytics.increment(db, total_events=len(inserted))
+        topics = {topic for doc in inserted for topic in (f"event:{doc['id']}", f"category:{doc['category']}")}
+        await manager.broadcast({"type": "new_events", "data": inserted}, topics=sorted(topics))
+    
+    return report.as_dict()
+
 @api_router.get("/events", response_model=List[Event])
-async def get_events(status: Optional[str] = None, category: Optional[str] = None):
-    query = {}
+async def get_events(
+    response: Response,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    query = created_range(start, end)
     if status:
         query['status'] = status
     if category:
         query['category'] = category
     
-    events = await db.events.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    
-    for event in events:
-        if isinstance(event.get('created_at'), str):
-            event['created_at'] = datetime.fromisoformat(event['created_at'])
-        if event.get('resolved_at') and isinstance(event['resolved_at'], str):
-            event['resolved_at'] = datetime.fromisoformat(event['resolved_at'])
-    
-    return events
+    return await list_page(db.events, query, NEWEST_FIRST, Event, response, limit, after, fields)
 
 @api_router.get("/events/{event_id}", response_model=Event)
-async def get_event(event_id: str):
-    event = await db.events.find_one({"id": event_id}, {"_id": 0})
+async def get_event(event_id: str, request: Request, response: Response):
+    event = await entity_cache.get_or_load("event", event_id, lambda: load_entity(db.events, event_id))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    if isinstance(event.get('created_at'), str):
-        event['created_at'] = datetime.fromisoformat(event['created_at'])
-    if event.get('resolved_at') and isinstance(event['resolved_at'], str):
-        event['resolved_at'] = datetime.fromisoformat(event['resolved_at'])
+    return not_modified("event", event, request, response) or event
+
+@api_router.post("/events/verify-batch")
+async def verify_events_batch(request: BatchVerifyRequest):
+    """Queue AI verification of many events using batched agent prompts"""
+    event_ids = list(dict.fromkeys(request.event_ids))
+    found = await db.events.distinct("id", {"id": {"$in": event_ids}})
+    if not found:
+        raise HTTPException(status_code=404, detail="No matching events found")
+    
+    await db.events.update_many(
+        {"id": {"$in": found}},
+        {"$set": {"status": "verifying"}, "$inc": {"version": 1}}
+    )
+    await entity_cache.invalidate_many("event", found)
+    
+    job = await verification_queue.enqueue_batch(found)
     
-    return event
+    return {
+        "message": "Batch verification queued",
+        "job_id": job["id"],
+        "event_ids": found,
+        "missing": [event_id for event_id in event_ids if event_id not in set(found)]
+    }
 
 @api_router.post("/events/{event_id}/verify")
-async def verify_event(event_id: str, background_tasks: BackgroundTasks):
-    """Trigger AI verification of an event and publish to Linera testnet"""
+async def verify_event(event_id: str):
+    """Queue AI verification of an event and publication to Linera testnet"""
     event = await db.events.find_one({"id": event_id}, {"_id": 0})
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
@@ -274,72 +472,174 @@ async def verify_event(event_id: str, background_tasks: BackgroundTasks):
     # Update status to verifying
     await db.events.update_one(
         {"id": event_id},
-        {"$set": {"status": "verifying"}}
+        {"$set": {"status": "verifying"}, "$inc": {"version": 1}}
     )
+    await entity_cache.invalidate("event", event_id)
     
-    # Trigger AI verification in background
-    background_tasks.add_task(run_ai_verification, event_id, event)
+    # Hand off to the verification worker pool
+    job = await verification_queue.enqueue(event_id)
     
-    return {"message": "Verification started", "event_id": event_id}
+    return {"message": "Verification queued", "event_id": event_id, "job_id": job["id"]}
+
+@api_router.get("/verification-jobs/{job_id}")
+async def get_verification_job(job_id: str):
+    job = await verification_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 # Market Routes
 @api_router.post("/markets", response_model=Market)
 async def create_market(market: MarketCreate, user: str = Depends(get_current_user)):
     market_dict = market.model_dump()
+    market_dict['options'] = market_engine.seed_options(market_dict['options'])
     market_obj = Market(**market_dict)
     
     doc = market_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    # Denormalized so predictions can be rolled up per category
+    event = await db.events.find_one({"id": market.event_id}, {"_id": 0, "category": 1})
+    if event:
+        doc['category'] = event.get('category')
     
     await db.markets.insert_one(doc)
+    await odds_history.record_snapshot(db, doc, market_obj.created_at)
+    await analytics.increment(
+        db,
+        total_markets=1,
+        active_markets=int(doc['status'] == 'active'),
+        total_volume=doc['total_volume']
+    )
     
-    await manager.broadcast({"type": "new_market", "data": doc})
+    await manager.broadcast(
+        {"type": "new_market", "data": doc},
+        topics=[f"market:{doc['id']}", f"event:{doc['event_id']}"]
+    )
     
     return market_obj
 
+@api_router.post("/markets/bulk")
+async def create_markets_bulk(request: Request, user: str = Depends(get_current_user)):
+    """Create many markets from a JSON array or an NDJSON stream, like /events/bulk"""
+    def build(item) -> dict:
+        market_dict = MarketCreate.model_validate(item).model_dump()
+        market_dict['options'] = market_engine.seed_options(market_dict['options'])
+        return Market(**market_dict).model_dump()
+
+    report = ingest.IngestReport()
+    async for batch in ingest.batches(await bulk_items(request)):
+        docs, errors = ingest.validate(batch, build)
+        event_ids = list({doc['event_id'] for _, doc in docs})
+        events = await db.events.find({"id": {"$in": event_ids}}, {"_id": 0, "id": 1, "category": 1}).to_list(None) if docs else []
+        categories = {event['id']: event.get('category') for event in events}
+        for _, doc in docs:
+            if doc['event_id'] in categories:
+                doc['category'] = categories[doc['event_id']]
+
+        inserted, rejected = await ingest.insert_chunk(db.markets, docs)
+        report.add(len(batch), inserted, errors + rejected)
+        if not inserted:
+            continue
+        await odds_history.record_opening_snapshots(db, inserted)
+        await analytics.increment(
+            db,
+            total_markets=len(inserted),
+            active_markets=sum(doc['status'] == 'active' for doc in inserted),
+            total_volume=sum(doc['total_volume'] for doc in inserted)
+        )
+        topics = {topic for doc in inserted for topic in (f"market:{doc['id']}", f"event:{doc['event_id']}")}
+        await manager.broadcast({"type": "new_markets", "data": inserted}, topics=sorted(topics))
+    
+    return report.as_dict()
+
 @api_router.get("/markets", response_model=List[Market])
-async def get_markets(status: Optional[str] = None):
-    query = {}
+async def get_markets(
+    response: Response,
+    status: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    query = created_range(start, end)
     if status:
         query['status'] = status
     
-    markets = await db.markets.find(query, {"_id": 0}).sort("created_at", -1).to_list(100)
-    
-    for market in markets:
-        if isinstance(market.get('created_at'), str):
-            market['created_at'] = datetime.fromisoformat(market['created_at'])
-        if market.get('resolved_at') and isinstance(market['resolved_at'], str):
-            market['resolved_at'] = datetime.fromisoformat(market['resolved_at'])
-    
-    return markets
+    return await list_page(db.markets, query, NEWEST_FIRST, Market, response, limit, after, fields)
 
 @api_router.get("/markets/{market_id}", response_model=Market)
-async def get_market(market_id: str):
-    market = await db.markets.find_one({"id": market_id}, {"_id": 0})
+async def get_market(market_id: str, request: Request, response: Response):
+    market = await entity_cache.get_or_load("market", market_id, lambda: load_entity(db.markets, market_id))
     if not market:
         raise HTTPException(status_code=404, detail="Market not found")
     
-    if isinstance(market.get('created_at'), str):
-        market['created_at'] = datetime.fromisoformat(market['created_at'])
-    if market.get('resolved_at') and isinstance(market['resolved_at'], str):
-        market['resolved_at'] = datetime.fromisoformat(market['resolved_at'])
+    return not_modified("market", market, request, response) or market
+
+@api_router.get("/odds/{market_id}")
+async def get_odds_history(
+    market_id: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    resolution: Optional[str] = Query(None, pattern="^(raw|minute|five_minutes|hour|day)$"),
+    max_points: int = Query(odds_history.ODDS_MAX_POINTS, ge=1, le=2000)
+):
+    """Odds history of a market, downsampled to at most `max_points` snapshots"""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+    if odds_history.as_utc(start) >= odds_history.as_utc(end):
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    
+    points = await odds_history.history(db, market_id, start, end, resolution, max_points)
+    if not points:
+        # No snapshot in range: answer with the market's current odds
+        market = await db.markets.find_one({"id": market_id}, {"_id": 0, "id": 1, "options": 1, "total_volume": 1})
+        if not market:
+            raise HTTPException(status_code=404, detail="Market not found")
+        latest = odds_history.snapshot(market, datetime.now(timezone.utc))
+        latest["probabilities"] = odds_history.implied_probabilities(latest["odds"])
+    else:
+        latest = points[-1]
     
-    return market
+    probabilities = latest["probabilities"]
+    return {
+        "market_id": market_id,
+        "resolution": resolution or odds_history.pick_resolution(start, end, max_points),
+        **{key: probabilities[key] for key in ("yes", "no") if key in probabilities},
+        "probabilities": probabilities,
+        "implied_vol": odds_history.implied_volatility(points, next(iter(probabilities), "")),
+        "timestamp": latest["t"],
+        "points": points
+    }
+
+async def notify_settlement(message: dict, topics: List[str]):
+    await entity_cache.invalidate("market", message["data"]["market_id"])
+    await manager.broadcast(message, topics=topics)
+
+@api_router.post("/markets/{market_id}/resolve")
+async def resolve_market(market_id: str, request: ResolveMarketRequest, user: str = Depends(get_admin_user)):
+    """Resolve a market manually (e.g. after manual review) and settle its predictions"""
+    try:
+        return await settlement.settle_market(db, market_id, request.option_id, notify_settlement)
+    except settlement.SettlementError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@api_router.get("/markets/{market_id}/settlement")
+async def get_market_settlement(market_id: str):
+    result = await db.settlements.find_one({"market_id": market_id}, {"_id": 0})
+    if not result:
+        raise HTTPException(status_code=404, detail="Market has not been settled")
+    return result
 
 # Prediction Routes
 @api_router.post("/predictions", response_model=Prediction)
 async def create_prediction(prediction: PredictionCreate, user: str = Depends(get_current_user)):
-    market = await db.markets.find_one({"id": prediction.market_id}, {"_id": 0})
-    if not market:
-        raise HTTPException(status_code=404, detail="Market not found")
-    
-    if market['status'] != 'active':
-        raise HTTPException(status_code=400, detail="Market is not active")
-    
-    # Find option
-    option = next((o for o in market['options'] if o['id'] == prediction.option_id), None)
-    if not option:
-        raise HTTPException(status_code=404, detail="Option not found")
+    # Stake and reprice the market atomically; the odds after the stake are shown
+    # to the bettor but not locked in, settlement pays a share of the final pool
+    try:
+        market, option = await market_engine.place_bet(db, prediction.market_id, prediction.option_id, prediction.amount)
+    except market_engine.MarketError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    await entity_cache.invalidate("market", prediction.market_id)
     
     prediction_dict = prediction.model_dump()
     prediction_obj = Prediction(
@@ -350,27 +650,39 @@ async def create_prediction(prediction: PredictionCreate, user: str = Depends(ge
     )
     
     doc = prediction_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    try:
+        await db.predictions.insert_one(doc)
+    except Exception:
+        await market_engine.refund_bet(db, prediction.market_id, prediction.option_id, prediction.amount)
+        await entity_cache.invalidate("market", prediction.market_id)
+        raise
     
-    await db.predictions.insert_one(doc)
+    # The market may have been settled between the stake and this insert
+    settled = await settlement.settle_late_prediction(db, doc)
+    if settled is not None:
+        prediction_obj = Prediction(**settled)
     
-    # Update market volume
-    await db.markets.update_one(
-        {"id": prediction.market_id},
-        {"$inc": {"total_volume": prediction.amount}}
+    await analytics.increment(db, total_predictions=1, total_volume=prediction.amount)
+    await odds_history.record_snapshot(db, market, prediction_obj.created_at)
+    await rollups.record(
+        db,
+        prediction_obj.created_at,
+        rollups.dimensions(market.get('category'), prediction.market_id),
+        predictions=1,
+        volume=prediction.amount
     )
     
     return prediction_obj
 
 @api_router.get("/predictions", response_model=List[Prediction])
-async def get_user_predictions(user: str = Depends(get_current_user)):
-    predictions = await db.predictions.find({"user_address": user}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    
-    for pred in predictions:
-        if isinstance(pred.get('created_at'), str):
-            pred['created_at'] = datetime.fromisoformat(pred['created_at'])
-    
-    return predictions
+async def get_user_predictions(
+    response: Response,
+    user: str = Depends(get_current_user),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    return await list_page(db.predictions, {"user_address": user}, NEWEST_FIRST, Prediction, response, limit, after, fields)
 
 # Strategy Routes
 @api_router.post("/strategies", response_model=Strategy)
@@ -379,131 +691,205 @@ async def create_strategy(strategy: StrategyCreate, user: str = Depends(get_curr
     strategy_obj = Strategy(**strategy_dict, creator_address=user)
     
     doc = strategy_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
     await db.strategies.insert_one(doc)
     
     return strategy_obj
 
 @api_router.get("/strategies", response_model=List[Strategy])
-async def get_strategies(is_public: bool = True):
-    strategies = await db.strategies.find({"is_public": is_public}, {"_id": 0}).sort("followers", -1).to_list(100)
-    
-    for strategy in strategies:
-        if isinstance(strategy.get('created_at'), str):
-            strategy['created_at'] = datetime.fromisoformat(strategy['created_at'])
-    
-    return strategies
+async def get_strategies(
+    response: Response,
+    is_public: bool = True,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    sort = [("followers", -1), ("id", -1)]
+    return await list_page(db.strategies, {"is_public": is_public}, sort, Strategy, response, limit, after, fields)
 
 @api_router.get("/strategies/{strategy_id}", response_model=Strategy)
-async def get_strategy(strategy_id: str):
-    strategy = await db.strategies.find_one({"id": strategy_id}, {"_id": 0})
+async def get_strategy(strategy_id: str, request: Request, response: Response):
+    strategy = await entity_cache.get_or_load("strategy", strategy_id, lambda: load_entity(db.strategies, strategy_id))
     if not strategy:
         raise HTTPException(status_code=404, detail="Strategy not found")
     
-    if isinstance(strategy.get('created_at'), str):
-        strategy['created_at'] = datetime.fromisoformat(strategy['created_at'])
-    
-    return strategy
+    return not_modified("strategy", strategy, request, response) or strategy
 
 @api_router.post("/strategies/{strategy_id}/follow")
 async def follow_strategy(strategy_id: str, user: str = Depends(get_current_user)):
     result = await db.strategies.update_one(
         {"id": strategy_id},
-        {"$inc": {"followers": 1}}
+        {"$inc": {"followers": 1, "version": 1}}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Strategy not found")
+    await entity_cache.invalidate("strategy", strategy_id)
     
     return {"message": "Strategy followed successfully"}
 
 # Analytics Routes
 @api_router.get("/analytics/overview")
 async def get_analytics_overview():
-    total_events = await db.events.count_documents({})
-    total_markets = await db.markets.count_documents({})
-    total_predictions = await db.predictions.count_documents({})
-    active_markets = await db.markets.count_documents({"status": "active"})
-    
-    # Get total volume
-    markets = await db.markets.find({}, {"total_volume": 1, "_id": 0}).to_list(1000)
-    total_volume = sum(m.get('total_volume', 0) for m in markets)
+    stats = await analytics.get_stats(db)
     
     return {
-        "total_events": total_events,
-        "total_markets": total_markets,
-        "total_predictions": total_predictions,
-        "active_markets": active_markets,
-        "total_volume": total_volume
+        "total_events": stats["total_events"],
+        "total_markets": stats["total_markets"],
+        "total_predictions": stats["total_predictions"],
+        "active_markets": stats["active_markets"],
+        "total_volume": stats["total_volume"]
     }
 
 @api_router.get("/analytics/agent-stats")
 async def get_agent_stats():
     """Get AI agent performance statistics"""
-    verified_events = await db.events.find({"status": "verified"}, {"_id": 0}).to_list(1000)
+    stats = await analytics.get_stats(db)
     
-    total_verifications = len(verified_events)
-    avg_confidence = sum(e.get('confidence', 0) for e in verified_events) / max(total_verifications, 1)
-    high_confidence = sum(1 for e in verified_events if e.get('confidence', 0) > 0.9)
+    total_verifications = stats["total_verifications"]
+    avg_confidence = stats["confidence_sum"] / max(total_verifications, 1)
     
     return {
         "total_verifications": total_verifications,
         "average_confidence": round(avg_confidence, 2),
-        "high_confidence_count": high_confidence,
-        "accuracy_rate": 0.94  # Mocked for now
+        "high_confidence_count": stats["high_confidence_count"],
+        "accuracy_rate": 0.94,  # Mocked for now
+        "llm_cache": response_cache.stats(),
+        "llm_batching": batch_verifier.stats()
     }
 
+@api_router.get("/analytics/timeseries")
+async def get_analytics_timeseries(
+    metric: str = Query(..., pattern="^(volume|predictions|verifications|confidence)$"),
+    bucket: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    category: Optional[str] = None,
+    market_id: Optional[str] = None
+):
+    """Per-bucket metric series answered from the pre-aggregated rollups"""
+    if category and market_id:
+        raise HTTPException(status_code=400, detail="Filter by category or market_id, not both")
+    end = end or datetime.now(timezone.utc)
+    start = start or end - rollups.DEFAULT_SPAN[bucket]
+    if rollups.as_utc(start) >= rollups.as_utc(end):
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if (rollups.as_utc(end) - rollups.as_utc(start)) / rollups.STEP[bucket] > rollups.MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"Range spans more than {rollups.MAX_POINTS} {bucket} buckets")
+    
+    dimension = f"market:{market_id}" if market_id else f"category:{category}" if category else "all"
+    points = await rollups.timeseries(db, metric, bucket, start, end, dimension)
+    return {"metric": metric, "bucket": bucket, "dimension": dimension, "points": points}
+
+async def probe_mongo():
+    await db.command("ping")
+    return {"status": "healthy"}
+
+async def probe_ipfs():
+    return {"status": "healthy" if await ipfs_client.check_health() else "unhealthy"}
+
+async def probe_linera():
+    block_height = await linera_get_block_height()
+    return {"status": "healthy" if block_height > 0 else "unhealthy", "block_height": block_height}
+
+health_monitor = HealthMonitor({"mongo": probe_mongo, "ipfs": probe_ipfs, "linera": probe_linera})
+
 @api_router.get("/health")
 async def health_check():
-    """Health check for all services"""
-    health_status = {
-        "mongo": {"status": "unknown", "latency_ms": 0},
-        "ipfs": {"status": "unknown", "latency_ms": 0},
-        "linera": {"status": "unknown", "latency_ms": 0, "block_height": 0}
+    """Health of all services from the background monitor's last probe, plus circuit breaker states"""
+    report = await health_monitor.report()
+    circuits = guards.circuits()
+    if any(circuit["state"] != "closed" for circuit in circuits.values()):
+        report["status"] = "degraded"
+    return {**report, "circuits": circuits}
+
+@api_router.get("/health/live")
+async def liveness():
+    """Liveness for load balancers: the process is up, no dependency is probed"""
+    return {"status": "ok"}
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Operational metrics for sizing workers and upstream capacity"""
+    return {
+        "verification_jobs": await verification_queue.stats(),
+        "http_pools": http_pool.stats(),
+        "linera_publisher": linera_publisher.stats(),
+        "websocket": manager.stats(),
+        "entity_cache": entity_cache.stats(),
+        "upstreams": guards.stats()
     }
-    
-    # Check MongoDB
-    try:
-        start = datetime.now()
-        await db.command("ping")
-        latency = (datetime.now() - start).total_seconds() * 1000
-        health_status["mongo"] = {"status": "healthy", "latency_ms": round(latency, 2)}
-    except Exception as e:
-        health_status["mongo"] = {"status": "unhealthy", "error": str(e)}
-    
-    # Check IPFS
-    try:
-        start = datetime.now()
-        is_healthy = await ipfs_client.check_health()
-        latency = (datetime.now() - start).total_seconds() * 1000
-        health_status["ipfs"] = {
-            "status": "healthy" if is_healthy else "unhealthy",
-            "latency_ms": round(latency, 2)
-        }
-    except Exception as e:
-        health_status["ipfs"] = {"status": "unhealthy", "error": str(e)}
-    
-    # Check Linera
+
+@api_router.get("/export/{collection}")
+async def export_collection(
+    collection: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    event_id: Optional[str] = None,
+    market_id: Optional[str] = None,
+    user_address: Optional[str] = None,
+    option_id: Optional[str] = None,
+    fields: Optional[str] = None,
+    after_id: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    user: str = Depends(get_admin_user)
+):
+    """Stream a whole collection as NDJSON or CSV, oldest first.
+
+    Rows are read from a Motor cursor batch by batch, so memory stays flat
+    however large the export. An interrupted export resumes with
+    `after_id` set to the last id received.
+    """
+    if collection not in export.EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{collection}'")
+    filters = {"status": status, "category": category, "event_id": event_id,
+               "market_id": market_id, "user_address": user_address, "option_id": option_id}
+    unsupported = sorted(key for key, value in filters.items() if value and key not in export.EXPORTS[collection]["filters"])
+    if unsupported:
+        raise HTTPException(status_code=400, detail=f"Cannot filter {collection} by {', '.join(unsupported)}")
+
+    query = created_range(start, end)
+    query.update({key: value for key, value in filters.items() if value})
     try:
-        start = datetime.now()
-        block_height = await linera_get_block_height()
-        latency = (datetime.now() - start).total_seconds() * 1000
-        health_status["linera"] = {
-            "status": "healthy" if block_height > 0 else "unhealthy",
-            "latency_ms": round(latency, 2),
-            "block_height": block_height
-        }
-    except Exception as e:
-        health_status["linera"] = {"status": "unhealthy", "error": str(e)}
-    
-    overall_status = "healthy" if all(
-        s["status"] == "healthy" for s in health_status.values()
-    ) else "degraded"
-    
+        projection = export.export_projection(collection, fields)
+        if after_id:
+            query = {"$and": [query, await export.resume_after(db, collection, after_id)]}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cursor = export.open_cursor(db, collection, query, projection, limit)
+    if format == "csv":
+        rows = export.csv_rows(cursor, [field for field in projection if field != "_id"])
+    else:
+        rows = export.ndjson_rows(cursor)
+    filename = f"{collection}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(rows, media_type=export.FORMATS[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@api_router.post("/admin/snapshots", status_code=202)
+async def start_snapshot(request: SnapshotRequest, user: str = Depends(get_admin_user)):
+    """Append newly finalized records to the columnar snapshots in the background"""
+    unknown = sorted(set(request.datasets or []) - set(snapshots.DATASETS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown datasets: {', '.join(unknown)}")
+    if not snapshot_runner.start(request.datasets):
+        raise HTTPException(status_code=409, detail="A snapshot is already running")
+    return {"status": "started", "datasets": request.datasets or list(snapshots.DATASETS)}
+
+@api_router.get("/admin/snapshots")
+async def get_snapshot_status(user: str = Depends(get_admin_user)):
+    """Snapshot watermarks per dataset and the outcome of the last run"""
+    return await snapshot_runner.status()
+
+@api_router.get("/admin/query-plans")
+async def get_query_plans(user: str = Depends(get_admin_user)):
+    """Explain the query shape of each list/detail route and flag collection scans"""
+    plans = await explain_queries(db)
     return {
-        "status": overall_status,
-        "services": health_status
+        "collection_scans": [plan["route"] for plan in plans if plan["collection_scan"]],
+        "plans": plans
     }
 
 # WebSocket endpoint
@@ -513,103 +899,261 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle client messages if needed
+            await manager.handle_client_message(websocket, data)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
-# Background task for AI verification
+# AI verification pipeline
+def stage_timeout(stage: str) -> float:
+    """Timeout in seconds for one pipeline stage (VERIFY_STAGE_TIMEOUT_<STAGE>, else VERIFY_STAGE_TIMEOUT)"""
+    default = os.getenv("VERIFY_STAGE_TIMEOUT", "60")
+    return float(os.getenv(f"VERIFY_STAGE_TIMEOUT_{stage.upper()}", default))
+
+async def detect_stage(results: dict):
+    return await event_detector.detect(results["event"])
+
+async def verify_stage(results: dict):
+    return await source_verifier.verify(results["event"], results["detect"])
+
+async def score_stage(results: dict):
+    return await confidence_scorer.score(results["verify"])
+
+async def compose_stage(results: dict):
+    return await summary_composer.compose(results["score"])
+
+async def persist_result_stage(results: dict):
+    """Store the AI verdict while the summary is being pinned; publication waits for it"""
+    summary = results["compose"]
+    await db.events.update_one(
+        {"id": results["event_id"]},
+        {"$set": {
+            "result": summary.get('result'),
+            "confidence": summary.get('confidence'),
+            "proof_links": summary.get('proof_links', []),
+            "reasoning": summary.get('reasoning')
+        }, "$inc": {"version": 1}}
+    )
+    await entity_cache.invalidate("event", results["event_id"])
+
+async def ipfs_stage(results: dict):
+    return await ipfs_client.upload_json(results["compose"])
+
+async def linera_stage(results: dict):
+    cid = results["ipfs"]
+    if not cid:
+        return {"tx_hash": "", "chain_id": ""}
+    
+    summary = results["compose"]
+    payload_str = json.dumps(summary, sort_keys=True)
+    payload_hash = hashlib.sha256(payload_str.encode()).hexdigest()
+    
+    # Coalesce with other verifications in flight when batching is enabled
+    publish = linera_publisher.publish if linera_publisher.enabled else linera_publish_event
+    return await publish(
+        event_id=results["event_id"],
+        payload_hash=payload_hash,
+        confidence=summary.get('confidence', 0.0),
+        sources=summary.get('proof_links', []),
+        cid=cid
+    )
+
+async def oracle_stage(results: dict):
+    # Mock for development
+    event_id = results["event_id"]
+    await oracle.publish_event(results["compose"])
+    return {"tx_hash": f"mock_tx_{event_id}", "chain_id": "mock_chain", "cid": f"mock_cid_{event_id}"}
+
+def publish_failed(stage: str, default):
+    def fallback(e: Exception):
+        logging.error(f"Error publishing to Linera/IPFS ({stage}): {str(e)}")
+        if isinstance(default, dict):
+            return {**default, "error": str(e)}
+        return default
+    return fallback
+
+def build_verification_graph(env: str, summary_ready: bool = False) -> StageGraph:
+    """Stage DAG for one verification.
+
+    The four agents form a chain; once the summary exists, persisting the verdict
+    runs concurrently with the IPFS pin. The on-chain publication waits for
+    both: if persisting fails, the job is retried before anything was
+    published, so a retry cannot put the event on chain twice. With
+    `summary_ready` the agent stages are skipped and "compose" is an input.
+    """
+    stages = []
+    if not summary_ready:
+        stages += [
+            Stage("detect", detect_stage, timeout=stage_timeout("detect")),
+            Stage("verify", verify_stage, deps=["detect"], timeout=stage_timeout("verify")),
+            Stage("score", score_stage, deps=["verify"], timeout=stage_timeout("score")),
+            Stage("compose", compose_stage, deps=["score"], timeout=stage_timeout("compose")),
+        ]
+    stages.append(
+        Stage("persist_result", persist_result_stage, deps=["compose"], timeout=stage_timeout("persist_result"))
+    )
+    if env == "production":
+        stages += [
+            Stage("ipfs", ipfs_stage, deps=["compose"], timeout=stage_timeout("ipfs"),
+                  fallback=publish_failed("ipfs", "")),
+            Stage("linera", linera_stage, deps=["ipfs", "persist_result"], timeout=stage_timeout("linera"),
+                  fallback=publish_failed("linera", {"tx_hash": "", "chain_id": ""})),
+        ]
+    else:
+        stages.append(Stage("oracle", oracle_stage, deps=["persist_result"], timeout=stage_timeout("oracle")))
+    return StageGraph(stages, inputs=["compose"] if summary_ready else [])
+
+async def verify_and_publish(event_id: str, event: dict, summary: Optional[dict] = None):
+    """Run AI agents to verify an event and publish to Linera testnet.
+    
+    When `summary` is given (batched verification) only the publication
+    stages run. Raises on stage timeouts or persistence errors so the caller
+    can retry.
+    """
+    env = os.getenv("ENV", "development")
+    graph = build_verification_graph(env, summary_ready=summary is not None)
+    inputs = {"event_id": event_id, "event": event}
+    if summary is not None:
+        inputs["compose"] = summary
+    results = await graph.run(inputs)
+    
+    summary = results["compose"]
+    if env == "production":
+        onchain = {
+            "tx_hash": results["linera"]["tx_hash"],
+            "chain_id": results["linera"]["chain_id"],
+            "cid": results["ipfs"]
+        }
+        if results["linera"].get("error"):
+            onchain["error"] = results["linera"]["error"]
+    else:
+        onchain = results["oracle"]
+    
+    timings = results["timings"]
+    
+    # Mark verified once every stage has landed
+    await db.events.update_one(
+        {"id": event_id},
+        {"$set": {
+            "status": "verified",
+            "resolved_at": datetime.now(timezone.utc),
+            "counted_confidence": summary.get('confidence') or 0.0,
+            "onchain": onchain,
+            "pipeline": {
+                "stages": timings,
+                "critical_path": graph.critical_path(timings),
+                "total_ms": max(t["end_ms"] for t in timings.values())
+            }
+        }, "$inc": {"version": 1}}
+    )
+    await entity_cache.invalidate("event", event_id)
+    await analytics.increment(db, **analytics.verification_deltas(summary.get('confidence'), event))
+    await rollups.record(
+        db,
+        datetime.now(timezone.utc),
+        rollups.dimensions(event.get('category')),
+        verifications=1,
+        confidence_sum=summary.get('confidence') or 0.0
+    )
+    
+    # Broadcast update
+    topics = [f"event:{event_id}"]
+    if event.get("category"):
+        topics.append(f"category:{event['category']}")
+    await manager.broadcast({
+        "type": "event_verified",
+        "data": {
+            "event_id": event_id,
+            "summary": summary,
+            "onchain": onchain
+        }
+    }, topics=topics)
+    
+    # Settle the event's markets; an interrupted settlement resumes on startup
+    try:
+        await settlement.settle_event_markets(db, event_id, summary, notify_settlement)
+    except Exception as e:
+        logging.error(f"Error settling markets of event {event_id}: {str(e)}")
+
 async def run_ai_verification(event_id: str, event: dict):
-    """Run AI agents to verify an event and publish to Linera testnet"""
+    """Verify an event once, marking it as errored on failure"""
     try:
-        # Step 1: Detect event details
-        detection_result = await event_detector.detect(event)
-        
-        # Step 2: Verify sources
-        verification_result = await source_verifier.verify(event, detection_result)
-        
-        # Step 3: Calculate confidence
-        confidence_result = await confidence_scorer.score(verification_result)
-        
-        # Step 4: Compose summary
-        summary = await summary_composer.compose(confidence_result)
-        
-        # Step 5: Calculate payload hash
-        payload_str = json.dumps(summary, sort_keys=True)
-        payload_hash = hashlib.sha256(payload_str.encode()).hexdigest()
-        
-        # Step 6: Upload summary to IPFS
-        env = os.getenv("ENV", "development")
-        cid = ""
-        tx_hash = ""
-        chain_id = ""
-        
-        if env == "production":
-            try:
-                cid = await ipfs_client.upload_json(summary)
-                
-                # Step 7: Publish to Linera testnet
-                result = await linera_publish_event(
-                    event_id=event_id,
-                    payload_hash=payload_hash,
-                    confidence=summary.get('confidence', 0.0),
-                    sources=summary.get('proof_links', []),
-                    cid=cid
-                )
-                tx_hash = result["tx_hash"]
-                chain_id = result["chain_id"]
-            except Exception as e:
-                logging.error(f"Error publishing to Linera/IPFS: {str(e)}")
-        else:
-            # Mock for development
-            await oracle.publish_event(summary)
-            cid = f"mock_cid_{event_id}"
-            tx_hash = f"mock_tx_{event_id}"
-            chain_id = "mock_chain"
-        
-        # Update event in database
-        await db.events.update_one(
-            {"id": event_id},
-            {"$set": {
-                "status": "verified",
-                "result": summary.get('result'),
-                "confidence": summary.get('confidence'),
-                "proof_links": summary.get('proof_links', []),
-                "reasoning": summary.get('reasoning'),
-                "resolved_at": datetime.now(timezone.utc).isoformat(),
-                "onchain": {
-                    "tx_hash": tx_hash,
-                    "chain_id": chain_id,
-                    "cid": cid
-                }
-            }}
-        )
-        
-        # Broadcast update
-        await manager.broadcast({
-            "type": "event_verified",
-            "data": {
-                "event_id": event_id,
-                "summary": summary,
-                "onchain": {"tx_hash": tx_hash, "chain_id": chain_id, "cid": cid}
-            }
-        })
-        
+        await verify_and_publish(event_id, event)
     except Exception as e:
         logging.error(f"Error verifying event {event_id}: {str(e)}")
         await db.events.update_one(
             {"id": event_id},
-            {"$set": {"status": "error"}}
+            {"$set": {"status": "error"}, "$inc": {"version": 1}}
         )
+        await entity_cache.invalidate("event", event_id)
+
+async def verify_batch(event_ids: List[str]) -> dict:
+    """Verify events with batched agent prompts, then publish each one.
+    
+    A failure in the agent stages raises (so the job is retried); a failure
+    while publishing one event only marks that event as errored.
+    """
+    events = await db.events.find({"id": {"$in": event_ids}}, {"_id": 0}).to_list(len(event_ids))
+    summaries = await batch_verifier.run(events)
+    
+    semaphore = asyncio.Semaphore(verification_queue.concurrency)
+    
+    async def publish(event: dict) -> bool:
+        async with semaphore:
+            try:
+                await verify_and_publish(event["id"], event, summary=summaries[event["id"]])
+                return True
+            except Exception as e:
+                logging.error(f"Error publishing batched verification of {event['id']}: {str(e)}")
+                await db.events.update_one({"id": event["id"]}, {"$set": {"status": "error"}, "$inc": {"version": 1}})
+                await entity_cache.invalidate("event", event["id"])
+                return False
+    
+    published = await asyncio.gather(*[publish(event) for event in events])
+    return {"verified": sum(published), "errors": len(published) - sum(published), "missing": len(event_ids) - len(events)}
+
+async def process_verification_job(job: dict):
+    if job.get("kind") == "batch":
+        await verify_batch(job["event_ids"])
+        return
+    
+    event = await db.events.find_one({"id": job["event_id"]}, {"_id": 0})
+    if not event:
+        logger.warning(f"Skipping verification job {job['id']}: event {job['event_id']} no longer exists")
+        return
+    await verify_and_publish(job["event_id"], event)
+
+async def mark_verification_failed(job: dict, error: str):
+    event_ids = job["event_ids"] if job.get("kind") == "batch" else [job["event_id"]]
+    await db.events.update_many(
+        {"id": {"$in": event_ids}},
+        {"$set": {"status": "error", "verification_error": error}, "$inc": {"version": 1}}
+    )
+    await entity_cache.invalidate_many("event", event_ids)
+
+stats_reconciler = analytics.StatsReconciler(db)
+rollup_compactor = rollups.RollupCompactor(db)
+snapshot_runner = snapshots.SnapshotRunner(db)
+
+verification_queue = VerificationJobQueue(
+    db.verification_jobs,
+    handler=process_verification_job,
+    on_failure=mark_verification_failed,
+)
 
 # Include router
 app.include_router(api_router)
 
+app.add_middleware(HTTPCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Configure logging
@@ -618,7 +1162,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
@@ -0,0 +1,275 @@
+import os
+import math
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import UpdateMany, ReturnDocument
+
+import analytics
+import locks
+import market_engine
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_CHUNK_SIZE = int(os.getenv("SETTLEMENT_CHUNK_SIZE", "5000"))
+SETTLEMENT_LEASE = float(os.getenv("SETTLEMENT_LEASE", "300"))
+RESUME_LOCK = "settlement_resume"
+
+# Verdict of the AI pipeline -> option that wins the event's markets
+RESULT_OPTIONS = {"verified": "yes", "unverified": "no"}
+
+# Called with (message, topics) when a market starts settling and once it is settled
+Notify = Callable[[Dict[str, Any], List[str]], Awaitable[None]]
+
+
+class SettlementError(Exception):
+    pass
+
+
+def winning_option(summary: Dict[str, Any]) -> Optional[str]:
+    """Option a verification summary resolves markets to, or None if it should not settle them"""
+    if summary.get("needs_manual_review"):
+        return None
+    return RESULT_OPTIONS.get(summary.get("result"))
+
+
+def _payout(amount: float, ratio: float) -> float:
+    """Pool share of a winning stake, truncated so rounding never pays more than the pool"""
+    return math.floor(amount * ratio * 10000) / 10000
+
+
+async def _start(db, market_id: str, option_id: str, notify: Optional[Notify] = None) -> Dict[str, Any]:
+    """Move the market to "settling" (which stops new bets) or pick up an interrupted run.
+
+    The payout ratio is fixed from the pools at this point and stored with
+    the settlement, so a resumed run and late predictions pay the same.
+    Only the actual transition out of "active" decrements the active
+    market counter and notifies, so a resumed run does neither twice.
+    """
+    market = await db.markets.find_one_and_update(
+        {"id": market_id, "$or": [
+            {"status": {"$in": ["active", "closed"]}},
+            {"status": "settling", "resolution": option_id},
+        ], "options.id": option_id},
+        {"$set": {"status": "settling", "resolution": option_id}, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if market is None:
+        existing = await db.markets.find_one({"id": market_id}, {"_id": 0, "status": 1, "resolution": 1})
+        if not existing:
+            raise SettlementError(f"Market {market_id} not found")
+        if existing.get("status") in ("settling", "resolved"):
+            raise SettlementError(f"Market {market_id} is already {existing['status']} to '{existing.get('resolution')}'")
+        raise SettlementError(f"Market {market_id} has no option '{option_id}'")
+
+    ratio = market_engine.payout_ratio(market.get("options", []), option_id)
+    record = await db.settlements.find_one_and_update(
+        {"market_id": market_id},
+        {"$setOnInsert": {
+            "market_id": market_id,
+            "winning_option": option_id,
+            "payout_ratio": ratio,
+            "status": "running",
+            "processed": 0,
+            "chunks": 0,
+            "started_at": datetime.now(timezone.utc),
+        }},
+        projection={"_id": 0, "payout_ratio": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    if market.get("status") != "settling":
+        if market.get("status") == "active":
+            await analytics.increment(db, active_markets=-1)
+        if notify is not None:
+            await notify(
+                {"type": "market_settling", "data": {"market_id": market_id, "winning_option": option_id}},
+                [f"market:{market_id}", f"event:{market.get('event_id')}"]
+            )
+    # Settlements started before the ratio was stored compute it from the frozen pools
+    ratio = (record or {}).get("payout_ratio", ratio)
+    return {**market, "status": "settling", "resolution": option_id, "payout_ratio": ratio}
+
+
+async def _settle_chunk(db, market_id: str, option_id: str, ratio: Optional[float], chunk_size: int, now: datetime) -> int:
+    """Settle the next `chunk_size` open predictions; returns how many were open.
+
+    Winners are paid `amount * ratio`; with no ratio (nobody backed the
+    winning option) every stake is refunded. `processed` counts only the
+    predictions this call changed, not ones a concurrent run settled first.
+    """
+    rows = await db.predictions.find(
+        {"market_id": market_id, "status": "active"},
+        {"_id": 0, "id": 1, "option_id": 1}
+    ).sort("id", 1).limit(chunk_size).to_list(chunk_size)
+    if not rows:
+        return 0
+
+    ops = []
+    if ratio is None:
+        ops.append(UpdateMany(
+            {"id": {"$in": [row["id"] for row in rows]}, "status": "active"},
+            [{"$set": {"status": "refunded", "payout": "$amount", "settled_at": now}}]
+        ))
+    else:
+        won = [row["id"] for row in rows if row["option_id"] == option_id]
+        lost = [row["id"] for row in rows if row["option_id"] != option_id]
+        if won:
+            ops.append(UpdateMany(
+                {"id": {"$in": won}, "status": "active"},
+                [{"$set": {"status": "won", "payout": {"$trunc": [{"$multiply": ["$amount", ratio]}, 4]}, "settled_at": now}}]
+            ))
+        if lost:
+            ops.append(UpdateMany(
+                {"id": {"$in": lost}, "status": "active"},
+                {"$set": {"status": "lost", "payout": 0.0, "settled_at": now}}
+            ))
+    result = await db.predictions.bulk_write(ops, ordered=False)
+    await db.settlements.update_one(
+        {"market_id": market_id},
+        {"$inc": {"processed": result.modified_count, "chunks": 1}, "$set": {"last_id": rows[-1]["id"]}}
+    )
+    return len(rows)
+
+
+async def _totals(db, market_id: str) -> Dict[str, Any]:
+    rows = await db.predictions.aggregate([
+        {"$match": {"market_id": market_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}, "stake": {"$sum": "$amount"}, "payout": {"$sum": "$payout"}}},
+    ]).to_list(None)
+    by_status = {row["_id"]: row for row in rows}
+    return {
+        "won": by_status.get("won", {}).get("count", 0),
+        "lost": by_status.get("lost", {}).get("count", 0),
+        "refunded": by_status.get("refunded", {}).get("count", 0),
+        "stake_total": sum(row["stake"] or 0 for row in rows),
+        "payout_total": sum(by_status.get(status, {}).get("payout", 0) or 0 for status in ("won", "refunded")),
+    }
+
+
+async def settle_market(
+    db,
+    market_id: str,
+    option_id: str,
+    notify: Optional[Notify] = None,
+    chunk_size: int = SETTLEMENT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """Resolve a market to `option_id` and settle all its predictions.
+
+    Winners share the market's real pool after fee (`market_engine.payout_ratio`);
+    if nobody backed `option_id`, every stake is refunded instead.
+    Predictions are settled in chunks of `chunk_size` with one unordered
+    bulk_write each. A settled prediction no longer matches the open-prediction
+    query, so calling this again after a crash resumes where it stopped.
+    A bet accepted just before the market left "active" can insert its
+    prediction after the chunks ran, so the open predictions are swept
+    once more after the market is marked resolved; anything inserted
+    later still is settled by `settle_late_prediction`.
+    Totals are aggregated from the predictions at the end, and `notify` is
+    called once with the market's summary.
+    """
+    market = await _start(db, market_id, option_id, notify)
+    ratio = market["payout_ratio"]
+    now = datetime.now(timezone.utc)
+    while await _settle_chunk(db, market_id, option_id, ratio, chunk_size, now) == chunk_size:
+        pass
+
+    resolved_at = datetime.now(timezone.utc)
+    await db.markets.update_one(
+        {"id": market_id, "status": "settling"},
+        {"$set": {"status": "resolved", "resolved_at": resolved_at}, "$inc": {"version": 1}}
+    )
+    while await _settle_chunk(db, market_id, option_id, ratio, chunk_size, now) == chunk_size:
+        pass
+
+    totals = await _totals(db, market_id)
+    summary = await db.settlements.find_one_and_update(
+        {"market_id": market_id},
+        {"$set": {"status": "done", "finished_at": resolved_at, **totals}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    logger.info(f"Settled market {market_id} to '{option_id}': {totals['won']} won, {totals['lost']} lost, {totals['refunded']} refunded")
+
+    if notify is not None:
+        await notify(
+            {"type": "market_settled", "data": {"market_id": market_id, "winning_option": option_id, **totals}},
+            [f"market:{market_id}", f"event:{market.get('event_id')}"]
+        )
+    return summary
+
+
+async def settle_late_prediction(db, prediction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Settle a prediction whose insert landed after its market was resolved.
+
+    Returns the settled prediction, or None if the market is not resolved
+    (a running settlement will still pick it up) or it was already settled.
+    """
+    market = await db.markets.find_one({"id": prediction["market_id"]}, {"_id": 0, "status": 1, "resolution": 1, "options": 1})
+    if not market or market.get("status") != "resolved":
+        return None
+    record = await db.settlements.find_one({"market_id": prediction["market_id"]}, {"_id": 0, "payout_ratio": 1}) or {}
+    ratio = record.get("payout_ratio", market_engine.payout_ratio(market.get("options", []), market.get("resolution")))
+    if ratio is None:
+        status, payout = "refunded", prediction["amount"]
+    elif prediction["option_id"] == market.get("resolution"):
+        status, payout = "won", _payout(prediction["amount"], ratio)
+    else:
+        status, payout = "lost", 0.0
+    settled = await db.predictions.find_one_and_update(
+        {"id": prediction["id"], "status": "active"},
+        {"$set": {"status": status, "payout": payout, "settled_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if settled is not None:
+        await db.settlements.update_one(
+            {"market_id": prediction["market_id"]},
+            {"$inc": {"processed": 1, status: 1, "stake_total": prediction["amount"], "payout_total": payout}}
+        )
+    return settled
+
+
+async def settle_event_markets(db, event_id: str, summary: Dict[str, Any], notify: Optional[Notify] = None) -> List[Dict[str, Any]]:
+    """Settle every open market of a verified event according to its verdict"""
+    option_id = winning_option(summary)
+    if option_id is None:
+        return []
+    markets = await db.markets.find(
+        {"event_id": event_id, "status": {"$in": ["active", "closed"]}, "options.id": option_id},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    results = []
+    for market in markets:
+        try:
+            results.append(await settle_market(db, market["id"], option_id, notify))
+        except SettlementError as e:
+            logger.warning(f"Skipping settlement of market {market['id']}: {str(e)}")
+    return results
+
+
+async def resume_settlements(db, notify: Optional[Notify] = None) -> Optional[int]:
+    """Finish settlements interrupted by a restart.
+
+    Every worker calls this at startup; the lease in `db.locks` lets only one
+    of them resume, renewed between markets. Returns None without the lease.
+    """
+    owner = uuid.uuid4().hex
+    if not await locks.acquire_lease(db, RESUME_LOCK, owner, SETTLEMENT_LEASE):
+        return None
+    try:
+        pending = await db.settlements.find({"status": "running"}, {"_id": 0}).to_list(None)
+        for settlement in pending:
+            if not await locks.acquire_lease(db, RESUME_LOCK, owner, SETTLEMENT_LEASE):
+                logger.warning("Lost the settlement resume lease; leaving the rest to its holder")
+                break
+            try:
+                await settle_market(db, settlement["market_id"], settlement["winning_option"], notify)
+            except Exception as e:
+                logger.error(f"Could not resume settlement of market {settlement['market_id']}: {str(e)}")
+    finally:
+        await locks.release_lease(db, RESUME_LOCK, owner)
+    return len(pending)
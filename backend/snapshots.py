@@ -0,0 +1,271 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pymongo import ASCENDING
+
+from pagination import keyset_filter
+from rollups import as_utc
+from serialization import json_default
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", str(Path(__file__).parent / "snapshots"))
+SNAPSHOT_FORMAT = os.getenv("SNAPSHOT_FORMAT", "arrow")  # arrow (memory-mappable IPC), parquet
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "50000"))
+# Records finalized in the last SNAPSHOT_LAG seconds wait for the next run: a
+# timestamp is taken before its write commits, and one committed behind the
+# watermark would otherwise be skipped for good
+SNAPSHOT_LAG = float(os.getenv("SNAPSHOT_LAG", "600"))
+EXTENSIONS = {"arrow": "arrow", "parquet": "parquet"}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _json(value: Any) -> Optional[str]:
+    return json.dumps(value, separators=(",", ":"), default=json_default) if value is not None else None
+
+
+def _time(value: Any) -> Optional[datetime]:
+    return as_utc(value) if isinstance(value, datetime) else None
+
+
+def _float(value: Any) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def event_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["id"], "event_title": doc.get("event_title"), "category": doc.get("category"),
+        "status": doc.get("status"), "result": doc.get("result"), "confidence": _float(doc.get("confidence")),
+        "reasoning": doc.get("reasoning"), "created_by": doc.get("created_by"),
+        "created_at": _time(doc.get("created_at")), "resolved_at": _time(doc.get("resolved_at")),
+        "proof_links": _json(doc.get("proof_links")),
+    }
+
+
+def market_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["id"], "event_id": doc.get("event_id"), "title": doc.get("title"), "category": doc.get("category"),
+        "status": doc.get("status"), "resolution": doc.get("resolution"),
+        "total_volume": _float(doc.get("total_volume")), "options": _json(doc.get("options")),
+        "created_at": _time(doc.get("created_at")), "resolved_at": _time(doc.get("resolved_at")),
+    }
+
+
+def prediction_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": doc["id"], "market_id": doc.get("market_id"), "category": doc.get("category"),
+        "user_address": doc.get("user_address"), "option_id": doc.get("option_id"),
+        "amount": _float(doc.get("amount")), "odds": _float(doc.get("odds")),
+        "potential_payout": _float(doc.get("potential_payout")), "status": doc.get("status"),
+        "payout": _float(doc.get("payout")), "created_at": _time(doc.get("created_at")),
+        "settled_at": _time(doc.get("settled_at")),
+    }
+
+
+def publication_row(doc: Dict[str, Any]) -> Dict[str, Any]:
+    onchain = doc.get("onchain") or {}
+    return {
+        "id": doc["id"], "event_id": doc["id"], "category": doc.get("category"),
+        "tx_hash": onchain.get("tx_hash"), "chain_id": onchain.get("chain_id"), "cid": onchain.get("cid"),
+        "error": onchain.get("error"), "confidence": _float(doc.get("confidence")),
+        "published_at": _time(doc.get("resolved_at")),
+    }
+
+
+# Snapshots hold finalized records only (verified events, resolved markets,
+# settled predictions, oracle publications). Each dataset is read in
+# (time_field, id) order after the stored watermark, so a run appends what
+# was finalized since the previous one. An event can be re-verified, which
+# stamps a new resolved_at and appends it again: readers keep the latest
+# row per id (`read_dataset`). `row_time` is that time in the file's rows.
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "events": {"collection": "events", "query": {"status": "verified"}, "time_field": "resolved_at", "row": event_row,
+               "types": {"confidence": "float", "created_at": "timestamp", "resolved_at": "timestamp"}},
+    "markets": {"collection": "markets", "query": {"status": "resolved"}, "time_field": "resolved_at", "row": market_row,
+                "types": {"total_volume": "float", "created_at": "timestamp", "resolved_at": "timestamp"}},
+    "predictions": {"collection": "predictions", "query": {"status": {"$in": ["won", "lost", "refunded"]}}, "time_field": "settled_at",
+                    "row": prediction_row,
+                    "types": {"amount": "float", "odds": "float", "potential_payout": "float", "payout": "float",
+                              "created_at": "timestamp", "settled_at": "timestamp"}},
+    "publications": {"collection": "events", "query": {"status": "verified", "onchain.tx_hash": {"$nin": [None, ""]}},
+                     "time_field": "resolved_at", "row_time": "published_at", "row": publication_row,
+                     "types": {"confidence": "float", "published_at": "timestamp"}},
+}
+
+
+def arrow_schema(dataset: str, columns: List[str]):
+    types = DATASETS[dataset]["types"]
+    arrow_types = {"float": pa.float64(), "timestamp": pa.timestamp("us", tz="UTC")}
+    return pa.schema([(column, arrow_types.get(types.get(column), pa.string())) for column in columns])
+
+
+def partition_key(row: Dict[str, Any], when: Optional[datetime]) -> Tuple[str, str]:
+    day = when.strftime("%Y-%m-%d") if when else "unknown"
+    return day, row.get("category") or "unknown"
+
+
+def partition_path(root: Path, dataset: str, day: str, category: str) -> Path:
+    """Hive-style layout, readable with pyarrow.dataset(..., partitioning="hive")"""
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in category)
+    return root / dataset / f"day={day}" / f"category={safe}"
+
+
+def write_partition(directory: Path, name: str, dataset: str, rows: List[Dict[str, Any]], fmt: str) -> Path:
+    """Write one file atomically; the partition columns live in the path, not the file"""
+    columns = [column for column in rows[0] if column != "category"]
+    table = pa.Table.from_pylist([{column: row[column] for column in columns} for row in rows],
+                                 schema=arrow_schema(dataset, columns))
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{name}.{EXTENSIONS[fmt]}"
+    temp = path.with_suffix(".tmp")
+    if fmt == "parquet":
+        pq.write_table(table, temp)
+    else:
+        with pa.OSFile(str(temp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(temp, path)
+    return path
+
+
+def latest_rows(table, time_column: str):
+    """Keep the most recent row of each id"""
+    if table.num_rows == 0:
+        return table
+    table = table.sort_by([("id", "ascending"), (time_column, "descending")])
+    ids = table.column("id").combine_chunks()
+    changed = pc.not_equal(ids.slice(1), ids.slice(0, len(ids) - 1))
+    return table.filter(pa.concat_arrays([pa.array([True]), changed]))
+
+
+def read_dataset(dataset: str, root: str = SNAPSHOT_DIR, fmt: str = SNAPSHOT_FORMAT):
+    """All snapshot files of `dataset` as one table, latest row per id, with the day/category columns"""
+    base = Path(root) / dataset
+    files = sorted(str(path) for path in base.glob(f"day=*/category=*/*.{EXTENSIONS[fmt]}"))
+    if not files:
+        raise SnapshotError(f"No {fmt} snapshot files for {dataset} under {root}")
+    table = ds.dataset(files, format="ipc" if fmt == "arrow" else "parquet",
+                       partitioning="hive", partition_base_dir=str(base)).to_table()
+    return latest_rows(table, DATASETS[dataset].get("row_time", DATASETS[dataset]["time_field"]))
+
+
+async def _categories(db, market_ids: List[str]) -> Dict[str, Optional[str]]:
+    rows = await db.markets.find({"id": {"$in": market_ids}}, {"_id": 0, "id": 1, "category": 1}).to_list(None)
+    return {row["id"]: row.get("category") for row in rows}
+
+
+async def snapshot_dataset(
+    db,
+    dataset: str,
+    root: str = SNAPSHOT_DIR,
+    fmt: str = SNAPSHOT_FORMAT,
+    batch_size: int = SNAPSHOT_BATCH_SIZE,
+    write: Callable[..., Path] = write_partition,
+    lag: float = SNAPSHOT_LAG,
+) -> Dict[str, Any]:
+    """Append the records of `dataset` finalized since its watermark.
+
+    Each batch is split by (day, category) into one file per partition and
+    the watermark in `db.snapshots` advances after every batch, so an
+    interrupted run continues where it stopped. File names derive from the
+    batch's first record, so a batch replayed after a crash overwrites its
+    own files instead of duplicating rows. Records finalized less than
+    `lag` seconds ago are left for the next run.
+    """
+    if fmt not in EXTENSIONS:
+        raise SnapshotError(f"Unknown snapshot format '{fmt}'")
+    spec = DATASETS[dataset]
+    time_field = spec["time_field"]
+    sort = [(time_field, ASCENDING), ("id", ASCENDING)]
+    state = await db.snapshots.find_one({"_id": dataset}) or {}
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=lag)
+
+    rows_written = files = 0
+    while True:
+        query = {**spec["query"], time_field: {"$type": "date", "$lt": cutoff}}
+        if state.get("watermark") is not None:
+            query = {"$and": [query, keyset_filter(sort, [state["watermark"], state["last_id"]])]}
+        docs = await db[spec["collection"]].find(query, {"_id": 0}).sort(sort).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        if dataset == "predictions":
+            categories = await _categories(db, list({doc.get("market_id") for doc in docs}))
+            for doc in docs:
+                doc["category"] = categories.get(doc.get("market_id"))
+
+        partitions: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for doc in docs:
+            row = spec["row"](doc)
+            partitions.setdefault(partition_key(row, _time(doc.get(time_field))), []).append(row)
+        name = f"part-{as_utc(docs[0][time_field]):%Y%m%dT%H%M%S%f}-{docs[0]['id']}"
+        for (day, category), rows in partitions.items():
+            directory = partition_path(Path(root), dataset, day, category)
+            await asyncio.to_thread(write, directory, name, dataset, rows, fmt)
+            files += 1
+        rows_written += len(docs)
+
+        state = {"watermark": docs[-1][time_field], "last_id": docs[-1]["id"]}
+        await db.snapshots.update_one(
+            {"_id": dataset},
+            {"$set": {**state, "updated_at": datetime.now(timezone.utc)}, "$inc": {"rows": len(docs)}},
+            upsert=True
+        )
+        if len(docs) < batch_size:
+            break
+
+    logger.info(f"Snapshot of {dataset}: {rows_written} rows in {files} files")
+    return {"rows": rows_written, "files": files, "watermark": state.get("watermark")}
+
+
+async def snapshot_all(db, datasets: Optional[List[str]] = None, **options) -> Dict[str, Dict[str, Any]]:
+    return {dataset: await snapshot_dataset(db, dataset, **options) for dataset in (datasets or DATASETS)}
+
+
+class SnapshotRunner:
+    """Runs at most one snapshot at a time in the background (admin endpoint)"""
+
+    def __init__(self, db):
+        self.db = db
+        self.task: Optional[asyncio.Task] = None
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def start(self, datasets: Optional[List[str]] = None) -> bool:
+        if self.running:
+            return False
+        self.task = asyncio.create_task(self._run(datasets))
+        return True
+
+    async def _run(self, datasets: Optional[List[str]]):
+        started = datetime.now(timezone.utc)
+        try:
+            results = await snapshot_all(self.db, datasets)
+            self.last_run = {"started_at": started, "finished_at": datetime.now(timezone.utc), "results": results}
+        except Exception as e:
+            logger.error(f"Snapshot failed: {str(e)}")
+            self.last_run = {"started_at": started, "finished_at": datetime.now(timezone.utc), "error": str(e)}
+
+    async def stop(self):
+        if self.running:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def status(self) -> Dict[str, Any]:
+        watermarks = await self.db.snapshots.find({}, {"updated_at": 0}).to_list(None)
+        return {"running": self.running, "last_run": self.last_run,
+                "datasets": {doc.pop("_id"): doc for doc in watermarks}}
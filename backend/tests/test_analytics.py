@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+import analytics
+
+
+def aggregate_returning(row):
+    collection = MagicMock()
+    collection.aggregate.return_value.to_list = AsyncMock(return_value=[row] if row else [])
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_increment_applies_nonzero_deltas_and_swallows_errors():
+    """Test counters are bumped with one upsert and failures never propagate"""
+    db = MagicMock()
+    db.stats.update_one = AsyncMock()
+
+    await analytics.increment(db, total_markets=1, active_markets=0, total_volume=12.5)
+
+    db.stats.update_one.assert_awaited_once_with(
+        {"_id": "global"}, {"$inc": {"total_markets": 1, "total_volume": 12.5, "version": 1}}, upsert=True
+    )
+
+    db.stats.update_one = AsyncMock(side_effect=Exception("mongo down"))
+    await analytics.increment(db, total_events=1)
+
+
+def test_verification_deltas_replace_previous_verdict():
+    """Test re-verifying an event swaps its confidence instead of double counting"""
+    assert analytics.verification_deltas(0.95) == {
+        "total_verifications": 1, "confidence_sum": 0.95, "high_confidence_count": 1
+    }
+    deltas = analytics.verification_deltas(0.5, {"status": "verifying", "confidence": 0.5, "counted_confidence": 0.95})
+    assert deltas["total_verifications"] == 0
+    assert deltas["confidence_sum"] == pytest.approx(-0.45)
+    assert deltas["high_confidence_count"] == -1
+    legacy = analytics.verification_deltas(0.5, {"status": "verified", "confidence": 0.95})
+    assert legacy == deltas
+
+
+def test_reverify_through_endpoint_replaces_counted_confidence():
+    """Test POST /events/{id}/verify on a verified event swaps its counted confidence when the job runs"""
+    from server import app, process_verification_job
+    event = {"id": "e1", "event_title": "A", "event_description": "B", "category": "crypto",
+             "status": "verified", "confidence": 0.95, "counted_confidence": 0.95}
+
+    async def apply_set(query, update):
+        event.update(update["$set"])
+
+    summary = {"event_id": "e1", "result": "verified", "confidence": 0.5, "proof_links": [], "reasoning": "ok"}
+    with patch("server.db") as mock_db, \
+         patch("server.verification_queue.enqueue", new_callable=AsyncMock, return_value={"id": "j1"}), \
+         patch("server.entity_cache.invalidate", new_callable=AsyncMock), \
+         patch("server.manager.broadcast", new_callable=AsyncMock), \
+         patch("server.rollups.record", new_callable=AsyncMock), \
+         patch("server.analytics.increment", new_callable=AsyncMock) as increment, \
+         patch("ai_agents.event_detector.EventDetectorAgent.detect", new_callable=AsyncMock), \
+         patch("ai_agents.source_verifier.SourceVerifierAgent.verify", new_callable=AsyncMock), \
+         patch("ai_agents.confidence_scorer.ConfidenceScorerAgent.score", new_callable=AsyncMock), \
+         patch("ai_agents.summary_composer.SummaryComposerAgent.compose", new_callable=AsyncMock, return_value=summary), \
+         patch("ipfs_client.upload_json", new_callable=AsyncMock, return_value="QmCID"), \
+         patch("server.linera_publish_event", new_callable=AsyncMock, return_value={"tx_hash": "0x1", "chain_id": "c1"}), \
+         patch.dict("os.environ", {"ENV": "production"}):
+        mock_db.events.find_one = AsyncMock(side_effect=lambda *args, **kwargs: dict(event))
+        mock_db.events.update_one = AsyncMock(side_effect=apply_set)
+        mock_db.markets.find.return_value.to_list = AsyncMock(return_value=[])
+
+        response = TestClient(app).post("/api/events/e1/verify")
+        assert response.status_code == 200 and event["status"] == "verifying"
+        asyncio.run(process_verification_job({"id": "j1", "event_id": "e1"}))
+
+    deltas = increment.call_args[1]
+    assert deltas["total_verifications"] == 0
+    assert deltas["confidence_sum"] == pytest.approx(-0.45)
+    assert deltas["high_confidence_count"] == -1
+    assert event["status"] == "verified" and event["counted_confidence"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_reconcile_rebuilds_counters_from_aggregations():
+    """Test reconciliation stores the aggregated totals, defaulting empty collections to zero"""
+    db = MagicMock()
+    db.events = aggregate_returning({
+        "_id": None, "total_events": 5, "total_verifications": 3,
+        "confidence_sum": 2.5, "high_confidence_count": 1
+    })
+    db.markets = aggregate_returning({"_id": None, "total_markets": 2, "active_markets": 1, "total_volume": 3000.0})
+    db.predictions = aggregate_returning(None)
+    db.stats.find_one = AsyncMock(return_value={"_id": "global", "version": 4})
+    db.stats.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+    stats = await analytics.reconcile(db)
+
+    assert stats["total_events"] == 5
+    assert stats["total_volume"] == 3000.0
+    assert stats["total_predictions"] == 0
+    query, update = db.stats.update_one.call_args[0]
+    assert query == {"_id": "global", "version": 4}
+    assert update["$set"]["confidence_sum"] == 2.5
+    assert "reconciled_at" in update["$set"]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_does_not_overwrite_increments_made_while_aggregating():
+    """Test a version change during the aggregation skips the write and aggregates again"""
+    db = MagicMock()
+    db.events = aggregate_returning({"_id": None, "total_events": 5})
+    db.markets = aggregate_returning(None)
+    db.predictions = aggregate_returning(None)
+    db.stats.find_one = AsyncMock(side_effect=[{"_id": "global", "version": 4}, {"_id": "global", "version": 5}])
+    db.stats.update_one = AsyncMock(side_effect=[MagicMock(matched_count=0), MagicMock(matched_count=1)])
+
+    await analytics.reconcile(db)
+
+    assert [call[0][0]["version"] for call in db.stats.update_one.call_args_list] == [4, 5]
+    assert db.events.aggregate.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_stats_reads_one_document():
+    """Test overview stats come from the stats document without scanning collections"""
+    db = MagicMock()
+    db.stats.find_one = AsyncMock(return_value={"_id": "global", "total_events": 7, "total_volume": 10.0})
+
+    stats = await analytics.get_stats(db)
+
+    assert stats["total_events"] == 7
+    assert stats["total_markets"] == 0
+    db.events.aggregate.assert_not_called()
@@ -0,0 +1,79 @@
+import pytest
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+from ai_agents.batch import BatchVerifier, pack, estimate_tokens
+
+
+class FakeAgent:
+    """Agent stand-in that echoes its stage name into the result"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.mock_mode = False
+        self.client = MagicMock()
+        self.system_message = f"{stage} system"
+        self.single = AsyncMock(side_effect=lambda *args: {"stage": self.stage, "via": "single"})
+
+    def build_prompt(self, *args):
+        return f"{self.stage} prompt"
+
+    def from_response(self, item, content):
+        return {"stage": self.stage, "via": "batch", "answer": json.loads(content)}
+
+
+def make_verifier(**kwargs):
+    detector, verifier, scorer, composer = (FakeAgent(s) for s in ("detect", "verify", "score", "compose"))
+    detector.detect = detector.single
+    verifier.verify = verifier.single
+    scorer.score = scorer.single
+    composer.compose = composer.single
+    return BatchVerifier(detector, verifier, scorer, composer, **kwargs), composer
+
+
+def test_pack_respects_token_budget_and_item_cap():
+    """Test items are grouped without exceeding the budget or item cap"""
+    prompts = {f"evt{i}": "x" * 400 for i in range(10)}
+    per_item = estimate_tokens("x" * 400)
+
+    chunks = pack(prompts, token_budget=per_item * 3 + 100, max_items=10)
+    assert all(len(chunk) <= 3 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == 10
+
+    chunks = pack(prompts, token_budget=100000, max_items=4)
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+
+
+@pytest.mark.asyncio
+async def test_batch_answers_mapped_back_per_event():
+    """Test one prompt per stage serves every event in the batch"""
+    batch, composer = make_verifier()
+    events = [{"id": "evt1"}, {"id": "evt2"}]
+
+    async def answer_all(client, system_message, prompt, **kwargs):
+        return json.dumps({"evt1": {"ok": 1}, "evt2": {"ok": 2}})
+
+    with patch("ai_agents.batch.chat_completion", side_effect=answer_all) as mock_chat:
+        summaries = await batch.run(events)
+
+    assert mock_chat.call_count == 4
+    assert all(call.kwargs["upstream"] == "openai_batch" for call in mock_chat.call_args_list)
+    assert summaries["evt1"] == {"stage": "compose", "via": "batch", "answer": {"ok": 1}}
+    assert summaries["evt2"]["answer"] == {"ok": 2}
+    assert not composer.single.called
+
+
+@pytest.mark.asyncio
+async def test_unparseable_items_fall_back_to_single_calls():
+    """Test items missing from the batched answer use the per-event call"""
+    batch, composer = make_verifier()
+    events = [{"id": "evt1"}, {"id": "evt2"}]
+
+    async def answer_one(client, system_message, prompt, **kwargs):
+        return json.dumps({"evt1": {"ok": 1}})
+
+    with patch("ai_agents.batch.chat_completion", side_effect=answer_one):
+        summaries = await batch.run(events)
+
+    assert summaries["evt1"]["via"] == "batch"
+    assert summaries["evt2"]["via"] == "single"
+    assert batch.stats()["single_calls"] == 4
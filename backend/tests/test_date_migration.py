@@ -0,0 +1,65 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from date_migration import migrate_collection, parse_timestamp
+
+
+def batch_collection(batches):
+    """Collection whose find(...).sort(...).limit(...).to_list() returns `batches` in turn"""
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(side_effect=batches + [[]])
+    collection.bulk_write = AsyncMock(side_effect=lambda ops, ordered: MagicMock(modified_count=len(ops)))
+    return collection
+
+
+def test_parse_timestamp():
+    """Test ISO strings become aware UTC datetimes and garbage is rejected"""
+    utc = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert parse_timestamp("2025-01-02T03:04:05+00:00") == utc
+    assert parse_timestamp("2025-01-02T03:04:05Z") == utc
+    assert parse_timestamp("2025-01-02T03:04:05") == utc
+    assert parse_timestamp("2025-01-02T05:04:05+02:00") == utc
+    assert parse_timestamp("yesterday") is None
+
+
+@pytest.mark.asyncio
+async def test_migrate_collection_converts_in_id_batches():
+    """Test each batch is one bulk_write guarded by the old string, resuming after the last _id"""
+    events = batch_collection([
+        [{"_id": 1, "created_at": "2025-01-01T00:00:00+00:00", "resolved_at": None},
+         {"_id": 2, "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc), "resolved_at": "2025-01-03T00:00:00+00:00"}],
+        [{"_id": 3, "created_at": "not a date"}],
+    ])
+    db = {"events": events}
+
+    result = await migrate_collection(db, "events", ["created_at", "resolved_at"], batch_size=2)
+
+    assert result == {"converted": 2, "unparseable": 1, "batches": 2}
+    assert events.bulk_write.await_count == 1
+    ops = events.bulk_write.call_args[0][0]
+    assert ops[0]._filter == {"_id": 1, "created_at": "2025-01-01T00:00:00+00:00"}
+    assert ops[0]._doc == {"$set": {"created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)}, "$inc": {"version": 1}}
+    assert ops[1]._filter == {"_id": 2, "resolved_at": "2025-01-03T00:00:00+00:00"}
+    queries = [call.args[0] for call in events.find.call_args_list]
+    assert "_id" not in queries[0]
+    assert queries[1]["_id"] == {"$gt": 2}
+    assert queries[2]["_id"] == {"$gt": 3}
+    assert queries[0]["$or"] == [{"created_at": {"$type": "string"}}, {"resolved_at": {"$type": "string"}}]
+
+
+@pytest.mark.asyncio
+async def test_warn_if_unmigrated_names_collections_with_string_timestamps(caplog):
+    """Test startup warns that date-typed queries skip documents still holding string timestamps"""
+    from date_migration import warn_if_unmigrated
+    db = MagicMock()
+    collections = {name: MagicMock() for name in ("events", "markets", "predictions")}
+    collections["events"].find_one = AsyncMock(return_value={"_id": 1})
+    collections["markets"].find_one = AsyncMock(return_value=None)
+    collections["predictions"].find_one = AsyncMock(return_value=None)
+    db.__getitem__.side_effect = collections.__getitem__
+
+    with caplog.at_level("WARNING"):
+        assert await warn_if_unmigrated(db) == ["events"]
+
+    assert "migrate-dates" in caplog.text
+    assert collections["events"].find_one.call_args[0][0] == {"created_at": {"$type": "string"}}
@@ -0,0 +1,153 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+from entity_cache import EntityCache
+
+
+@pytest.mark.asyncio
+async def test_read_through_caches_until_invalidated():
+    """Test the loader runs once per entity until a write invalidates it"""
+    cache = EntityCache()
+    loader = AsyncMock(side_effect=[{"id": "m1", "total_volume": 10}, {"id": "m1", "total_volume": 20}])
+
+    first = await cache.get_or_load("market", "m1", loader)
+    second = await cache.get_or_load("market", "m1", loader)
+    await cache.invalidate("market", "m1")
+    third = await cache.get_or_load("market", "m1", loader)
+
+    assert first == second == {"id": "m1", "total_volume": 10}
+    assert third["total_volume"] == 20
+    assert loader.await_count == 2
+    stats = cache.stats()["kinds"]["market"]
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+@pytest.mark.asyncio
+async def test_missing_entities_are_not_cached():
+    """Test a 404 is not remembered so a later insert is visible"""
+    cache = EntityCache()
+    loader = AsyncMock(side_effect=[None, {"id": "e1"}])
+
+    assert await cache.get_or_load("event", "e1", loader) is None
+    assert await cache.get_or_load("event", "e1", loader) == {"id": "e1"}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reads_share_one_load():
+    """Test simultaneous misses on a hot entity hit the database once"""
+    cache = EntityCache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": "m1"}
+
+    results = await asyncio.gather(*[cache.get_or_load("market", "m1", loader) for _ in range(20)])
+
+    assert calls == 1
+    assert all(result == {"id": "m1"} for result in results)
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_overwritten():
+    """Test a read that started before a write does not cache the stale document"""
+    cache = EntityCache()
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return {"id": "m1", "status": "active"}
+
+    read = asyncio.create_task(cache.get_or_load("market", "m1", slow_loader))
+    await asyncio.sleep(0)
+    await cache.invalidate("market", "m1")
+    release.set()
+
+    assert (await read)["status"] == "active"
+    fresh = await cache.get_or_load("market", "m1", AsyncMock(return_value={"id": "m1", "status": "resolved"}))
+    assert fresh["status"] == "resolved"
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_is_read_before_the_database():
+    """Test a document found in the shared tier skips the loader and fills the local LRU"""
+    shared = AsyncMock()
+    shared.get.return_value = {"id": "s1", "followers": 3}
+    cache = EntityCache(shared=shared)
+    loader = AsyncMock()
+
+    assert await cache.get_or_load("strategy", "s1", loader) == {"id": "s1", "followers": 3}
+    await cache.invalidate("strategy", "s1")
+
+    loader.assert_not_awaited()
+    shared.delete.assert_awaited_once_with("strategy:s1")
+    assert cache.stats()["kinds"]["strategy"]["shared_hits"] == 1
+
+
+class SharedTier:
+    """In-memory stand-in for the Redis tier's generation compare-and-set, without pub/sub"""
+
+    def __init__(self):
+        self.docs = {}
+        self.generations = {}
+
+    async def start(self, on_invalidate):
+        pass
+
+    async def get(self, key):
+        return self.docs.get(key)
+
+    async def generation(self, key):
+        return str(self.generations.get(key, 0))
+
+    async def set(self, key, doc, generation):
+        if str(self.generations.get(key, 0)) != generation:
+            return False
+        self.docs[key] = doc
+        return True
+
+    async def delete(self, key):
+        self.generations[key] = self.generations.get(key, 0) + 1
+        self.docs.pop(key, None)
+
+
+@pytest.mark.asyncio
+async def test_load_racing_another_workers_write_is_not_shared():
+    """Test a stale load finishing before the invalidation message arrives does not fill the shared tier"""
+    shared = SharedTier()
+    reader, writer = EntityCache(shared=shared), EntityCache(shared=shared)
+    release = asyncio.Event()
+
+    async def slow_loader():
+        await release.wait()
+        return {"id": "m1", "status": "active"}
+
+    read = asyncio.create_task(reader.get_or_load("market", "m1", slow_loader))
+    await asyncio.sleep(0)
+    await writer.invalidate("market", "m1")  # another worker; its pub/sub message never reaches `reader`
+    release.set()
+
+    assert (await read)["status"] == "active"
+    assert "market:m1" not in shared.docs
+    fresh = await writer.get_or_load("market", "m1", AsyncMock(return_value={"id": "m1", "status": "resolved"}))
+    assert fresh["status"] == "resolved" and shared.docs["market:m1"]["status"] == "resolved"
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_sets_and_invalidates_by_generation():
+    """Test the Redis tier stores through the generation check and bumps the generation on delete"""
+    from entity_cache import RedisEntityTier, SET_IF_GENERATION, INVALIDATE
+    tier = RedisEntityTier(ttl=300)
+    tier.redis = AsyncMock()
+    tier.redis.eval.return_value = 0
+
+    assert await tier.set("market:m1", {"id": "m1"}, "4") is False
+    await tier.delete("market:m1")
+
+    script, numkeys, key, generation_key, generation = tier.redis.eval.call_args_list[0][0][:5]
+    assert (script, numkeys, key, generation_key, generation) == (SET_IF_GENERATION, 2, "entity:market:m1", "entity-gen:market:m1", "4")
+    assert tier.redis.eval.call_args_list[1][0][:4] == (INVALIDATE, 2, "entity:market:m1", "entity-gen:market:m1")
+    tier.redis.publish.assert_awaited_once_with(tier.channel, "market:m1")
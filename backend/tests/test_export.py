@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+import export
+from tests.test_rollups import AsyncCursor
+
+CREATED = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+
+async def collect(rows):
+    return b"".join([chunk async for chunk in rows])
+
+
+@pytest.mark.asyncio
+async def test_ndjson_rows_flush_per_batch():
+    """Test NDJSON streams one line per document in batch-sized chunks"""
+    docs = [{"id": f"p{i}", "created_at": CREATED} for i in range(5)]
+    with patch("export.EXPORT_BATCH_SIZE", 2):
+        chunks = [chunk async for chunk in export.ndjson_rows(AsyncCursor(docs))]
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line) for line in lines][0] == {"id": "p0", "created_at": "2025-01-02T00:00:00Z"}
+    assert len(lines) == 5
+
+
+@pytest.mark.asyncio
+async def test_csv_rows_encode_nested_values_as_json():
+    """Test CSV has a header row, empty cells for missing values and JSON for nested ones"""
+    docs = [{"id": "e1", "onchain": {"cid": "Qm1"}, "created_at": CREATED}, {"id": "e2"}]
+
+    body = await collect(export.csv_rows(AsyncCursor(docs), ["id", "onchain", "created_at"]))
+
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert rows == [["id", "onchain", "created_at"], ["e1", '{"cid":"Qm1"}', "2025-01-02T00:00:00Z"], ["e2", "", ""]]
+
+
+def export_client():
+    from server import app, get_admin_user
+    app.dependency_overrides[get_admin_user] = lambda: "0xadmin"
+    return TestClient(app)
+
+
+def test_export_route_filters_and_resumes():
+    """Test GET /export/predictions applies filters, the time range and after_id keyset"""
+    from server import app
+    cursor = AsyncCursor([{"id": "p2", "market_id": "m1", "created_at": CREATED}])
+    with patch("server.db") as mock_db:
+        predictions = MagicMock()
+        predictions.find_one = AsyncMock(return_value={"id": "p1", "created_at": CREATED})
+        predictions.find.return_value.sort.return_value.batch_size.return_value = cursor
+        mock_db.__getitem__.return_value = predictions
+        try:
+            response = export_client().get(
+                "/api/export/predictions",
+                params={"market_id": "m1", "from": "2025-01-01T00:00:00Z", "after_id": "p1", "fields": "market_id"}
+            )
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["cache-control"] == "no-store"
+    assert [json.loads(line) for line in response.text.splitlines()] == [{"id": "p2", "market_id": "m1", "created_at": "2025-01-02T00:00:00Z"}]
+    query, projection = predictions.find.call_args[0]
+    assert query["$and"][0] == {"created_at": {"$gte": datetime(2025, 1, 1, tzinfo=timezone.utc)}, "market_id": "m1"}
+    assert query["$and"][1] == {"$or": [{"created_at": {"$gt": CREATED}}, {"created_at": CREATED, "id": {"$gt": "p1"}}]}
+    assert projection == {"_id": 0, "market_id": 1, "created_at": 1, "id": 1}
+
+
+def test_export_route_rejects_bad_requests():
+    """Test unknown collections, filters that do not apply and unknown fields are refused"""
+    from server import app
+    with patch("server.db") as mock_db:
+        try:
+            client = export_client()
+            unknown = client.get("/api/export/users")
+            bad_filter = client.get("/api/export/events", params={"market_id": "m1"})
+            bad_field = client.get("/api/export/markets", params={"fields": "secret"})
+        finally:
+            app.dependency_overrides.clear()
+
+    assert unknown.status_code == 404
+    assert bad_filter.status_code == 400 and "market_id" in bad_filter.json()["detail"]
+    assert bad_field.status_code == 400
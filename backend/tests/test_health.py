@@ -0,0 +1,69 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+from health import HealthMonitor
+from metrics import percentile
+
+
+@pytest.mark.asyncio
+async def test_probes_run_concurrently_and_time_out():
+    """Test a hanging dependency costs one timeout, not the sum of all probes"""
+    async def hang():
+        await asyncio.sleep(10)
+
+    monitor = HealthMonitor(
+        {"mongo": AsyncMock(return_value={"status": "healthy"}), "ipfs": hang, "linera": hang},
+        interval=0, timeout=0.05
+    )
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    report = await monitor.report()
+
+    assert loop.time() - started < 0.5
+    assert report["status"] == "degraded"
+    assert report["services"]["mongo"]["status"] == "healthy"
+    assert report["services"]["ipfs"]["status"] == "unhealthy"
+    assert report["services"]["ipfs"]["error"] == "timed out after 0.05s"
+
+
+@pytest.mark.asyncio
+async def test_report_serves_snapshot_within_interval():
+    """Test an idle monitor re-probes only once the snapshot is older than the interval"""
+    probe = AsyncMock(return_value={"status": "healthy", "block_height": 7})
+    monitor = HealthMonitor({"linera": probe}, interval=60)
+
+    first = await monitor.report()
+    second = await monitor.report()
+    monitor._checked_monotonic -= 61
+    await monitor.report()
+
+    assert probe.await_count == 2
+    assert first["status"] == second["status"] == "healthy"
+    assert second["services"]["linera"]["block_height"] == 7
+
+
+@pytest.mark.asyncio
+async def test_background_loop_serves_snapshot():
+    """Test the started monitor probes on its own and report answers from its snapshot"""
+    probe = AsyncMock(side_effect=RuntimeError("down"))
+    monitor = HealthMonitor({"ipfs": probe}, interval=60)
+
+    await monitor.start()
+    await asyncio.sleep(0.01)
+    report = await monitor.report()
+    await monitor.stop()
+
+    assert probe.await_count == 1
+    assert report["status"] == "degraded"
+    assert report["services"]["ipfs"]["error"] == "down"
+    assert {"p50_ms", "p95_ms", "latency_ms"} <= set(report["services"]["ipfs"])
+
+
+def test_percentile():
+    """Test nearest-rank percentiles over the latency window"""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
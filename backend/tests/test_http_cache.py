@@ -0,0 +1,109 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, patch
+from http_cache import HTTPCacheMiddleware, cache_control, choose_encoding, etag_matches, version_etag
+
+
+def make_client(payload):
+    app = FastAPI()
+
+    @app.get("/api/events")
+    async def events():
+        return payload
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.get("/api/export")
+    async def export():
+        return PlainTextResponse("x" * 5000)
+
+    @app.post("/api/events")
+    async def create():
+        return payload
+
+    app.add_middleware(HTTPCacheMiddleware, minimum_size=1024)
+    return TestClient(app)
+
+
+def test_etag_and_not_modified():
+    """Test a repeated GET with If-None-Match gets an empty 304 with the same ETag"""
+    client = make_client([{"id": "e1"}])
+
+    first = client.get("/api/events", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    second = client.get("/api/events", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+    assert client.get("/api/events", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_large_bodies_are_gzipped_with_distinct_etag():
+    """Test large JSON is compressed, tagged per coding, and still revalidates"""
+    payload = [{"id": f"e{i}", "event_title": "Bitcoin above 100k"} for i in range(100)]
+    client = make_client(payload)
+
+    plain = client.get("/api/events", headers={"Accept-Encoding": "identity"})
+    zipped = client.get("/api/events", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.json() == payload
+    assert zipped.headers["etag"] != plain.headers["etag"]
+    assert "Accept-Encoding" in zipped.headers["vary"]
+    revalidated = client.get("/api/events", headers={"Accept-Encoding": "gzip", "If-None-Match": zipped.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_other_responses_pass_through():
+    """Test small, non-JSON and non-GET responses are not tagged or compressed"""
+    client = make_client([{"id": "e1"}])
+
+    health = client.get("/api/health", headers={"Accept-Encoding": "gzip"})
+    export = client.get("/api/export", headers={"Accept-Encoding": "gzip"})
+    created = client.post("/api/events")
+
+    assert health.headers["cache-control"] == "public, max-age=5"
+    assert "content-encoding" not in health.headers
+    assert "etag" not in export.headers and "content-encoding" not in export.headers
+    assert "etag" not in created.headers and "cache-control" not in created.headers
+
+
+def test_detail_route_etag_comes_from_the_document_version():
+    """Test detail routes tag responses with the stored version and skip the body hash"""
+    from server import app
+    market = {"id": "m1", "event_id": "e1", "title": "A", "description": "B", "options": [], "total_volume": 0.0, "status": "active",
+              "created_at": "2025-01-01T00:00:00Z", "version": 3}
+    with patch("server.entity_cache.get_or_load", new_callable=AsyncMock, side_effect=lambda *args: dict(market)), \
+         patch("http_cache.content_etag") as content_etag:
+        client = TestClient(app)
+        first = client.get("/api/markets/m1", headers={"Accept-Encoding": "identity"})
+        current = client.get("/api/markets/m1", headers={"If-None-Match": first.headers["etag"]})
+        market["version"] = 4
+        changed = client.get("/api/markets/m1", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.status_code == 200 and first.headers["etag"] == '"market-v3"'
+    assert current.status_code == 304 and current.content == b""
+    assert changed.status_code == 200 and changed.headers["etag"] == '"market-v4"'
+    content_etag.assert_not_called()
+
+
+def test_helpers():
+    """Test policy lookup, If-None-Match parsing and Accept-Encoding negotiation"""
+    assert cache_control("/api/predictions") == "private, no-cache"
+    assert cache_control("/api/admin/query-plans") == "no-store"
+    assert cache_control("/docs") is None
+    assert etag_matches('W/"abc", "def-gzip"', '"def"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches("", '"abc"')
+    assert version_etag("event", 2) == '"event-v2"'
+    assert choose_encoding("gzip, br;q=0.5", ("br", "gzip")) == "gzip"
+    assert choose_encoding("br, gzip", ("br", "gzip")) == "br"
+    assert choose_encoding("gzip;q=0", ("gzip",)) is None
+    assert choose_encoding("*", ("gzip",)) == "gzip"
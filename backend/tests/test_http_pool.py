@@ -0,0 +1,62 @@
+import pytest
+import asyncio
+from http_pool import HTTPClientPool
+
+
+@pytest.mark.asyncio
+async def test_started_pool_reuses_one_client_per_upstream():
+    """Test calls to the same upstream share a keep-alive client"""
+    pool = HTTPClientPool()
+    await pool.start()
+    try:
+        async with pool.client("ipfs", 5.0) as first:
+            pass
+        async with pool.client("ipfs", 5.0) as second:
+            pass
+        async with pool.client("linera", 5.0) as other:
+            pass
+
+        assert first is second
+        assert first is not other
+        assert not first.is_closed
+        assert pool.stats()["ipfs"]["requests"] == 2
+    finally:
+        await pool.close()
+
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_unstarted_pool_uses_short_lived_clients():
+    """Test calls outside the app lifespan get a client closed after use"""
+    pool = HTTPClientPool()
+    async with pool.client("ipfs", 5.0) as client:
+        assert not client.is_closed
+
+    assert client.is_closed
+    assert pool.stats()["ipfs"]["shared"] is False
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_queues_extra_callers(monkeypatch):
+    """Test callers beyond the upstream concurrency limit wait for a slot"""
+    monkeypatch.setenv("LINERA_CONCURRENCY", "2")
+    pool = HTTPClientPool()
+    await pool.start()
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with pool.client("linera", 5.0):
+            peak = max(peak, pool.upstream("linera").in_flight)
+            await asyncio.sleep(0.01)
+
+    try:
+        await asyncio.gather(*[call() for _ in range(6)])
+    finally:
+        await pool.close()
+
+    stats = pool.stats()["linera"]
+    assert peak == 2
+    assert stats["requests"] == 6
+    assert stats["max_wait_ms"] > 0
@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import AsyncMock, patch, MagicMock
+from fastapi import HTTPException
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+from indexes import INDEXES, ensure_indexes, explain_queries, plan_stages
+
+
+def explain_output(plan):
+    return {
+        "queryPlanner": {"winningPlan": plan},
+        "executionStats": {"totalDocsExamined": 10, "totalKeysExamined": 0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_continues_after_failure():
+    """Test a collection whose indexes fail does not stop the others"""
+    db = MagicMock()
+    collections = {name: MagicMock() for name in INDEXES}
+    for name, collection in collections.items():
+        collection.create_indexes = AsyncMock(return_value=[f"{name}_idx"])
+    collections["users"].create_indexes.side_effect = OperationFailure("duplicate key")
+    db.__getitem__.side_effect = collections.__getitem__
+
+    created = await ensure_indexes(db)
+
+    assert created["users"] == []
+    assert created["events"] == ["events_idx"]
+    collections["events"].create_indexes.assert_awaited_once_with(INDEXES["events"])
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_gives_up_when_mongo_is_unreachable():
+    """Test an unreachable server is logged and skips the remaining collections instead of raising"""
+    db = MagicMock()
+    collection = MagicMock()
+    collection.create_indexes = AsyncMock(side_effect=ServerSelectionTimeoutError("no servers"))
+    db.__getitem__.return_value = collection
+
+    created = await ensure_indexes(db)
+
+    assert created == {name: [] for name in INDEXES}
+    collection.create_indexes.assert_awaited_once()
+
+
+def test_plan_stages_walks_nested_inputs():
+    """Test stage names are collected from the winning plan tree"""
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    assert plan_stages(plan) == ["LIMIT", "FETCH", "IXSCAN"]
+    plan = {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]}}
+    assert plan_stages(plan) == ["SORT", "OR", "IXSCAN", "COLLSCAN"]
+
+
+@pytest.mark.asyncio
+async def test_explain_queries_flags_collection_scans():
+    """Test explain results flag COLLSCAN and in-memory SORT stages"""
+    shapes = [
+        {"route": "GET /events", "collection": "events", "filter": {}, "sort": [("created_at", -1)]},
+        {"route": "GET /markets/{id}", "collection": "markets", "filter": {"id": "m1"}},
+    ]
+    plans = {
+        "events": explain_output({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}),
+        "markets": explain_output({"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}),
+    }
+    db = MagicMock()
+
+    def collection(name):
+        coll = MagicMock()
+        cursor = coll.find.return_value
+        cursor.sort.return_value = cursor
+        cursor.limit.return_value.explain = AsyncMock(return_value=plans[name])
+        return coll
+
+    db.__getitem__.side_effect = collection
+
+    results = await explain_queries(db, shapes)
+
+    assert results[0]["collection_scan"] is True
+    assert results[0]["in_memory_sort"] is True
+    assert results[0]["docs_examined"] == 10
+    assert results[1]["collection_scan"] is False
+    assert results[1]["stages"] == ["FETCH", "IXSCAN"]
+
+
+@pytest.mark.asyncio
+async def test_query_plans_endpoint_requires_admin():
+    """Test only wallets listed in ADMIN_WALLETS pass the admin dependency"""
+    with patch("server.ADMIN_WALLETS", {"0xadmin"}):
+        from server import get_admin_user
+
+        assert await get_admin_user("0xADMIN") == "0xADMIN"
+        with pytest.raises(HTTPException) as exc:
+            await get_admin_user("0xsomeone")
+        assert exc.value.status_code == 403
+
+
+def test_verification_jobs_have_open_job_unique_and_retention_indexes():
+    """Test one open job per event is enforced and finished jobs expire"""
+    specs = {index.document["name"]: index.document for index in INDEXES["verification_jobs"]}
+
+    unique = specs["event_id_open_unique"]
+    assert unique["unique"] is True
+    assert unique["partialFilterExpression"]["status"] == {"$in": ["queued", "running"]}
+    assert "expireAfterSeconds" in specs["finished_ttl"]
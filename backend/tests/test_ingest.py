@@ -0,0 +1,117 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError
+import ingest
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_ndjson_items_parse_lines_across_chunks():
+    """Test NDJSON lines split over body chunks are rejoined and bad lines become item errors"""
+    items = [item async for item in ingest.ndjson_items(stream(b'{"a": 1}\n{"a"', b': 2}\n\nnot json\n{"a": 3}'))]
+
+    assert items[0] == {"a": 1} and items[1] == {"a": 2} and items[3] == {"a": 3}
+    assert isinstance(items[2], ingest.InvalidItem)
+
+
+@pytest.mark.asyncio
+async def test_ndjson_items_stop_at_limit():
+    """Test going over the item limit is reported on the first extra item and reading stops"""
+    items = [item async for item in ingest.ndjson_items(stream(b'{}\n{}\n{}\n{}\n'), limit=2)]
+
+    assert items[:2] == [{}, {}]
+    assert len(items) == 3 and "limit" in items[2].message
+
+
+@pytest.mark.asyncio
+async def test_insert_chunk_maps_write_errors_to_item_indexes():
+    """Test unordered insert_many failures are reported against the request's item indexes"""
+    collection = MagicMock()
+    collection.insert_many = AsyncMock(side_effect=BulkWriteError({
+        "writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"}], "writeConcernErrors": []
+    }))
+    docs = [(10, {"id": "a"}), (11, {"id": "b"}), (12, {"id": "c"})]
+
+    inserted, errors = await ingest.insert_chunk(collection, docs)
+
+    assert collection.insert_many.call_args[1]["ordered"] is False
+    assert [doc["id"] for doc in inserted] == ["a", "c"]
+    assert errors == [{"index": 11, "errors": [{"msg": "E11000 duplicate key"}]}]
+
+
+def bulk_client():
+    from server import app, get_current_user
+    app.dependency_overrides[get_current_user] = lambda: "0xuser"
+    return TestClient(app)
+
+
+def test_events_bulk_writes_chunks_and_broadcasts_once_per_chunk():
+    """Test POST /events/bulk validates items, inserts per chunk and coalesces notifications"""
+    from server import app
+    items = [{"event_title": f"Match {i}", "event_description": "Fixture", "category": "sports"} for i in range(5)]
+    items.insert(2, {"event_title": "No description", "category": "sports"})
+
+    with patch("server.db") as mock_db, patch("ingest.INGEST_CHUNK_SIZE", 3), \
+         patch("server.manager.broadcast", new_callable=AsyncMock) as broadcast, \
+         patch("server.analytics.increment", new_callable=AsyncMock) as increment:
+        mock_db.events.insert_many = AsyncMock()
+        try:
+            response = bulk_client().post("/api/events/bulk", json=items)
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["received"] == 6 and body["inserted"] == 5 and body["failed"] == 1
+    assert body["errors"][0]["index"] == 2 and body["errors"][0]["errors"][0]["loc"] == ["event_description"]
+    assert mock_db.events.insert_many.await_count == 2
+    assert broadcast.await_count == 2
+    message = broadcast.call_args_list[0][0][0]
+    assert message["type"] == "new_events" and len(message["data"]) == 2
+    assert "category:sports" in broadcast.call_args_list[0][1]["topics"]
+    assert sum(call[1]["total_events"] for call in increment.call_args_list) == 5
+
+
+def test_markets_bulk_accepts_ndjson():
+    """Test POST /markets/bulk reads NDJSON, denormalizes categories and records opening odds once per chunk"""
+    from server import app
+    lines = [{"event_id": "e1", "title": "Winner", "description": "Who wins",
+              "options": [{"id": "yes", "odds": 2.0}, {"id": "no", "odds": 2.0}]},
+             {"event_id": "e1", "title": "Empty", "description": "No options", "options": []}]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n"
+
+    with patch("server.db") as mock_db, patch("server.manager.broadcast", new_callable=AsyncMock) as broadcast, \
+         patch("server.analytics.increment", new_callable=AsyncMock), \
+         patch("server.odds_history.record_opening_snapshots", new_callable=AsyncMock) as opening:
+        mock_db.markets.insert_many = AsyncMock()
+        mock_db.events.find.return_value.to_list = AsyncMock(return_value=[{"id": "e1", "category": "sports"}])
+        try:
+            response = bulk_client().post("/api/markets/bulk", content=body,
+                                          headers={"Content-Type": "application/x-ndjson"})
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 1 and response.json()["errors"][0]["index"] == 1
+    doc = mock_db.markets.insert_many.call_args[0][0][0]
+    assert doc["category"] == "sports" and doc["options"][0]["seed"] > 0
+    assert opening.await_count == 1
+    assert broadcast.call_args[0][0]["type"] == "new_markets"
+
+
+def test_bulk_rejects_non_array_body():
+    """Test a JSON body that is not an array is refused as a whole"""
+    from server import app
+    with patch("server.db"):
+        try:
+            response = bulk_client().post("/api/events/bulk", json={"event_title": "A"})
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 400
@@ -5,6 +5,14 @@ import json
 import hashlib
 
 
+def merged_set(update_mock):
+    """Merge the $set documents of every update_one call on the event"""
+    merged = {}
+    for call in update_mock.call_args_list:
+        merged.update(call[0][1]["$set"])
+    return merged
+
+
 @pytest.mark.asyncio
 async def test_production_env_config():
     """Test that production mode reads correct env variables"""
@@ -80,7 +88,7 @@ async def test_verify_event_generates_all_fields():
             assert call_kwargs["cid"] == "QmTestCID123"
             
             # Verify database update
-            update_call = mock_db.events.update_one.call_args[0][1]["$set"]
+            update_call = merged_set(mock_db.events.update_one)
             assert update_call["confidence"] == 0.95
             assert update_call["onchain"]["tx_hash"] == "0xabc123def"
             assert update_call["onchain"]["chain_id"] == "chain_456"
@@ -121,7 +129,7 @@ async def test_mongo_stores_required_fields():
             await run_ai_verification(event_id, {"id": event_id})
             
             # Check stored fields
-            stored_data = update_mock.call_args[0][1]["$set"]
+            stored_data = merged_set(update_mock)
             assert "confidence" in stored_data
             assert "proof_links" in stored_data
             assert "onchain" in stored_data
@@ -82,3 +82,63 @@ async def test_get_block_height():
         
         height = await get_block_height()
         assert height == 12345
+
+
+@pytest.mark.asyncio
+async def test_publish_events_maps_errors_per_event():
+    """Test a batched publish reports success or failure for each event"""
+    with patch("linera_client.client.ORACLE_APP_ID", "test_app_id"):
+        from linera_client.client import publish_events
+        
+        with patch("linera_client.client.httpx.AsyncClient") as mock_client:
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                "data": {"e0": "ok", "e1": None},
+                "errors": [{"message": "confidence out of range", "path": ["e1"]}]
+            }
+            
+            mock_post = AsyncMock(return_value=mock_response)
+            mock_client.return_value.__aenter__.return_value.post = mock_post
+            
+            events = [
+                {"event_id": f"evt{i}", "payload_hash": "hash", "confidence": 0.9, "sources": ["s1"], "cid": "cid"}
+                for i in range(2)
+            ]
+            results = await publish_events(events)
+            
+            assert mock_post.call_count == 1
+            query = mock_post.call_args[1]["json"]["query"]
+            assert "e0: publishEvent" in query and "e1: publishEvent" in query
+            assert results[0]["ok"] and "tx_hash" in results[0]
+            assert not results[1]["ok"]
+            assert "confidence out of range" in results[1]["error"]
+
+
+@pytest.mark.asyncio
+async def test_publisher_coalesces_concurrent_publishes():
+    """Test concurrent publishes are flushed as one batch with per-event results"""
+    import asyncio
+    from linera_client import OracleFeedPublisher
+    from linera_client.publisher import LineraClientError
+    
+    async def publish_many(events):
+        return [
+            {"ok": True, "tx_hash": f"tx_{e['event_id']}", "chain_id": "chain"} if e["event_id"] != "bad"
+            else {"ok": False, "error": "rejected"}
+            for e in events
+        ]
+    
+    publish_many = AsyncMock(side_effect=publish_many)
+    publisher = OracleFeedPublisher(batch_size=10, flush_interval=0.01, publish_many=publish_many)
+    
+    async def publish(event_id):
+        return await publisher.publish(event_id=event_id, payload_hash="h", confidence=0.9, sources=[], cid="cid")
+    
+    results = await asyncio.gather(publish("a"), publish("b"), publish("bad"), return_exceptions=True)
+    
+    assert publish_many.call_count == 1
+    assert results[0] == {"tx_hash": "tx_a", "chain_id": "chain"}
+    assert results[1]["tx_hash"] == "tx_b"
+    assert isinstance(results[2], LineraClientError)
+    assert publisher.stats()["events_failed"] == 1
@@ -0,0 +1,81 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from ai_agents.llm_cache import LLMResponseCache, DiskCacheTier, cache_key
+from ai_agents.llm import chat_completion
+
+
+def make_client(content="{}"):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(return_value=response)
+    return client
+
+
+def test_cache_key_depends_on_model_system_and_prompt():
+    """Test cache keys change with any part of the request"""
+    key = cache_key("gpt-4o", "system", "prompt")
+    assert key == cache_key("gpt-4o", "system", "prompt")
+    assert key != cache_key("gpt-4o-mini", "system", "prompt")
+    assert key != cache_key("gpt-4o", "other", "prompt")
+    assert key != cache_key("gpt-4o", "system", "other")
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_served_from_cache(monkeypatch):
+    """Test an identical completion request only reaches the provider once"""
+    cache = LLMResponseCache()
+    monkeypatch.setattr("ai_agents.llm.response_cache", cache)
+    client = make_client('{"confirms": true}')
+
+    first = await chat_completion(client, "system", "prompt")
+    second = await chat_completion(client, "system", "prompt")
+
+    assert first == second == '{"confirms": true}'
+    assert client.chat.completions.create.call_count == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    """Test identical requests in flight at the same time are coalesced"""
+    cache = LLMResponseCache()
+    calls = 0
+
+    async def slow_call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[cache.get_or_call("key", slow_call) for _ in range(5)])
+
+    assert results == ["result"] * 5
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_bounds_memory_tier():
+    """Test the memory tier never grows past its size bound"""
+    cache = LLMResponseCache(maxsize=2)
+    for i in range(3):
+        await cache.set(f"key{i}", f"value{i}", 10.0)
+
+    assert len(cache.memory) == 2
+    assert await cache.get("key0") is None
+    assert await cache.get("key2") == "value2"
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_new_cache_instance(tmp_path):
+    """Test entries written to the disk tier are readable by a fresh cache"""
+    path = str(tmp_path / "cache.sqlite3")
+    await LLMResponseCache(persistent=DiskCacheTier(path)).set("key", "value", 1200.0)
+
+    cache = LLMResponseCache(persistent=DiskCacheTier(path))
+    assert await cache.get("key") == "value"
+    assert cache.stats()["persistent_hits"] == 1
+    assert cache.stats()["latency_saved_ms"] == 1200.0
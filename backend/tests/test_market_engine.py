@@ -0,0 +1,105 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo import ReturnDocument
+import market_engine
+from market_engine import MarketError
+
+
+def test_seed_options_split_liquidity_by_opening_probability():
+    """Test seed pools follow the opening odds so repricing starts near them"""
+    options = market_engine.seed_options([{"id": "yes", "odds": 1.25}, {"id": "no", "odds": 5.0}], liquidity=100)
+    assert [o["seed"] for o in options] == [80.0, 20.0]
+    assert all(o["volume"] == 0 for o in options)
+    assert market_engine.parimutuel_odds(options, fee=0) == {"yes": 1.25, "no": 5.0}
+
+
+def test_parimutuel_odds_shorten_backed_option():
+    """Test staking on an option shortens its odds and lengthens the others"""
+    options = [{"id": "yes", "volume": 50, "seed": 50}, {"id": "no", "volume": 0, "seed": 50}]
+    odds = market_engine.parimutuel_odds(options, fee=0.1)
+    assert odds == {"yes": 1.35, "no": 2.7}
+    assert market_engine.parimutuel_odds([{"id": "a", "odds": 2.0}, {"id": "b", "odds": 2.0}]) == {"a": 2.0, "b": 2.0}
+
+
+def test_payout_ratio_shares_real_stakes_only():
+    """Test winners split the real pool after fee, ignoring the virtual seed, and None means refund"""
+    options = [{"id": "yes", "volume": 40.0, "seed": 60.0}, {"id": "no", "volume": 10.0, "seed": 40.0}]
+    assert market_engine.payout_ratio(options, "yes", fee=0) == 1.25
+    assert market_engine.payout_ratio(options, "no", fee=0.1) == 4.5
+    assert market_engine.payout_ratio([{"id": "yes", "volume": 0, "seed": 50.0}, {"id": "no", "volume": 5.0}], "yes") is None
+
+
+def test_bet_pipeline_adds_stake_then_reprices():
+    """Test the update pipeline bumps volumes first and reprices from the new pools"""
+    stake, reprice = market_engine.bet_pipeline("yes", 25.0, fee=0)
+    assert stake["$set"]["total_volume"] == {"$add": [{"$ifNull": ["$total_volume", 0]}, 25.0]}
+    assert stake["$set"]["version"] == {"$add": [{"$ifNull": ["$version", 0]}, 1]}
+    assert stake["$set"]["options"]["$map"]["in"]["$cond"][0] == {"$eq": ["$$o.id", "yes"]}
+    assert "odds" in reprice["$set"]["options"]["$let"]["in"]["$map"]["in"]["$mergeObjects"][1]
+
+
+@pytest.mark.asyncio
+async def test_place_bet_is_one_conditional_update():
+    """Test a bet on an active market is a single find_one_and_update returning the repriced market"""
+    db = MagicMock()
+    market = {"id": "m1", "status": "active", "options": [{"id": "yes", "odds": 1.6}, {"id": "no", "odds": 2.6}]}
+    db.markets.find_one_and_update = AsyncMock(return_value=market)
+
+    updated, option = await market_engine.place_bet(db, "m1", "no", 10.0)
+
+    assert option == {"id": "no", "odds": 2.6}
+    query = db.markets.find_one_and_update.call_args[0][0]
+    assert query == {"id": "m1", "status": "active", "options.id": "no"}
+    assert db.markets.find_one_and_update.call_args[1]["return_document"] == ReturnDocument.AFTER
+    db.markets.find_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("existing, status_code, detail", [
+    (None, 404, "Market not found"),
+    ({"status": "closed"}, 400, "Market is not active"),
+    ({"status": "active"}, 404, "Option not found"),
+])
+async def test_rejected_bet_reports_reason(existing, status_code, detail):
+    """Test a bet that matched nothing is explained with the original API errors"""
+    db = MagicMock()
+    db.markets.find_one_and_update = AsyncMock(return_value=None)
+    db.markets.find_one = AsyncMock(return_value=existing)
+
+    with pytest.raises(MarketError) as exc:
+        await market_engine.place_bet(db, "m1", "maybe", 10.0)
+
+    assert (exc.value.status_code, exc.value.detail) == (status_code, detail)
+
+
+@pytest.mark.parametrize("options, message", [
+    ([], "at least one option"),
+    ([{"label": "Yes", "odds": 2.0}], "string id"),
+    ([{"id": "yes", "odds": 2.0}, {"id": "yes", "odds": 2.0}], "Duplicate"),
+    ([{"id": "yes", "odds": "2.0"}], "numeric odds"),
+    ([{"id": "yes", "odds": 1.0}], "numeric odds"),
+])
+def test_validate_options_rejects_unpriceable_options(options, message):
+    """Test option lists that would break seeding or odds snapshots are refused"""
+    with pytest.raises(ValueError, match=message):
+        market_engine.validate_options(options)
+
+
+def test_create_market_rejects_invalid_options_before_insert():
+    """Test POST /markets answers 422 for an option without id and writes nothing"""
+    from unittest.mock import patch
+    from fastapi.testclient import TestClient
+    from server import app, get_current_user
+    app.dependency_overrides[get_current_user] = lambda: "0xuser"
+    with patch("server.db") as mock_db:
+        mock_db.markets.insert_one = AsyncMock()
+        try:
+            response = TestClient(app).post("/api/markets", json={
+                "event_id": "e1", "title": "Winner", "description": "Who wins",
+                "options": [{"label": "Yes", "odds": 2.0}, {"id": "no", "odds": 2.0}]
+            })
+        finally:
+            app.dependency_overrides.clear()
+
+    assert response.status_code == 422
+    mock_db.markets.insert_one.assert_not_called()
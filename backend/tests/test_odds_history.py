@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
+import odds_history
+from tests.test_rollups import AsyncCursor
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+MARKET = {
+    "id": "m1",
+    "options": [{"id": "yes", "odds": 1.25, "volume": 300}, {"id": "no", "odds": 5.0, "volume": 50}],
+    "total_volume": 350,
+}
+
+
+def point(minutes, yes_odds):
+    return {"t": (T0 + timedelta(minutes=minutes)).replace(tzinfo=None), "odds": {"yes": yes_odds, "no": 2.0}, "total_volume": 1}
+
+
+@pytest.mark.asyncio
+async def test_record_snapshot_appends_to_hour_bucket():
+    """Test snapshots are pushed into the market's hourly bucket until it is full"""
+    db = MagicMock()
+    db.odds_history.update_one = AsyncMock()
+
+    await odds_history.record_snapshot(db, MARKET, T0 + timedelta(minutes=17))
+
+    query, update = db.odds_history.update_one.call_args[0]
+    assert query == {"market_id": "m1", "bucket": T0, "n": {"$lt": odds_history.ODDS_BUCKET_MAX_POINTS}}
+    assert update["$push"]["points"]["odds"] == {"yes": 1.25, "no": 5.0}
+    assert update["$push"]["points"]["total_volume"] == 350
+    assert db.odds_history.update_one.call_args[1] == {"upsert": True}
+
+
+@pytest.mark.asyncio
+async def test_record_opening_snapshots_inserts_first_buckets_at_once():
+    """Test bulk-created markets start their history with one unordered insert"""
+    db = MagicMock()
+    db.odds_history.insert_many = AsyncMock()
+
+    await odds_history.record_opening_snapshots(db, [{**MARKET, "created_at": T0 + timedelta(minutes=5)}])
+
+    buckets = db.odds_history.insert_many.call_args[0][0]
+    assert buckets[0]["market_id"] == "m1" and buckets[0]["bucket"] == T0 and buckets[0]["n"] == 1
+    assert buckets[0]["points"][0]["odds"] == {"yes": 1.25, "no": 5.0}
+    assert db.odds_history.insert_many.call_args[1] == {"ordered": False}
+
+
+def test_pick_resolution_bounds_point_count():
+    """Test the finest resolution that keeps the response within max_points is chosen"""
+    assert odds_history.pick_resolution(T0, T0 + timedelta(hours=2), 200) == "minute"
+    assert odds_history.pick_resolution(T0, T0 + timedelta(days=7), 200) == "hour"
+    assert odds_history.pick_resolution(T0, T0 + timedelta(days=365), 200) == "day"
+
+
+def test_implied_probabilities_remove_overround():
+    """Test decimal odds become probabilities that sum to one"""
+    probabilities = odds_history.implied_probabilities({"yes": 1.25, "no": 5.0})
+    assert probabilities == {"yes": 0.8, "no": 0.2}
+
+
+@pytest.mark.asyncio
+async def test_history_downsamples_to_last_snapshot_per_bucket():
+    """Test raw snapshots are filtered to the range and reduced to one per bucket"""
+    db = MagicMock()
+    db.odds_history.find.return_value.sort.return_value = AsyncCursor([
+        {"points": [point(-5, 1.5), point(1, 1.6), point(3, 1.8), point(7, 2.0)]},
+        {"points": [point(61, 4.0)]},
+    ])
+
+    points = await odds_history.history(db, "m1", T0, T0 + timedelta(hours=2), resolution="five_minutes")
+
+    assert [p["t"] for p in points] == [T0, T0 + timedelta(minutes=5), T0 + timedelta(minutes=60)]
+    assert [p["odds"]["yes"] for p in points] == [1.8, 2.0, 4.0]
+    assert points[1]["probabilities"] == {"yes": 0.5, "no": 0.5}
+    assert odds_history.implied_volatility(points, "yes") > 0
@@ -0,0 +1,87 @@
+import pytest
+import json
+from unittest.mock import AsyncMock, patch, MagicMock
+from datetime import datetime, timezone
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pagination import encode_cursor, decode_cursor, keyset_filter, parse_fields, paginate, CursorError
+
+SORT = [("created_at", -1), ("id", -1)]
+
+
+def mock_collection(docs):
+    collection = MagicMock()
+    cursor = collection.find.return_value.sort.return_value.limit.return_value
+    cursor.to_list = AsyncMock(return_value=docs)
+    return collection
+
+
+def test_cursor_round_trips_datetimes_and_strings():
+    """Test cursors keep the type of each sort value"""
+    created = datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor({"created_at": created, "id": "e1"}, SORT), SORT) == [created, "e1"]
+    iso = created.isoformat()
+    assert decode_cursor(encode_cursor({"created_at": iso, "id": "e1"}, SORT), SORT) == [iso, "e1"]
+
+
+def test_invalid_cursor_is_rejected():
+    """Test garbage and cursors for another sort order raise CursorError"""
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor!", SORT)
+    with pytest.raises(CursorError):
+        decode_cursor(encode_cursor({"followers": 3}, [("followers", -1)]), SORT)
+
+
+def test_keyset_filter_orders_by_every_sort_key():
+    """Test the filter selects documents strictly after the cursor"""
+    assert keyset_filter(SORT, ["2025-01-01", "e5"]) == {"$or": [
+        {"created_at": {"$lt": "2025-01-01"}},
+        {"created_at": "2025-01-01", "id": {"$lt": "e5"}},
+    ]}
+    assert keyset_filter([("followers", 1), ("id", 1)], [3, "s1"])["$or"][1] == {"followers": 3, "id": {"$gt": "s1"}}
+
+
+def test_parse_fields_projects_sort_keys():
+    """Test requested fields are pushed down along with the sort keys"""
+    assert parse_fields(None, ["id", "title"], SORT) is None
+    assert parse_fields("title", ["id", "title", "created_at"], SORT) == {"_id": 0, "title": 1, "created_at": 1, "id": 1}
+    with pytest.raises(ValueError):
+        parse_fields("title,reasoning", ["id", "title"], SORT)
+
+
+@pytest.mark.asyncio
+async def test_paginate_returns_next_cursor_only_when_more_documents():
+    """Test one extra document is read to decide whether another page exists"""
+    docs = [{"id": f"e{i}", "created_at": f"2025-01-0{9 - i}"} for i in range(3)]
+
+    collection = mock_collection(docs)
+    page, next_cursor = await paginate(collection, {"status": "verified"}, SORT, limit=2)
+    assert [d["id"] for d in page] == ["e0", "e1"]
+    assert decode_cursor(next_cursor, SORT) == ["2025-01-08", "e1"]
+    collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+    collection = mock_collection(docs[2:])
+    page, next_cursor = await paginate(collection, {"status": "verified"}, SORT, limit=2, after=encode_cursor(docs[1], SORT))
+    assert next_cursor is None
+    query = collection.find.call_args[0][0]
+    assert query["$and"][0] == {"status": "verified"}
+    assert query["$and"][1]["$or"][0] == {"created_at": {"$lt": "2025-01-08"}}
+
+
+@pytest.mark.asyncio
+async def test_get_events_with_fields_returns_partial_documents():
+    """Test GET /events?fields= returns only the projected fields with the next cursor header"""
+    docs = [
+        {"id": "e1", "event_title": "A", "created_at": datetime(2025, 1, 2, tzinfo=timezone.utc)},
+        {"id": "e0", "event_title": "B", "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc)},
+    ]
+    with patch("server.db") as mock_db:
+        mock_db.events = mock_collection(docs)
+        from server import get_events
+
+        result = await get_events(Response(), start=None, end=None, limit=1, after=None, fields="event_title")
+
+    assert isinstance(result, JSONResponse)
+    assert json.loads(result.body) == [{"id": "e1", "event_title": "A", "created_at": "2025-01-02T00:00:00+00:00"}]
+    assert decode_cursor(result.headers["X-Next-Cursor"], SORT) == [datetime(2025, 1, 2, tzinfo=timezone.utc), "e1"]
+    assert mock_db.events.find.call_args[0][1] == {"_id": 0, "event_title": 1, "created_at": 1, "id": 1}
@@ -0,0 +1,74 @@
+import pytest
+import asyncio
+from pipeline import Stage, StageGraph, PipelineError
+
+
+def sleeper(delay, value):
+    async def func(results):
+        await asyncio.sleep(delay)
+        return value
+    return func
+
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    """Test stages without a dependency between them overlap"""
+    graph = StageGraph([
+        Stage("a", sleeper(0.01, "a")),
+        Stage("b", sleeper(0.1, "b"), deps=["a"]),
+        Stage("c", sleeper(0.1, "c"), deps=["a"]),
+        Stage("d", sleeper(0.01, "d"), deps=["b", "c"]),
+    ])
+
+    results = await graph.run()
+    timings = results["timings"]
+
+    assert results["d"] == "d"
+    assert timings["c"]["start_ms"] < timings["b"]["end_ms"]
+    assert timings["d"]["end_ms"] < 200
+    assert graph.critical_path(timings)[0] == "a"
+    assert graph.critical_path(timings)[-1] == "d"
+
+
+@pytest.mark.asyncio
+async def test_stage_receives_dependency_results():
+    """Test a stage reads the output of the stages it depends on"""
+    async def double(results):
+        return results["base"] * 2
+
+    graph = StageGraph([
+        Stage("base", sleeper(0, 21)),
+        Stage("double", double, deps=["base"]),
+    ])
+
+    results = await graph.run()
+    assert results["double"] == 42
+
+
+@pytest.mark.asyncio
+async def test_stage_timeout_uses_fallback():
+    """Test a timed out stage with a fallback does not fail the pipeline"""
+    graph = StageGraph([
+        Stage("slow", sleeper(1, "late"), timeout=0.01, fallback=lambda e: str(e)),
+    ])
+
+    results = await graph.run()
+    assert "timed out" in results["slow"]
+
+
+@pytest.mark.asyncio
+async def test_stage_timeout_without_fallback_raises():
+    """Test a timed out stage without a fallback fails the pipeline"""
+    graph = StageGraph([Stage("slow", sleeper(1, "late"), timeout=0.01)])
+
+    with pytest.raises(TimeoutError, match="slow"):
+        await graph.run()
+
+
+def test_cycle_rejected():
+    """Test graphs with cycles are rejected"""
+    with pytest.raises(PipelineError, match="Cycle"):
+        StageGraph([
+            Stage("a", sleeper(0, 1), deps=["b"]),
+            Stage("b", sleeper(0, 1), deps=["a"]),
+        ])
@@ -0,0 +1,232 @@
+import pytest
+import asyncio
+import json
+from realtime import ConnectionManager, MemoryBroker, MemoryBackend
+
+
+class FakeWebSocket:
+    """WebSocket stand-in recording sent frames"""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("socket closed")
+        await asyncio.sleep(self.delay)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_broadcast_or_others():
+    """Test broadcast returns immediately and fast clients are not held up"""
+    manager = ConnectionManager()
+    slow, fast = FakeWebSocket(delay=1.0), FakeWebSocket()
+    await manager.connect(slow)
+    await manager.connect(fast)
+
+    await asyncio.wait_for(manager.broadcast({"type": "new_event", "data": {"id": "evt1"}}), timeout=0.1)
+    await asyncio.sleep(0.01)
+
+    assert fast.sent == [{"type": "new_event", "data": {"id": "evt1"}}]
+    assert slow.sent == []
+    manager.disconnect(slow)
+    manager.disconnect(fast)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_messages():
+    """Test a slow consumer is down-sampled to the newest messages"""
+    manager = ConnectionManager(queue_size=2, slow_consumer_policy="drop_oldest")
+    slow = FakeWebSocket(delay=1.0)
+    await manager.connect(slow)
+    await asyncio.sleep(0)
+
+    for i in range(5):
+        await manager.broadcast({"seq": i})
+
+    stats = manager.stats()
+    assert stats["max_queue_depth"] == 2
+    assert stats["messages_dropped"] >= 2
+    queued = [json.loads(manager.connections[slow].queue.get_nowait()) for _ in range(2)]
+    assert queued == [{"seq": 3}, {"seq": 4}]
+    manager.disconnect(slow)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_disconnects_under_disconnect_policy():
+    """Test a slow consumer is closed when the policy is disconnect"""
+    manager = ConnectionManager(queue_size=1, slow_consumer_policy="disconnect")
+    slow = FakeWebSocket(delay=1.0)
+    await manager.connect(slow)
+    await asyncio.sleep(0)
+
+    for i in range(3):
+        await manager.broadcast({"seq": i})
+    await asyncio.sleep(0)
+
+    assert slow not in manager.connections
+    assert slow.closed_with == 1013
+    assert manager.stats()["slow_disconnects"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dead_socket_is_removed():
+    """Test a socket that fails to send is dropped from the hub"""
+    manager = ConnectionManager()
+    dead = FakeWebSocket(fail=True)
+    await manager.connect(dead)
+
+    await manager.broadcast({"type": "ping"})
+    await asyncio.sleep(0.01)
+
+    assert manager.stats()["connections"] == 0
+    assert manager.stats()["send_failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_broadcast_reaches_only_topic_subscribers():
+    """Test subscribed clients only receive matching topics while others get everything"""
+    manager = ConnectionManager()
+    market_page, category_page, dashboard = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    for ws in (market_page, category_page, dashboard):
+        await manager.connect(ws)
+
+    await manager.handle_client_message(market_page, json.dumps({"action": "subscribe", "topics": ["market:m1"]}))
+    await manager.handle_client_message(category_page, json.dumps({"action": "subscribe", "topics": ["category:crypto"]}))
+    await asyncio.sleep(0.01)
+    assert market_page.sent == [{"type": "subscriptions", "topics": ["market:m1"]}]
+
+    await manager.broadcast({"type": "new_market", "data": {"id": "m1"}}, topics=["market:m1", "event:e1"])
+    await manager.broadcast({"type": "new_event", "data": {"id": "e2"}}, topics=["event:e2", "category:sports"])
+    await asyncio.sleep(0.01)
+
+    assert [m["type"] for m in market_page.sent[1:]] == ["new_market"]
+    assert category_page.sent[1:] == []
+    assert [m["type"] for m in dashboard.sent] == ["new_market", "new_event"]
+    assert manager.stats()["deliveries"] == 3
+    for ws in (market_page, category_page, dashboard):
+        manager.disconnect(ws)
+    assert manager.topics == {}
+
+
+@pytest.mark.asyncio
+async def test_unsubscribing_everything_restores_full_feed():
+    """Test a client with no subscriptions left is back on the unfiltered feed"""
+    manager = ConnectionManager()
+    ws = FakeWebSocket()
+    await manager.connect(ws)
+
+    await manager.handle_client_message(ws, json.dumps({"action": "subscribe", "topics": ["type:event_verified"]}))
+    assert ws not in manager.topics.get("*", set())
+    await manager.handle_client_message(ws, json.dumps({"action": "unsubscribe", "topics": ["type:event_verified"]}))
+    assert ws in manager.topics["*"]
+    assert "type:event_verified" not in manager.topics
+    manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_invalid_subscription_is_rejected():
+    """Test malformed requests and unknown topics get an error reply"""
+    manager = ConnectionManager(max_topics=1)
+    ws = FakeWebSocket()
+    await manager.connect(ws)
+
+    await manager.handle_client_message(ws, "not json")
+    await manager.handle_client_message(ws, json.dumps({"action": "subscribe", "topics": ["user:alice"]}))
+    await manager.handle_client_message(ws, json.dumps({"action": "subscribe", "topics": ["event:a", "event:b"]}))
+    await asyncio.sleep(0.01)
+
+    assert [m["type"] for m in ws.sent] == ["error", "error", "error"]
+    assert manager.connections[ws].topics == set()
+    manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_relayed_to_other_workers():
+    """Test a broadcast on one worker reaches sockets connected to another worker"""
+    broker = MemoryBroker()
+    worker_a = ConnectionManager(backend=MemoryBackend(broker))
+    worker_b = ConnectionManager(backend=MemoryBackend(broker))
+    await worker_a.start()
+    await worker_b.start()
+    local, remote, other_market = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(local)
+    await worker_b.connect(remote)
+    await worker_b.connect(other_market)
+    await worker_b.handle_client_message(other_market, json.dumps({"action": "subscribe", "topics": ["market:m2"]}))
+
+    await worker_a.broadcast({"type": "new_market", "data": {"id": "m1"}}, topics=["market:m1"])
+    await asyncio.sleep(0.01)
+
+    assert local.sent == [{"type": "new_market", "data": {"id": "m1"}}]
+    assert remote.sent == [{"type": "new_market", "data": {"id": "m1"}}]
+    assert [m["type"] for m in other_market.sent] == ["subscriptions"]
+    assert worker_a.stats()["broadcast_backend"]["published"] == 1
+    assert worker_a.stats()["broadcast_backend"]["relayed"] == 0
+    assert worker_b.stats()["broadcast_backend"]["relayed"] == 1
+
+    await worker_a.close()
+    await worker_b.close()
+    assert broker.subscribers == []
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_starts_while_redis_is_unreachable():
+    """Test starting the Redis relay does not wait on Redis; the listener retries the subscribe"""
+    import sys
+    from unittest.mock import AsyncMock, MagicMock, patch
+    from realtime.backends import RedisBackend
+    pubsub = MagicMock(subscribed=False)
+    pubsub.subscribe = AsyncMock(side_effect=ConnectionError("Connection refused"))
+    pubsub.unsubscribe = AsyncMock()
+    pubsub.aclose = AsyncMock()
+    client = MagicMock(aclose=AsyncMock())
+    client.pubsub.return_value = pubsub
+    fake_redis = MagicMock()
+    fake_redis.asyncio.from_url.return_value = client
+    backend = RedisBackend()
+
+    with patch.dict(sys.modules, {"redis": fake_redis, "redis.asyncio": fake_redis.asyncio}):
+        await backend.start(AsyncMock())
+        pubsub.subscribe.assert_not_called()
+        await asyncio.sleep(0.01)
+        assert not backend.listener.done()  # failed subscribe is retried, not fatal
+        await backend.close()
+
+    pubsub.subscribe.assert_awaited_once_with(backend.channel)
+
+
+@pytest.mark.asyncio
+async def test_broadcast_is_encoded_once_across_workers():
+    """Test the relay carries the encoded message bytes, so no worker encodes it a second time"""
+    from unittest.mock import patch
+    from realtime import hub
+    broker = MemoryBroker()
+    worker_a = ConnectionManager(backend=MemoryBackend(broker))
+    worker_b = ConnectionManager(backend=MemoryBackend(broker))
+    await worker_a.start()
+    await worker_b.start()
+    remote = FakeWebSocket()
+    await worker_b.connect(remote)
+
+    with patch("realtime.hub.encode_message", wraps=hub.encode_message) as encode:
+        await worker_a.broadcast({"type": "new_event", "data": {"id": "evt1", "title": "Über\nline"}}, topics=["event:evt1"])
+        await asyncio.sleep(0.01)
+
+    assert encode.call_count == 1
+    assert remote.sent == [{"type": "new_event", "data": {"id": "evt1", "title": "Über\nline"}}]
+    envelope = worker_a.backend.envelope(b'{"type":"x"}', ["event:evt1"])
+    assert envelope.endswith(b'\n{"type":"x"}')
+
+    await worker_a.close()
+    await worker_b.close()
@@ -0,0 +1,122 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+from resilience import AdaptiveTimeout, BulkheadFullError, CircuitBreaker, CircuitOpenError, UpstreamGuard
+
+
+def make_guard(**overrides):
+    config = {"breaker_threshold": 2, "breaker_reset": 30, "timeout_floor": 0.01, "timeout_ceiling": 1,
+              "bulkhead_size": 1, "bulkhead_queue": 0}
+    return UpstreamGuard("test", **{**config, **overrides})
+
+
+def test_breaker_opens_then_half_opens_after_reset():
+    """Test closed -> open after consecutive failures -> one half-open trial -> closed"""
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+
+    breaker.failure()
+    assert breaker.allow() and breaker.state == "closed"
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 10
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()  # only one trial at a time
+    breaker.failure()
+    assert breaker.state == "open" and breaker.times_opened == 2
+
+    now[0] = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_adaptive_timeout_tracks_latency_percentile():
+    """Test the timeout stays at the ceiling until warmed up, then follows p99 x multiplier"""
+    timeout = AdaptiveTimeout(floor=0.5, ceiling=30, p=99, multiplier=3, min_samples=5)
+    for _ in range(4):
+        timeout.record(0.2)
+    assert timeout.current() == 30
+
+    timeout.record(0.2)
+    assert timeout.current() == pytest.approx(0.6)
+    for _ in range(5):
+        timeout.record(0.01)
+    assert timeout.current() == pytest.approx(0.6)  # p99 is still the slow sample
+    timeout.latencies.clear()
+    for _ in range(5):
+        timeout.record(0.01)
+    assert timeout.current() == 0.5
+
+
+@pytest.mark.asyncio
+async def test_guard_rejects_calls_while_open():
+    """Test failing calls, including timeouts and 5xx results, open the circuit"""
+    guard = make_guard()
+
+    async def hang(timeout):
+        await asyncio.sleep(10)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await guard.call(hang)
+    response = MagicMock(status_code=503)
+    assert await guard.call(AsyncMock(return_value=response), failed=lambda r: r.status_code >= 500) is response
+
+    upstream = AsyncMock()
+    with pytest.raises(CircuitOpenError):
+        await guard.call(upstream)
+    upstream.assert_not_called()
+    stats = guard.stats()
+    assert stats["breaker"]["state"] == "open"
+    assert (stats["failures"], stats["timeouts"], stats["breaker"]["rejected"]) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_bulkhead_rejects_beyond_queue():
+    """Test calls over the bulkhead's size and queue fail fast instead of piling up"""
+    guard = make_guard()
+    release = asyncio.Event()
+
+    async def slow(timeout):
+        await release.wait()
+        return "ok"
+
+    first = asyncio.create_task(guard.call(slow))
+    await asyncio.sleep(0)
+    with pytest.raises(BulkheadFullError):
+        await guard.call(slow)
+    release.set()
+
+    assert await first == "ok"
+    assert guard.stats()["bulkhead"]["rejected"] == 1
+    assert guard.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_linera_stops_retrying_when_circuit_opens():
+    """Test publish_event gives up immediately once the Linera circuit is open"""
+    from linera_client.client import publish_event, LineraClientError
+
+    guard = make_guard(breaker_threshold=1)
+    with patch("linera_client.client.ORACLE_APP_ID", "test_app_id"), \
+         patch("linera_client.client.guards.get", return_value=guard), \
+         patch("linera_client.client.httpx.AsyncClient") as mock_client, \
+         patch("linera_client.client.asyncio.sleep", new_callable=AsyncMock):
+        post = AsyncMock(return_value=MagicMock(status_code=500, text="Server error"))
+        mock_client.return_value.__aenter__.return_value.post = post
+
+        with pytest.raises(LineraClientError, match="circuit is open"):
+            await publish_event(event_id="e1", payload_hash="h", confidence=0.9, sources=["s1"], cid="cid")
+
+    assert post.await_count == 1
+
+
+def test_batched_prompts_have_their_own_guard():
+    """Test multi-item prompts get a separate breaker and a longer timeout than single LLM calls"""
+    from resilience import UpstreamGuards, guard_config
+    registry = UpstreamGuards()
+
+    assert registry.get("openai_batch") is not registry.get("openai")
+    assert guard_config("openai_batch")["timeout_ceiling"] > guard_config("openai")["timeout_ceiling"]
+    assert guard_config("openai_batch")["timeout_floor"] > guard_config("openai")["timeout_floor"]
@@ -0,0 +1,140 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from datetime import datetime, timedelta, timezone
+import rollups
+
+T0 = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class AsyncCursor:
+    """Async-iterable stand-in for a Motor cursor"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+
+    def __aiter__(self):
+        self._iter = iter(self.docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_record_increments_minute_bucket_in_every_dimension():
+    """Test one unordered bulk write upserts the minute bucket of each dimension"""
+    db = MagicMock()
+    db.rollups.bulk_write = AsyncMock()
+
+    await rollups.record(db, T0 + timedelta(seconds=42), rollups.dimensions("crypto", "m1"), predictions=1, volume=25.0)
+
+    ops = db.rollups.bulk_write.call_args[0][0]
+    assert [op._filter["dimension"] for op in ops] == ["all", "category:crypto", "market:m1"]
+    assert all(op._filter["bucket"] == T0 and op._filter["resolution"] == "minute" for op in ops)
+    assert ops[0]._doc == {"$inc": {"predictions": 1, "volume": 25.0}}
+
+
+def rollup_batches(*batches):
+    db = MagicMock()
+    db.rollups.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(side_effect=list(batches) + [[]])
+    db.rollups.bulk_write = AsyncMock()
+    db.rollups.update_many = AsyncMock()
+    db.rollups.delete_many = AsyncMock()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_compact_folds_old_minutes_into_hours():
+    """Test minute buckets past the cutoff are summed into their hour and deleted"""
+    db = rollup_batches([
+        {"_id": 1, "dimension": "all", "bucket": T0.replace(tzinfo=None), "predictions": 2, "volume": 10.0},
+        {"_id": 2, "dimension": "all", "bucket": (T0 + timedelta(minutes=5)).replace(tzinfo=None), "predictions": 1},
+    ])
+
+    folded = await rollups.compact(db, "minute", "hour", T0 + timedelta(hours=3))
+
+    assert folded == 2
+    assert db.rollups.find.call_args[0][0]["bucket"] == {"$lt": T0 + timedelta(hours=3)}
+    fold = db.rollups.update_many.call_args[0][1]["$set"]["folded"]
+    assert db.rollups.update_many.call_args[0][0] == {"_id": {"$in": [1, 2]}}
+    apply, pull = (call[0][0] for call in db.rollups.bulk_write.call_args_list)
+    assert len(apply) == 1
+    assert apply[0]._filter == {"dimension": "all", "resolution": "hour", "bucket": T0, "folds": {"$ne": fold}}
+    assert apply[0]._doc == {"$inc": {"predictions": 3, "volume": 10.0}, "$addToSet": {"folds": fold}}
+    db.rollups.delete_many.assert_awaited_once_with({"_id": {"$in": [1, 2]}})
+    assert pull[0]._doc == {"$pull": {"folds": fold}}
+
+
+@pytest.mark.asyncio
+async def test_compact_rerun_after_crash_does_not_double_count():
+    """Test sources left by a crashed run keep their fold id, and a target that already has it is skipped"""
+    from pymongo.errors import BulkWriteError
+    db = rollup_batches([
+        {"_id": 1, "dimension": "all", "bucket": T0, "predictions": 2, "folded": "crashed-run"},
+    ])
+    db.rollups.bulk_write = AsyncMock(side_effect=[
+        BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}], "writeConcernErrors": []}),
+        None,
+    ])
+
+    assert await rollups.compact(db, "minute", "hour", T0 + timedelta(hours=3)) == 1
+
+    db.rollups.update_many.assert_not_called()
+    apply = db.rollups.bulk_write.call_args_list[0][0][0]
+    assert apply[0]._filter["folds"] == {"$ne": "crashed-run"}
+    db.rollups.delete_many.assert_awaited_once_with({"_id": {"$in": [1]}})
+
+
+@pytest.mark.asyncio
+async def test_compact_works_in_batches_and_stops_when_lease_is_lost():
+    """Test compaction reads bounded batches and stops once the lease cannot be renewed"""
+    full = [{"_id": i, "dimension": "all", "bucket": T0, "predictions": 1} for i in range(2)]
+    db = rollup_batches(full, full, full)
+    renew = AsyncMock(side_effect=[True, False])
+
+    folded = await rollups.compact(db, "minute", "hour", T0 + timedelta(hours=3), batch_size=2, renew=renew)
+
+    assert folded == 4
+    assert db.rollups.find.return_value.sort.return_value.limit.call_args[0][0] == 2
+    assert db.rollups.delete_many.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_compactor_skips_run_while_another_worker_holds_the_lease():
+    """Test only the lease holder compacts, so two workers never fold the same buckets"""
+    from pymongo.errors import DuplicateKeyError
+    db = rollup_batches()
+    db.rollups.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=[])
+    db.locks.find_one_and_update = AsyncMock(side_effect=DuplicateKeyError("E11000"))
+    db.locks.delete_one = AsyncMock()
+
+    assert await rollups.RollupCompactor(db).run_once() is None
+    db.rollups.find.assert_not_called()
+    db.locks.delete_one.assert_not_called()
+
+    db.locks.find_one_and_update = AsyncMock(return_value=None)
+    compactor = rollups.RollupCompactor(db)
+    assert await compactor.run_once() == {"minute_to_hour": 0, "hour_to_day": 0}
+    db.locks.delete_one.assert_awaited_once_with({"_id": rollups.COMPACT_LOCK, "owner": compactor.owner})
+
+
+@pytest.mark.asyncio
+async def test_timeseries_merges_resolutions_and_zero_fills():
+    """Test finer buckets are summed into the requested bucket and gaps are zero"""
+    db = MagicMock()
+    db.rollups.find.return_value = AsyncCursor([
+        {"bucket": T0, "verifications": 2, "confidence_sum": 1.8},
+        {"bucket": T0 + timedelta(minutes=30), "verifications": 1, "confidence_sum": 0.6},
+        {"bucket": T0 + timedelta(hours=2), "verifications": 1, "confidence_sum": 0.5},
+    ])
+
+    confidence = await rollups.timeseries(db, "confidence", "hour", T0 + timedelta(minutes=10), T0 + timedelta(hours=3))
+
+    assert [p["t"] for p in confidence] == [T0 + timedelta(hours=h) for h in range(3)]
+    assert [p["value"] for p in confidence] == [0.8, None, 0.5]
+    query = db.rollups.find.call_args[0][0]
+    assert query["resolution"] == {"$in": ["minute", "hour"]}
+    assert query["bucket"]["$gte"] == T0
@@ -0,0 +1,62 @@
+import json
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from fastapi import Response
+from serialization import FastJSONResponse, dumps, model_projection, trusted_documents
+from tests.test_pagination import mock_collection
+
+
+def test_dumps_matches_pydantic_date_format():
+    """Test fast encoding renders UTC dates like pydantic does, with a trailing Z"""
+    from server import Event
+
+    created = datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)
+    event = Event(event_title="A", event_description="B", category="crypto", created_at=created)
+
+    assert json.loads(dumps({"created_at": created})) == json.loads(event.model_dump_json(include={"created_at"}))
+    assert dumps({"a": [1, None]}) == b'{"a":[1,null]}'
+
+
+def test_trusted_documents_fill_plain_defaults():
+    """Test documents missing optional fields get the model's defaults, as validation would add"""
+    from server import Event
+
+    docs = trusted_documents([{"id": "e1", "event_title": "A", "status": "verified"}], Event)
+
+    assert docs[0]["status"] == "verified"
+    assert docs[0]["resolved_at"] is None and docs[0]["proof_links"] == []
+    assert "created_at" not in docs[0]  # factory defaults are not invented
+    assert model_projection(Event)["_id"] == 0 and model_projection(Event)["created_at"] == 1
+
+
+@pytest.mark.asyncio
+async def test_list_page_fast_path_projects_and_skips_validation():
+    """Test FAST_SERIALIZATION reads only model fields and returns an encoded response"""
+    docs = [{"id": "e1", "event_title": "A", "event_description": "B", "category": "crypto",
+             "created_at": datetime(2025, 1, 2, tzinfo=timezone.utc)}]
+    with patch("server.db") as mock_db, patch("server.FAST_SERIALIZATION", True):
+        mock_db.events = mock_collection(docs)
+        from server import get_events
+
+        result = await get_events(Response(), start=None, end=None, limit=10, after=None, fields=None)
+
+    assert isinstance(result, FastJSONResponse)
+    body = json.loads(result.body)
+    assert body[0]["created_at"] == "2025-01-02T00:00:00Z"
+    assert body[0]["status"] == "pending"
+    projection = mock_db.events.find.call_args[0][1]
+    assert projection["_id"] == 0 and projection["event_title"] == 1
+
+
+def test_broadcast_encoding_uses_fast_encoder():
+    """Test the hub encodes a broadcast once with the fast encoder when enabled"""
+    from realtime import hub
+
+    message = {"type": "new_event", "data": {"created_at": datetime(2025, 1, 2, tzinfo=timezone.utc)}}
+    with patch("realtime.hub.FAST_SERIALIZATION", True):
+        fast = hub.encode_message(message)
+    standard = hub.encode_message(message)
+
+    assert isinstance(fast, bytes)
+    assert json.loads(fast) == json.loads(standard) == {"type": "new_event", "data": {"created_at": "2025-01-02T00:00:00Z"}}
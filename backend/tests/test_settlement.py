@@ -0,0 +1,162 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+import settlement
+from settlement import SettlementError
+
+
+def settlement_db(chunks, market=None):
+    """Mock db whose open-prediction query returns `chunks` one call at a time"""
+    db = MagicMock()
+    db.markets.find_one_and_update = AsyncMock(return_value=market or {
+        "id": "m1", "event_id": "e1", "status": "active",
+        "options": [{"id": "yes", "volume": 40.0, "seed": 60.0}, {"id": "no", "volume": 10.0, "seed": 40.0}],
+    })
+    db.markets.update_one = AsyncMock()
+    db.settlements.update_one = AsyncMock()
+    db.settlements.find_one_and_update = AsyncMock(side_effect=lambda query, update, **kwargs: (
+        {"payout_ratio": update["$setOnInsert"]["payout_ratio"]} if "$setOnInsert" in update
+        else {"market_id": "m1", "status": "done"}
+    ))
+    db.predictions.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(side_effect=chunks)
+    db.predictions.bulk_write = AsyncMock(side_effect=lambda ops, **kwargs: MagicMock(modified_count=len(ops)))
+    db.predictions.aggregate.return_value.to_list = AsyncMock(return_value=[
+        {"_id": "won", "count": 2, "stake": 20.0, "payout": 36.0},
+        {"_id": "lost", "count": 1, "stake": 5.0, "payout": 0.0},
+    ])
+    return db
+
+
+def test_winning_option_follows_verdict():
+    """Test only confident verdicts resolve markets"""
+    assert settlement.winning_option({"result": "verified"}) == "yes"
+    assert settlement.winning_option({"result": "unverified"}) == "no"
+    assert settlement.winning_option({"result": "verified", "needs_manual_review": True}) is None
+    assert settlement.winning_option({"result": "error"}) is None
+
+
+@pytest.mark.asyncio
+async def test_settle_market_settles_in_chunks_and_notifies_once():
+    """Test predictions are settled with one bulk write per chunk and a single aggregated message"""
+    db = settlement_db([
+        [{"id": "p1", "option_id": "yes"}, {"id": "p2", "option_id": "no"}],
+        [{"id": "p3", "option_id": "yes"}],
+        [],
+    ])
+    notify = AsyncMock()
+
+    with patch("settlement.analytics.increment", new_callable=AsyncMock) as increment:
+        await settlement.settle_market(db, "m1", "yes", notify, chunk_size=2)
+
+    assert db.predictions.bulk_write.await_count == 2
+    won, lost = db.predictions.bulk_write.call_args_list[0][0][0]
+    assert won._filter == {"id": {"$in": ["p1"]}, "status": "active"}
+    # Real pool of 50 shared by the 40 staked on "yes"; the seeds are not paid out
+    assert won._doc[0]["$set"]["payout"] == {"$trunc": [{"$multiply": ["$amount", 1.25]}, 4]}
+    assert lost._doc["$set"]["status"] == "lost"
+    processed = [call[0][1]["$inc"]["processed"] for call in db.settlements.update_one.call_args_list if "$inc" in call[0][1]]
+    assert processed == [2, 1]  # modified_count of each bulk_write
+    assert db.settlements.update_one.call_args_list[-1][0][1]["$set"] == {"last_id": "p3"}
+    db.markets.update_one.assert_awaited_once()
+    assert db.markets.update_one.call_args[0][1]["$set"]["status"] == "resolved"
+
+    increment.assert_awaited_once_with(db, active_markets=-1)
+    assert [call[0][0]["type"] for call in notify.call_args_list] == ["market_settling", "market_settled"]
+    message, topics = notify.call_args[0]
+    assert message["data"]["won"] == 2 and message["data"]["payout_total"] == 36.0
+    assert topics == ["market:m1", "event:e1"]
+
+
+@pytest.mark.asyncio
+async def test_settle_market_resumes_interrupted_run():
+    """Test a market left in settling with the same resolution is picked up again"""
+    db = settlement_db([[], []], market={"id": "m1", "event_id": "e1", "status": "settling", "resolution": "yes", "options": []})
+    notify = AsyncMock()
+
+    with patch("settlement.analytics.increment", new_callable=AsyncMock) as increment:
+        await settlement.settle_market(db, "m1", "yes", notify, chunk_size=100)
+
+    query = db.markets.find_one_and_update.call_args[0][0]
+    assert {"status": "settling", "resolution": "yes"} in query["$or"]
+    db.predictions.bulk_write.assert_not_called()
+    increment.assert_not_called()  # counted when the first run left "active"
+    assert [call[0][0]["type"] for call in notify.call_args_list] == ["market_settled"]
+
+
+@pytest.mark.asyncio
+async def test_settle_market_sweeps_predictions_inserted_during_settlement():
+    """Test a prediction inserted after the chunk loop is settled by the sweep after resolving"""
+    db = settlement_db([[], [{"id": "late", "option_id": "no"}]])
+
+    with patch("settlement.analytics.increment", new_callable=AsyncMock):
+        await settlement.settle_market(db, "m1", "yes", chunk_size=100)
+
+    (lost,) = db.predictions.bulk_write.call_args[0][0]
+    assert lost._filter == {"id": {"$in": ["late"]}, "status": "active"}
+
+
+@pytest.mark.asyncio
+async def test_settle_late_prediction_after_market_resolved():
+    """Test a prediction whose insert lands after settlement finished is settled on the spot"""
+    db = MagicMock()
+    db.markets.find_one = AsyncMock(return_value={"status": "resolved", "resolution": "yes"})
+    db.settlements.find_one = AsyncMock(return_value={"payout_ratio": 1.25})
+    db.predictions.find_one_and_update = AsyncMock(return_value={"id": "p9", "status": "won"})
+    db.settlements.update_one = AsyncMock()
+    prediction = {"id": "p9", "market_id": "m1", "option_id": "yes", "amount": 10.0, "potential_payout": 18.0}
+
+    assert await settlement.settle_late_prediction(db, prediction) == {"id": "p9", "status": "won"}
+
+    query, update = db.predictions.find_one_and_update.call_args[0]
+    assert query == {"id": "p9", "status": "active"}
+    assert update["$set"]["payout"] == 12.5  # pool share, not the indicative potential_payout
+    assert db.settlements.update_one.call_args[0][1]["$inc"]["won"] == 1
+
+    db.markets.find_one = AsyncMock(return_value={"status": "settling", "resolution": "yes"})
+    assert await settlement.settle_late_prediction(db, prediction) is None
+
+
+@pytest.mark.asyncio
+async def test_settle_market_rejects_resolved_market():
+    """Test a market cannot be settled twice"""
+    db = settlement_db([])
+    db.markets.find_one_and_update = AsyncMock(return_value=None)
+    db.markets.find_one = AsyncMock(return_value={"status": "resolved", "resolution": "no"})
+
+    with pytest.raises(SettlementError):
+        await settlement.settle_market(db, "m1", "yes")
+
+
+@pytest.mark.asyncio
+async def test_settle_market_refunds_when_nobody_backed_the_winner():
+    """Test every stake is refunded when the winning option has no real stake, whatever its seed"""
+    market = {"id": "m1", "event_id": "e1", "status": "active",
+              "options": [{"id": "yes", "volume": 0, "seed": 50.0}, {"id": "no", "volume": 30.0, "seed": 50.0}]}
+    db = settlement_db([[{"id": "p1", "option_id": "no"}, {"id": "p2", "option_id": "no"}], []], market=market)
+
+    with patch("settlement.analytics.increment", new_callable=AsyncMock):
+        await settlement.settle_market(db, "m1", "yes", chunk_size=100)
+
+    assert db.settlements.find_one_and_update.call_args_list[0][0][1]["$setOnInsert"]["payout_ratio"] is None
+    (refund,) = db.predictions.bulk_write.call_args[0][0]
+    assert refund._filter == {"id": {"$in": ["p1", "p2"]}, "status": "active"}
+    assert refund._doc[0]["$set"]["status"] == "refunded" and refund._doc[0]["$set"]["payout"] == "$amount"
+
+
+@pytest.mark.asyncio
+async def test_resume_settlements_only_runs_with_the_lease():
+    """Test only the worker holding the resume lease picks up interrupted settlements"""
+    from pymongo.errors import DuplicateKeyError
+    db = MagicMock()
+    db.locks.find_one_and_update = AsyncMock(side_effect=DuplicateKeyError("E11000"))
+    db.locks.delete_one = AsyncMock()
+
+    assert await settlement.resume_settlements(db) is None
+    db.settlements.find.assert_not_called()
+
+    db.locks.find_one_and_update = AsyncMock(return_value=None)
+    db.settlements.find.return_value.to_list = AsyncMock(return_value=[{"market_id": "m1", "winning_option": "yes"}])
+    with patch("settlement.settle_market", new_callable=AsyncMock) as settle:
+        assert await settlement.resume_settlements(db) == 1
+
+    settle.assert_awaited_once_with(db, "m1", "yes", None)
+    assert db.locks.delete_one.call_args[0][0]["_id"] == settlement.RESUME_LOCK
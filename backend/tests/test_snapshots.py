@@ -0,0 +1,128 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+import pyarrow as pa
+import snapshots
+from snapshots import SnapshotError, partition_path, snapshot_dataset
+
+DAY1 = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+DAY2 = datetime(2025, 1, 2, 8, tzinfo=timezone.utc)
+
+
+def snapshot_db(batches, state=None):
+    db = MagicMock()
+    db.snapshots.find_one = AsyncMock(return_value=state)
+    db.snapshots.update_one = AsyncMock()
+    events = MagicMock()
+    events.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(side_effect=batches + [[]])
+    db.__getitem__.return_value = events
+    return db, events
+
+
+@pytest.mark.asyncio
+async def test_snapshot_partitions_by_day_and_category_and_advances_watermark():
+    """Test each batch is split into day/category files and the watermark follows the last record"""
+    events = [
+        {"id": "e1", "category": "crypto", "status": "verified", "confidence": 0.9, "resolved_at": DAY1},
+        {"id": "e2", "category": "sports", "status": "verified", "confidence": 0.8, "resolved_at": DAY1},
+        {"id": "e3", "category": "crypto", "status": "verified", "confidence": 0.7, "resolved_at": DAY2},
+    ]
+    db, _ = snapshot_db([events])
+    write = MagicMock()
+
+    result = await snapshot_dataset(db, "events", root="/snap", batch_size=10, write=write)
+
+    assert result == {"rows": 3, "files": 3, "watermark": DAY2}
+    written = {(call.args[0], len(call.args[3])) for call in write.call_args_list}
+    assert written == {
+        (partition_path(snapshots.Path("/snap"), "events", "2025-01-01", "crypto"), 1),
+        (partition_path(snapshots.Path("/snap"), "events", "2025-01-01", "sports"), 1),
+        (partition_path(snapshots.Path("/snap"), "events", "2025-01-02", "crypto"), 1),
+    }
+    assert db.snapshots.update_one.call_args[0][1]["$set"]["last_id"] == "e3"
+
+
+@pytest.mark.asyncio
+async def test_snapshot_resumes_after_watermark():
+    """Test an incremental run only reads records after the stored (time, id) watermark"""
+    db, events = snapshot_db([], state={"_id": "events", "watermark": DAY1, "last_id": "e2"})
+
+    result = await snapshot_dataset(db, "events", root="/snap", write=MagicMock())
+
+    assert result["rows"] == 0
+    query = events.find.call_args[0][0]
+    assert query["$and"][0]["status"] == "verified"
+    assert query["$and"][0]["resolved_at"]["$type"] == "date"
+    assert query["$and"][1] == {"$or": [{"resolved_at": {"$gt": DAY1}}, {"resolved_at": DAY1, "id": {"$gt": "e2"}}]}
+    db.snapshots.update_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_snapshot_rejects_unknown_format():
+    """Test an unsupported file format is refused before anything is read"""
+    with pytest.raises(SnapshotError, match="format"):
+        await snapshot_dataset(MagicMock(), "events", fmt="csv")
+
+
+def test_partition_path_sanitizes_category():
+    """Test categories become safe hive-style directory names"""
+    path = partition_path(snapshots.Path("/snap"), "markets", "2025-01-01", "us/politics")
+    assert path.as_posix() == "/snap/markets/day=2025-01-01/category=us_politics"
+
+
+def test_written_arrow_file_is_memory_mappable(tmp_path):
+    """Test an Arrow IPC partition file reads back through a memory map"""
+    row = snapshots.event_row({"id": "e1", "category": "crypto", "confidence": 0.9, "resolved_at": DAY1})
+
+    path = snapshots.write_partition(tmp_path, "part-1", "events", [row], "arrow")
+
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.column("id").to_pylist() == ["e1"]
+    assert "category" not in table.column_names
+
+
+def test_snapshot_route_rejects_unknown_datasets_and_concurrent_runs():
+    """Test POST /admin/snapshots answers 400 for unknown datasets and 409 while a run is in progress"""
+    from fastapi.testclient import TestClient
+    from server import app, get_admin_user
+    app.dependency_overrides[get_admin_user] = lambda: "0xadmin"
+    try:
+        client = TestClient(app)
+        with patch("server.snapshot_runner.start", return_value=False):
+            busy = client.post("/api/admin/snapshots", json={"datasets": ["events"]})
+        unknown = client.post("/api/admin/snapshots", json={"datasets": ["users"]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert busy.status_code == 409
+    assert unknown.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_snapshot_leaves_recent_records_for_next_run():
+    """Test the scan stops `lag` seconds before now, so late commits are not skipped behind the watermark"""
+    db, events = snapshot_db([])
+
+    before = datetime.now(timezone.utc)
+    await snapshot_dataset(db, "events", root="/snap", write=MagicMock(), lag=600)
+
+    cutoff = events.find.call_args[0][0]["resolved_at"]["$lt"]
+    assert before - timedelta(seconds=601) < cutoff <= datetime.now(timezone.utc) - timedelta(seconds=600)
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_read_dataset_keeps_latest_row_of_reverified_event(tmp_path, fmt):
+    """Test an event appended again after re-verification is read back once, with its latest verdict"""
+    first = snapshots.event_row({"id": "e1", "category": "crypto", "result": "verified", "resolved_at": DAY1})
+    again = snapshots.event_row({"id": "e1", "category": "crypto", "result": "unverified", "resolved_at": DAY2})
+    other = snapshots.event_row({"id": "e2", "category": "sports", "result": "verified", "resolved_at": DAY1})
+    for day, category, name, rows in [("2025-01-01", "crypto", "part-1", [first]), ("2025-01-02", "crypto", "part-2", [again]),
+                                      ("2025-01-01", "sports", "part-1", [other])]:
+        snapshots.write_partition(partition_path(tmp_path, "events", day, category), name, "events", rows, fmt)
+
+    table = snapshots.read_dataset("events", root=str(tmp_path), fmt=fmt)
+
+    rows = {row["id"]: row for row in table.to_pylist()}
+    assert table.num_rows == 2
+    assert rows["e1"]["result"] == "unverified" and rows["e2"]["category"] == "sports"
@@ -0,0 +1,39 @@
+import pytest
+import asyncio
+from unittest.mock import patch
+from ai_agents import source_verifier
+from ai_agents.source_verifier import SourceVerifierAgent
+
+
+def live_agent():
+    agent = SourceVerifierAgent()
+    agent.mock_mode = False
+    agent.client = object()
+    agent.system_message = "verifier"
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_source_checks_are_capped_and_bounded():
+    """Test suggested sources are deduplicated, capped, and checked a few at a time"""
+    agent = live_agent()
+    running, peak, prompts = 0, 0, []
+
+    async def fake_completion(client, system_message, prompt, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return '{"confirms": true, "notes": "ok"}'
+
+    sources = [f"source-{i}" for i in range(20)] + ["source-0"]
+    with patch("ai_agents.source_verifier.chat_completion", side_effect=fake_completion), \
+         patch.object(source_verifier, "SOURCE_VERIFIER_MAX_SOURCES", 4), \
+         patch.object(source_verifier, "SOURCE_VERIFIER_CONCURRENCY", 2):
+        result = await agent.verify({"id": "evt1", "event_title": "Match"}, {"data_sources": sources})
+
+    assert len(prompts) == 4 and result["sources_checked"] == 4
+    assert peak == 2
+    assert result["consensus"] is True
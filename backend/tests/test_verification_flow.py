@@ -60,8 +60,13 @@ async def test_verification_flow_production():
             assert call_args["confidence"] == 0.95
             assert call_args["cid"] == "QmTestCID"
             
-            # Verify database update
-            assert mock_db.events.update_one.call_count == 1
+            # Verdict and on-chain data are persisted in two writes
+            assert mock_db.events.update_one.call_count == 2
+            final_update = mock_db.events.update_one.call_args[0][1]["$set"]
+            assert final_update["status"] == "verified"
+            assert final_update["onchain"]["tx_hash"] == "0xabc123"
+            assert "ipfs" in final_update["pipeline"]["stages"]
+            assert final_update["pipeline"]["critical_path"][0] == "detect"
 
 
 @pytest.mark.asyncio
@@ -106,3 +111,23 @@ async def test_verification_flow_development():
             update_call = mock_db.events.update_one.call_args[0][1]["$set"]
             assert "onchain" in update_call
             assert update_call["onchain"]["cid"].startswith("mock_cid_")
+
+
+@pytest.mark.asyncio
+async def test_linera_publish_waits_for_persisted_verdict():
+    """Test a failed verdict write stops the run before anything is published on chain"""
+    from server import build_verification_graph, verify_and_publish
+    graph = build_verification_graph("production")
+    assert "persist_result" in graph.stages["linera"].deps
+
+    summary = {"event_id": "evt1", "result": "verified", "confidence": 0.9, "proof_links": []}
+    mock_db = MagicMock()
+    mock_db.events.update_one = AsyncMock(side_effect=RuntimeError("write failed"))
+    with patch("server.db", mock_db), \
+         patch("ipfs_client.upload_json", new_callable=AsyncMock, return_value="QmCID"), \
+         patch("server.linera_publish_event", new_callable=AsyncMock) as mock_linera, \
+         patch.dict("os.environ", {"ENV": "production"}):
+        with pytest.raises(Exception):
+            await verify_and_publish("evt1", {"id": "evt1"}, summary=summary)
+
+    mock_linera.assert_not_called()
@@ -0,0 +1,157 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from jobs import VerificationJobQueue
+
+
+def make_collection():
+    collection = MagicMock()
+    collection.update_one = AsyncMock()
+    collection.update_many = AsyncMock()
+    collection.find_one_and_update = AsyncMock()
+    collection.find.return_value.to_list = AsyncMock(return_value=[])
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_successful_job_marked_done():
+    """Test a job whose handler succeeds is marked done"""
+    collection = make_collection()
+    handler = AsyncMock()
+    queue = VerificationJobQueue(collection, handler=handler)
+
+    job = {"id": "job1", "event_id": "evt1", "attempts": 1, "max_attempts": 3}
+    await queue._run(job)
+
+    handler.assert_called_once_with(job)
+    update = collection.update_one.call_args[0][1]["$set"]
+    assert update["status"] == "done"
+    assert queue._completed == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_job_requeued_with_backoff():
+    """Test a failing job is requeued while attempts remain"""
+    collection = make_collection()
+    on_failure = AsyncMock()
+    queue = VerificationJobQueue(
+        collection,
+        handler=AsyncMock(side_effect=TimeoutError("Stage 'detect' timed out")),
+        on_failure=on_failure,
+        backoff_base=2.0,
+    )
+
+    job = {"id": "job1", "event_id": "evt1", "attempts": 2, "max_attempts": 3}
+    await queue._run(job)
+
+    update = collection.update_one.call_args[0][1]["$set"]
+    assert update["status"] == "queued"
+    assert "timed out" in update["last_error"]
+    assert queue.backoff_delay(2) == 4.0
+    assert not on_failure.called
+
+
+@pytest.mark.asyncio
+async def test_exhausted_job_marked_failed():
+    """Test a job is failed and reported after its last attempt"""
+    collection = make_collection()
+    on_failure = AsyncMock()
+    queue = VerificationJobQueue(
+        collection,
+        handler=AsyncMock(side_effect=RuntimeError("boom")),
+        on_failure=on_failure,
+    )
+
+    job = {"id": "job1", "event_id": "evt1", "attempts": 3, "max_attempts": 3}
+    await queue._run(job)
+
+    update = collection.update_one.call_args[0][1]["$set"]
+    assert update["status"] == "failed"
+    on_failure.assert_called_once_with(job, "boom")
+
+
+@pytest.mark.asyncio
+async def test_reclaim_orphans_requeues_expired_leases():
+    """Test running jobs with expired leases are requeued"""
+    collection = make_collection()
+    collection.update_many.return_value = MagicMock(modified_count=2)
+    queue = VerificationJobQueue(collection, handler=AsyncMock())
+
+    assert await queue.reclaim_orphans() == 2
+    query, update = collection.update_many.call_args[0]
+    assert query["status"] == "running"
+    assert "lease_expires_at" in query
+    assert query["$expr"]["$lt"][0] == "$attempts"
+    assert update["$set"]["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_reclaim_orphans_fails_jobs_out_of_attempts():
+    """Test an expired lease on the last attempt fails the job and reports it instead of requeueing"""
+    collection = make_collection()
+    job = {"id": "job1", "event_id": "evt1", "status": "running", "attempts": 3, "max_attempts": 3}
+    collection.find.return_value.to_list = AsyncMock(return_value=[job])
+    collection.find_one_and_update = AsyncMock(return_value=job)
+    collection.update_many.return_value = MagicMock(modified_count=0)
+    on_failure = AsyncMock()
+    queue = VerificationJobQueue(collection, handler=AsyncMock(), on_failure=on_failure)
+
+    assert await queue.reclaim_orphans() == 1
+
+    assert collection.find.call_args[0][0]["$expr"]["$gte"][0] == "$attempts"
+    query, update = collection.find_one_and_update.call_args[0]
+    assert query["id"] == "job1" and query["status"] == "running"
+    assert update["$set"]["status"] == "failed"
+    on_failure.assert_awaited_once()
+    assert on_failure.call_args[0][0] == job and "Lease expired" in on_failure.call_args[0][1]
+
+    collection.find_one_and_update = AsyncMock(return_value=None)  # claimed by another worker
+    on_failure.reset_mock()
+    assert await queue.reclaim_orphans() == 0
+    on_failure.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_start_does_not_wait_on_mongo_and_first_worker_reclaims():
+    """Test starting the queue issues no Mongo calls; the first worker reclaims orphans as it starts"""
+    collection = make_collection()
+    collection.update_many.return_value = MagicMock(modified_count=0)
+    collection.find_one_and_update = AsyncMock(return_value=None)
+    queue = VerificationJobQueue(collection, handler=AsyncMock(), concurrency=2, poll_interval=0.01)
+
+    await queue.start()
+    collection.create_index.assert_not_called()
+    collection.update_many.assert_not_called()
+
+    await asyncio.sleep(0.02)
+    await queue.stop()
+
+    collection.update_many.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_enqueue_retries_when_a_concurrent_enqueue_inserted_first():
+    """Test a duplicate key on the open-job unique index is retried and returns the other call's job"""
+    from pymongo.errors import DuplicateKeyError
+    collection = make_collection()
+    other = {"id": "job-other", "event_id": "evt1", "status": "queued"}
+    collection.find_one_and_update = AsyncMock(side_effect=[DuplicateKeyError("E11000"), other])
+    queue = VerificationJobQueue(collection, handler=AsyncMock())
+
+    assert await queue.enqueue("evt1") == other
+    assert collection.find_one_and_update.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_that_lost_its_lease_does_not_overwrite_the_job():
+    """Test outcome writes require the job to still be running, and a lost lease does not report failure"""
+    collection = make_collection()
+    collection.update_one = AsyncMock(return_value=MagicMock(matched_count=0))
+    on_failure = AsyncMock()
+    queue = VerificationJobQueue(collection, handler=AsyncMock(side_effect=RuntimeError("boom")), on_failure=on_failure)
+
+    await queue._run({"id": "job1", "event_id": "evt1", "attempts": 3, "max_attempts": 3})
+
+    query = collection.update_one.call_args[0][0]
+    assert query == {"id": "job1", "worker_id": queue.worker_id, "status": "running"}
+    on_failure.assert_not_called()